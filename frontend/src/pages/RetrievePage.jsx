@@ -69,6 +69,9 @@ const RetrievePage = () => {
                             const data = JSON.parse(jsonStr);
                             if (data.type === 'status') {
                                 setStatusMessage(data.content);
+                            } else if (data.type === 'answer_delta') {
+                                accumulatedResponse += data.content;
+                                setResponse(accumulatedResponse);
                             } else if (data.type === 'answer') {
                                 accumulatedResponse = data.content;
                                 setResponse(accumulatedResponse);
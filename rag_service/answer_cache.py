@@ -0,0 +1,76 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a question, used for cache keys."""
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+class AnswerCache:
+    """
+    In-memory LRU of complete /query answers (the SSE event sequence).
+
+    Keys cover everything that changes the answer: normalized query, mode,
+    top_k, tags and the LLM (type, base URL, model). Entries expire after
+    ttl_seconds, and every entry records the index version it was computed at;
+    ingest and delete bump the version, so answers computed before a change
+    are never served after it.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.index_version = 0
+        self._entries: "OrderedDict[str, Tuple[int, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, mode: str, top_k: Optional[int], tags: Optional[Dict[str, Any]],
+                 llm_config: Optional[Dict[str, Any]]) -> str:
+        # The same model name can be served by different providers (public API, private Ollama)
+        llm_config = llm_config or {}
+        llm = [(llm_config.get(field) or "").strip() for field in ("type", "baseUrl", "model")]
+        raw = json.dumps(
+            [normalize_query(query), mode, top_k, tags or {}, llm],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def bump_version(self) -> int:
+        """Invalidates every cached answer. Called after the index changes."""
+        with self._lock:
+            self.index_version += 1
+            self._entries.clear()
+            return self.index_version
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            version, stored_at, events = entry
+            if version != self.index_version or time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return events
+
+    def put(self, key: str, events: List[Dict[str, Any]], version: int):
+        """Stores events computed at index `version`; dropped if the index changed meanwhile."""
+        with self._lock:
+            if version != self.index_version:
+                return
+            self._entries[key] = (version, time.time(), list(events))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_IN_BATCH = 500
+
+
+def ancestor_doc_ids(doc_id: str) -> List[str]:
+    """
+    Returns the ancestors of a composite document ID, nearest last.
+    "repo#docs/a.md#intro" -> ["repo", "repo#docs/a.md"]
+    """
+    parts = doc_id.split("#")
+    return ["#".join(parts[:i]) for i in range(1, len(parts))]
+
+
+class DocIndex:
+    """
+    Reverse index of LightRAG documents, backed by a local SQLite database.
+
+    - doc_chunks:   chunk ID -> document IDs that produced it
+    - doc_children: parent document -> every descendant sub-document
+
+    Kept up to date at insert and delete time, so deletion resolves what to remove
+    with key lookups instead of scanning the whole doc_status storage.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS doc_chunks ("
+                "chunk_id TEXT NOT NULL, doc_id TEXT NOT NULL, PRIMARY KEY (chunk_id, doc_id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_chunks_doc ON doc_chunks (doc_id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS doc_children ("
+                "parent_id TEXT NOT NULL, child_id TEXT NOT NULL, PRIMARY KEY (parent_id, child_id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_children_child ON doc_children (child_id)")
+
+    def _add_docs(self, doc_ids: Iterable[str]):
+        rows = [(parent, doc_id) for doc_id in doc_ids for parent in ancestor_doc_ids(doc_id)]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO doc_children (parent_id, child_id) VALUES (?, ?)", rows)
+
+    def _set_chunks(self, doc_id: str, chunk_ids: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM doc_chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO doc_chunks (chunk_id, doc_id) VALUES (?, ?)",
+                [(chunk_id, doc_id) for chunk_id in chunk_ids],
+            )
+
+    def _select_in(self, query: str, values: List[str]) -> Set[str]:
+        found = set()
+        with self._lock:
+            for i in range(0, len(values), _IN_BATCH):
+                batch = values[i:i + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                found.update(row[0] for row in self._conn.execute(query.format(placeholders), batch))
+        return found
+
+    def _docs_for_chunks(self, chunk_ids: List[str]) -> Set[str]:
+        return self._select_in("SELECT DISTINCT doc_id FROM doc_chunks WHERE chunk_id IN ({})", list(chunk_ids))
+
+    def _chunks_for_docs(self, doc_ids: List[str]) -> Set[str]:
+        return self._select_in("SELECT DISTINCT chunk_id FROM doc_chunks WHERE doc_id IN ({})", list(doc_ids))
+
+    def _shared_chunks(self, chunk_ids: List[str], doc_ids: Iterable[str]) -> Set[str]:
+        """Chunks of chunk_ids that some document outside doc_ids still references."""
+        doc_ids = set(doc_ids)
+        shared = set()
+        with self._lock:
+            for i in range(0, len(chunk_ids), _IN_BATCH):
+                batch = chunk_ids[i:i + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_id, doc_id FROM doc_chunks WHERE chunk_id IN ({placeholders})", batch
+                )
+                shared.update(chunk_id for chunk_id, doc_id in rows if doc_id not in doc_ids)
+        return shared
+
+    def _children(self, parent_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT child_id FROM doc_children WHERE parent_id = ?", (parent_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def _remove_docs(self, doc_ids: List[str]):
+        with self._lock, self._conn:
+            for i in range(0, len(doc_ids), _IN_BATCH):
+                batch = doc_ids[i:i + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM doc_chunks WHERE doc_id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM doc_children WHERE child_id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM doc_children WHERE parent_id IN ({placeholders})", batch)
+
+    # Async wrappers keep SQLite I/O off the event loop
+    async def add_docs(self, doc_ids: Iterable[str]):
+        await asyncio.to_thread(self._add_docs, list(doc_ids))
+
+    async def set_chunks(self, doc_id: str, chunk_ids: Iterable[str]):
+        await asyncio.to_thread(self._set_chunks, doc_id, list(chunk_ids))
+
+    async def docs_for_chunks(self, chunk_ids: Iterable[str]) -> Set[str]:
+        return await asyncio.to_thread(self._docs_for_chunks, list(chunk_ids))
+
+    async def chunks_for_docs(self, doc_ids: Iterable[str]) -> Set[str]:
+        return await asyncio.to_thread(self._chunks_for_docs, list(doc_ids))
+
+    async def shared_chunks(self, chunk_ids: Iterable[str], doc_ids: Iterable[str]) -> Set[str]:
+        return await asyncio.to_thread(self._shared_chunks, list(chunk_ids), list(doc_ids))
+
+    async def children(self, parent_id: str) -> Set[str]:
+        return await asyncio.to_thread(self._children, parent_id)
+
+    async def remove_docs(self, doc_ids: Iterable[str]):
+        await asyncio.to_thread(self._remove_docs, list(doc_ids))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
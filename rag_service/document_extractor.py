@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_CACHE_DIR = os.getenv("EXTRACT_CACHE_DIR", "/app/public_data/extract_cache")
+EXTRACT_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACT_CACHE_MAX_ENTRIES", "2000"))  # Cached PDF texts; least recently used go first
+EXTRACT_CACHE_MAX_AGE_DAYS = float(os.getenv("EXTRACT_CACHE_MAX_AGE_DAYS", "30"))  # Unused for this long -> removed (0 = no limit)
+EXTRACT_MAX_WORKERS = int(os.getenv("EXTRACT_MAX_WORKERS", str(os.cpu_count() or 2)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Returns the shared extraction process pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        # spawn keeps workers from inheriting the event loop, sockets and threads of the API process
+        _executor = ProcessPoolExecutor(
+            max_workers=EXTRACT_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"Started extraction process pool with {EXTRACT_MAX_WORKERS} workers")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# --- Worker functions (run in child processes, must stay top-level for pickling) ---
+
+def _count_pdf_pages(file_path: str) -> int:
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pdf_pages(file_path: str, start: int, end: int) -> List[str]:
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages[start:end]]
+
+
+def _read_text_file(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def _hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Cache ---
+
+def _cache_path(file_hash: str) -> str:
+    return os.path.join(EXTRACT_CACHE_DIR, f"{file_hash}.txt")
+
+
+def _read_cache(file_hash: str) -> Optional[str]:
+    path = _cache_path(file_hash)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    # mtime doubles as last-use time for eviction
+    os.utime(path)
+    return content
+
+
+def _write_cache(file_hash: str, content: str):
+    os.makedirs(EXTRACT_CACHE_DIR, exist_ok=True)
+    path = _cache_path(file_hash)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    _prune_cache()
+
+
+def _prune_cache():
+    """Drops entries unused for EXTRACT_CACHE_MAX_AGE_DAYS, then the oldest beyond EXTRACT_CACHE_MAX_ENTRIES."""
+    entries = []
+    for entry in os.scandir(EXTRACT_CACHE_DIR):
+        if entry.name.endswith(".txt"):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    entries.sort()
+    expired = 0
+    if EXTRACT_CACHE_MAX_AGE_DAYS > 0:
+        cutoff = time.time() - EXTRACT_CACHE_MAX_AGE_DAYS * 86400
+        expired = sum(1 for mtime, _ in entries if mtime < cutoff)
+    excess = max(expired, len(entries) - max(1, EXTRACT_CACHE_MAX_ENTRIES))
+    for _, path in entries[:excess]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    if excess:
+        logger.info(f"Evicted {excess} extraction cache entries")
+
+
+# --- Public API ---
+
+async def iter_pdf_pages(file_path: str) -> AsyncIterator[str]:
+    """
+    Extracts a PDF in the process pool, with page ranges split across workers.
+    Page texts are yielded in page order as soon as their range is done.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    page_count = await loop.run_in_executor(executor, _count_pdf_pages, file_path)
+    futures = [
+        loop.run_in_executor(executor, _extract_pdf_pages, file_path, start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ]
+    try:
+        for future in futures:
+            for page_text in await future:
+                yield page_text
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+async def extract_text(file_path: str) -> str:
+    """
+    Extracts the text of a file without blocking the event loop.
+    PDFs are parsed in the process pool and cached by file hash, so re-ingesting
+    the same PDF skips parsing. Other files are just read.
+    """
+    if not file_path.lower().endswith('.pdf'):
+        return await asyncio.to_thread(_read_text_file, file_path)
+
+    file_hash = await asyncio.to_thread(_hash_file, file_path)
+    cached = await asyncio.to_thread(_read_cache, file_hash)
+    if cached is not None:
+        logger.info(f"Extraction cache hit for {file_path} ({file_hash[:12]})")
+        return cached
+
+    start_time = time.time()
+    pages = [page_text async for page_text in iter_pdf_pages(file_path)]
+    content = "\n".join(pages)
+    logger.info(f"Extracted {len(pages)} PDF pages from {file_path} in {time.time() - start_time:.2f}s")
+
+    try:
+        await asyncio.to_thread(_write_cache, file_hash, content)
+    except Exception as e:
+        logger.warning(f"Failed to cache extracted text for {file_path}: {e}")
+    return content
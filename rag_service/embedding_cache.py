@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from lazy_imports import lazy_import
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# numpy is imported when the first store is opened
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_DIR = "/app/public_data/embedding_cache"
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha256((text or "").encode("utf-8", errors="ignore")).digest()
+
+
+class _EmbeddingStore:
+    """
+    Cache of embeddings for one (model, dimension) pair.
+
+    Vectors live in a float32 memory-mapped array ({prefix}.f32) next to a
+    parallel array of the sha256 digest stored in each slot ({prefix}.keys).
+    The JSON index ({prefix}.index.json) keeps digest -> slot in LRU order.
+    Lookups check the slot digest, so an index that is older than the arrays
+    (e.g. after a crash) can only cause misses, never wrong vectors.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, prefix: str, dim: int, max_entries: int):
+        self.prefix = prefix
+        self.dim = dim
+        self.max_entries = max_entries
+        self.index: "OrderedDict[bytes, int]" = OrderedDict()
+        self.capacity = 0
+        self.vectors: "Optional[np.memmap]" = None
+        self.keys: "Optional[np.memmap]" = None
+        # Slots below _next_slot are in use or listed in _free; slots above it were never handed out
+        self._next_slot = 0
+        self._free: List[int] = []
+        self._dirty = False
+        self._load()
+
+    def _open_arrays(self, capacity: int):
+        np = lazy_import("numpy")
+        for suffix, dtype, width in ((".f32", np.float32, self.dim), (".keys", np.uint8, 32)):
+            path = self.prefix + suffix
+            size = capacity * width * np.dtype(dtype).itemsize
+            with open(path, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+        self.vectors = np.memmap(self.prefix + ".f32", dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.keys = np.memmap(self.prefix + ".keys", dtype=np.uint8, mode="r+", shape=(capacity, 32))
+        self.capacity = capacity
+
+    def _load(self):
+        capacity = self.INITIAL_CAPACITY
+        index_path = self.prefix + ".index.json"
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r") as f:
+                    data = json.load(f)
+                capacity = max(capacity, data.get("capacity", capacity))
+                self.index = OrderedDict((bytes.fromhex(h), slot) for h, slot in data.get("slots", []))
+            except Exception as e:
+                logger.error(f"Failed to load embedding cache index {index_path}: {e}")
+                self.index = OrderedDict()
+        capacity = min(capacity, self.max_entries)
+        # Slots past a lowered max_entries are gone
+        self.index = OrderedDict((digest, slot) for digest, slot in self.index.items() if slot < capacity)
+        taken = set(self.index.values())
+        self._next_slot = max(taken) + 1 if taken else 0
+        self._free = [slot for slot in range(self._next_slot) if slot not in taken]
+        self._open_arrays(capacity)
+
+    def get(self, digest: bytes) -> "Optional[np.ndarray]":
+        np = lazy_import("numpy")
+        slot = self.index.get(digest)
+        if slot is None or slot >= self.capacity:
+            return None
+        if self.keys[slot].tobytes() != digest:
+            del self.index[digest]
+            return None
+        self.index.move_to_end(digest)
+        return np.array(self.vectors[slot])
+
+    def _allocate_slot(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._next_slot >= self.capacity and self.capacity < self.max_entries:
+            self.vectors.flush()
+            self.keys.flush()
+            self._open_arrays(min(self.capacity * 2, self.max_entries))
+        if self._next_slot < self.capacity:
+            # Slots are handed out densely until eviction starts
+            slot = self._next_slot
+            self._next_slot += 1
+            return slot
+        _, slot = self.index.popitem(last=False)
+        return slot
+
+    def put(self, digest: bytes, vector: Sequence[float]):
+        np = lazy_import("numpy")
+        slot = self.index.get(digest)
+        if slot is None:
+            slot = self._allocate_slot()
+        self.vectors[slot] = np.asarray(vector, dtype=np.float32)
+        self.keys[slot] = np.frombuffer(digest, dtype=np.uint8)
+        self.index[digest] = slot
+        self.index.move_to_end(digest)
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        self.vectors.flush()
+        self.keys.flush()
+        index_path = self.prefix + ".index.json"
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "slots": [[digest.hex(), slot] for digest, slot in self.index.items()],
+            }, f)
+        os.replace(tmp_path, index_path)
+        self._dirty = False
+
+
+class EmbeddingCache:
+    """
+    Disk-backed, content-addressed embedding cache keyed by (model, dimension, sha256(text)).
+    Sits in front of the embedding provider so unchanged chunks, entity and relation
+    descriptions are never embedded twice.
+
+    Each model has one active store, for the dimension it last produced. If a model's
+    dimension changes, lookups only see vectors of the new dimension: the old store's
+    files stay on disk but are no longer read, and vectors of other dimensions are
+    never served.
+    """
+
+    def __init__(self, directory: str = EMBEDDING_CACHE_DIR, max_entries: int = 200000, save_interval: float = 30.0):
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+        self.save_interval = save_interval
+        self._stores: Dict[str, _EmbeddingStore] = {}
+        self._lock = threading.Lock()
+        self._last_save = time.time()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._discover_stores()
+
+    def _prefix(self, model: str, dim: int) -> str:
+        safe_model = re.sub(r'[^A-Za-z0-9_.-]', '_', model)
+        return os.path.join(self.directory, f"{safe_model}_{dim}")
+
+    def _discover_stores(self):
+        # A model's dimension is only known once it has produced vectors; reopen earlier stores by
+        # name, oldest first, so the most recently saved dimension of a model wins
+        names = [name for name in os.listdir(self.directory) if name.endswith(".index.json")]
+        names.sort(key=lambda name: os.path.getmtime(os.path.join(self.directory, name)))
+        for name in names:
+            match = re.match(r'^(.*)_(\d+)\.index\.json$', name)
+            if match:
+                model, dim = match.group(1), int(match.group(2))
+                try:
+                    self._stores[model] = _EmbeddingStore(self._prefix(model, dim), dim, self.max_entries)
+                except Exception as e:
+                    logger.error(f"Failed to open embedding cache for {model}/{dim}: {e}")
+
+    def _store(self, model: str, dim: Optional[int] = None) -> Optional[_EmbeddingStore]:
+        key = re.sub(r'[^A-Za-z0-9_.-]', '_', model)
+        store = self._stores.get(key)
+        if dim is not None and (store is None or store.dim != dim):
+            store = _EmbeddingStore(self._prefix(model, dim), dim, self.max_entries)
+            self._stores[key] = store
+        return store
+
+    def get_many(self, model: str, texts: List[str]) -> "List[Optional[np.ndarray]]":
+        """Returns the cached vector for each text, or None for misses."""
+        with self._lock:
+            store = self._store(model)
+            if store is None:
+                results = [None] * len(texts)
+            else:
+                results = [store.get(text_digest(text)) for text in texts]
+            hits = sum(1 for r in results if r is not None)
+            self.hits += hits
+            self.misses += len(texts) - hits
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: Sequence[Sequence[float]]):
+        if not texts or len(texts) != len(vectors):
+            return
+        dim = len(vectors[0])
+        with self._lock:
+            store = self._store(model, dim)
+            for text, vector in zip(texts, vectors):
+                if len(vector) == dim:
+                    store.put(text_digest(text), vector)
+            if time.time() - self._last_save >= self.save_interval:
+                self._save_locked()
+
+    def _save_locked(self):
+        for store in self._stores.values():
+            try:
+                store.save()
+            except Exception as e:
+                logger.error(f"Failed to save embedding cache {store.prefix}: {e}")
+        self._last_save = time.time()
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def size(self) -> int:
+        return sum(len(store.index) for store in self._stores.values())
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_DIR = "/app/public_data/manifests"
+
+
+def compute_content_hash(content: str) -> str:
+    """Returns the sha256 hex digest used to detect changed files."""
+    return hashlib.sha256(content.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def sync_summary(changes: Dict[str, List[str]], failed_paths: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Per-repo outcome of one sync, from a manifest diff and the relative paths that failed.
+    Failed files are reported separately from the added/updated counts they came from.
+    """
+    failed = sorted(set(failed_paths))
+    return {
+        "added": len([path for path in changes["added"] if path not in failed]),
+        "updated": len([path for path in changes["changed"] if path not in failed]),
+        "unchanged": len(changes["unchanged"]),
+        "deleted": len(changes["removed"]),
+        "failed": len(failed),
+        "failed_files": failed,
+    }
+
+
+class IngestManifest:
+    """
+    Per-document ingestion manifest for git repos.
+    Maps each relative file path to its content hash and the section sub-doc IDs
+    it produced, so a re-ingest only pays for files that actually changed.
+
+    {
+        "docs/index.md": {
+            "hash": "<sha256>",
+            "section_ids": ["<doc_id>#docs/index.md#intro", ...]
+        },
+        ...
+    }
+    """
+
+    def __init__(self, doc_id: str, directory: str = MANIFEST_DIR):
+        self.doc_id = doc_id
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', doc_id)
+        self.filepath = os.path.join(directory, f"{safe_name}.json")
+        self.files: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.filepath):
+            return
+        try:
+            with open(self.filepath, "r") as f:
+                self.files = json.load(f).get("files", {})
+        except Exception as e:
+            logger.error(f"Failed to load manifest {self.filepath}: {e}")
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            tmp_path = f"{self.filepath}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"doc_id": self.doc_id, "files": self.files}, f)
+            os.replace(tmp_path, self.filepath)
+        except Exception as e:
+            logger.error(f"Failed to save manifest {self.filepath}: {e}")
+
+    def diff(self, current_hashes: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        Compares the current {relative_path: hash} of a repo against the manifest.
+        Returns the relative paths grouped as 'added', 'changed', 'removed' and 'unchanged'.
+        """
+        result = {"added": [], "changed": [], "removed": [], "unchanged": []}
+        for path, content_hash in current_hashes.items():
+            entry = self.files.get(path)
+            if entry is None:
+                result["added"].append(path)
+            elif entry.get("hash") != content_hash:
+                result["changed"].append(path)
+            else:
+                result["unchanged"].append(path)
+        result["removed"] = [path for path in self.files if path not in current_hashes]
+        return result
+
+    def section_ids(self, path: str) -> List[str]:
+        return list(self.files.get(path, {}).get("section_ids", []))
+
+    def update_file(self, path: str, content_hash: str, section_ids: List[str]):
+        self.files[path] = {"hash": content_hash, "section_ids": list(section_ids)}
+
+    def remove_file(self, path: str) -> Optional[Dict]:
+        return self.files.pop(path, None)
+
+    def delete(self):
+        """Removes the manifest, e.g. when the whole document is deleted."""
+        self.files = {}
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+JOB_STATES = (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)
+
+# ID of the job being run by the current worker, so handlers can report progress
+current_job_id: ContextVar[Optional[str]] = ContextVar("current_job_id", default=None)
+
+
+class JobQueue:
+    """
+    Durable job queue backed by a local SQLite database.
+    Jobs survive restarts: anything left 'running' by a crashed process is re-queued on startup.
+    Failed jobs are retried with exponential backoff until max_attempts is reached.
+    """
+
+    def __init__(self, db_path: str, retry_backoff: float = 10.0):
+        self.db_path = db_path
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    error TEXT,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    available_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)")
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "progress" not in columns:
+                # Added after the first release; existing databases are migrated in place
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+
+    def _row_to_job(self, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["progress"] = json.loads(job["progress"]) if job.get("progress") else None
+        return job
+
+    def _enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, created_at, updated_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), JOB_QUEUED, max_attempts, now, now, now),
+            )
+        return job_id
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND available_at <= ? ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, updated_at = ? WHERE id = ?",
+                (JOB_RUNNING, now, now, row["id"]),
+            )
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return self._row_to_job(row)
+
+    def _complete(self, job_id: str, result: Any):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ?, updated_at = ? WHERE id = ?",
+                (JOB_SUCCEEDED, json.dumps(result, default=str), now, now, job_id),
+            )
+
+    def _fail(self, job_id: str, error: str) -> str:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return JOB_FAILED
+            if row["attempts"] < row["max_attempts"]:
+                retry_at = now + self.retry_backoff * (2 ** (row["attempts"] - 1))
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                    (JOB_QUEUED, error, retry_at, now, job_id),
+                )
+                return JOB_QUEUED
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                (JOB_FAILED, error, now, now, job_id),
+            )
+            return JOB_FAILED
+
+    def _set_progress(self, job_id: str, progress: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress, default=str), time.time(), job_id),
+            )
+
+    def _recover(self) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, updated_at = ? WHERE status = ?",
+                (JOB_QUEUED, now, now, JOB_RUNNING),
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def depth(self) -> Dict[str, int]:
+        """Returns the number of jobs per state."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {state: 0 for state in JOB_STATES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    # Async wrappers keep SQLite I/O off the event loop
+    async def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = 3) -> str:
+        return await asyncio.to_thread(self._enqueue, kind, payload, max_attempts)
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._claim)
+
+    async def complete(self, job_id: str, result: Any = None):
+        await asyncio.to_thread(self._complete, job_id, result)
+
+    async def fail(self, job_id: str, error: str) -> str:
+        return await asyncio.to_thread(self._fail, job_id, error)
+
+    async def set_progress(self, job_id: str, progress: Dict[str, Any]):
+        await asyncio.to_thread(self._set_progress, job_id, progress)
+
+    async def recover(self) -> int:
+        return await asyncio.to_thread(self._recover)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobWorkerPool:
+    """
+    Runs a fixed number of worker coroutines that claim jobs from a JobQueue
+    and dispatch them to the handler registered for the job's kind.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]],
+        workers: int = 1,
+        poll_interval: float = 2.0,
+        ready: Optional[Callable[[], bool]] = None,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.ready = ready
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    async def start(self):
+        recovered = await self.queue.recover()
+        if recovered:
+            logger.info(f"Re-queued {recovered} jobs interrupted by a restart")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wakes idle workers after a job has been enqueued."""
+        self._wakeup.set()
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, worker_id: int):
+        while True:
+            if self.ready and not self.ready():
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            job = await self.queue.claim()
+            if job is None:
+                await self._wait()
+                continue
+
+            handler = self.handlers.get(job["kind"])
+            logger.info(f"Worker {worker_id} running job {job['id']} ({job['kind']}, attempt {job['attempts']}/{job['max_attempts']})")
+            token = current_job_id.set(job["id"])
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler registered for job kind '{job['kind']}'")
+                result = await handler(job["payload"])
+                await self.queue.complete(job["id"], result)
+                logger.info(f"Job {job['id']} succeeded")
+            except asyncio.CancelledError:
+                # Shutdown: leave the job 'running' so it is re-queued on next startup
+                raise
+            except Exception as e:
+                state = await self.queue.fail(job["id"], str(e))
+                logger.error(f"Job {job['id']} failed (now {state}): {e}", exc_info=True)
+            finally:
+                current_job_id.reset(token)
@@ -0,0 +1,124 @@
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# LightRAG storages persisted through index_done_callback
+KV_STORAGE_ATTRS = (
+    "full_docs", "doc_status", "text_chunks", "full_entities", "full_relations",
+    "entity_chunks", "relation_chunks", "llm_response_cache",
+)
+
+# LightRAG modules whose JSON file writes are made atomic
+JSON_STORAGE_MODULES = ("lightrag.kg.json_kv_impl", "lightrag.kg.json_doc_status_impl")
+
+
+def atomic_writer(write: Callable) -> Callable:
+    """Wraps a write_json(obj, file_name) function to write a temp file and rename it into place."""
+    if getattr(write, "_atomic", False):
+        return write
+
+    def write_atomically(json_obj, file_name, *args, **kwargs):
+        tmp_path = f"{file_name}.tmp"
+        result = write(json_obj, tmp_path, *args, **kwargs)
+        os.replace(tmp_path, file_name)
+        return result
+
+    write_atomically._atomic = True
+    return write_atomically
+
+
+def patch_atomic_json_writes():
+    for module_name in JSON_STORAGE_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        if hasattr(module, "write_json"):
+            module.write_json = atomic_writer(module.write_json)
+
+
+class GroupCommit:
+    """
+    Group commit for LightRAG's JSON file storages.
+
+    Every ainsert ends in index_done_callback on each storage, which rewrites the
+    whole JSON file. Once installed, those calls only mark the storage dirty; dirty
+    storages are written together every `interval` seconds, after `every_docs`
+    inserted documents, at the end of each job (flush()) and on shutdown (aclose()).
+    Data stays in LightRAG's in-memory dicts until then, so at most one interval of
+    writes is lost if the process dies.
+    """
+
+    def __init__(self, interval: float = 30.0, every_docs: int = 50,
+                 on_flush: Optional[Callable[[str, float], None]] = None):
+        self.interval = interval
+        self.every_docs = max(1, every_docs)
+        self.on_flush = on_flush
+        self._callbacks: Dict[str, Callable] = {}
+        self._storages: Dict[str, Any] = {}
+        self._dirty: Set[str] = set()
+        self._pending_docs = 0
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    def install(self, rag: Any):
+        """Defers index_done_callback of every JSON-backed storage of a LightRAG instance."""
+        patch_atomic_json_writes()
+        for attr in KV_STORAGE_ATTRS:
+            storage = getattr(rag, attr, None)
+            if storage is None or not type(storage).__name__.startswith("Json") or attr in self._storages:
+                continue
+            self._storages[attr] = storage
+            self._callbacks[attr] = storage.index_done_callback
+            storage.index_done_callback = self._deferred(attr)
+        if self._storages and self._timer is None:
+            self._timer = asyncio.create_task(self._run_timer())
+        logger.info(f"Group commit enabled for {sorted(self._storages)} (every {self.interval}s / {self.every_docs} docs)")
+
+    def _deferred(self, attr: str):
+        async def index_done_callback() -> None:
+            self._dirty.add(attr)
+        return index_done_callback
+
+    async def note_docs(self, count: int):
+        """Counts inserted documents and flushes once every_docs have accumulated."""
+        self._pending_docs += count
+        if self._pending_docs >= self.every_docs:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._pending_docs = 0
+            for attr in sorted(dirty):
+                start = time.perf_counter()
+                try:
+                    await self._callbacks[attr]()
+                except Exception as e:
+                    self._dirty.add(attr)
+                    logger.error(f"Failed to persist {attr}: {e}", exc_info=True)
+                    continue
+                if self.on_flush:
+                    self.on_flush(attr, time.perf_counter() - start)
+
+    async def _run_timer(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._dirty:
+                await self.flush()
+
+    async def aclose(self):
+        """Flushes pending writes and restores the original callbacks."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+        for attr, storage in self._storages.items():
+            storage.index_done_callback = self._callbacks[attr]
+        self._storages.clear()
+        self._callbacks.clear()
@@ -0,0 +1,51 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Dict
+
+# Optional backends that are only imported once a deployment actually uses them.
+# lightrag (and the numpy it pulls in) is imported eagerly by main; its time is under "seconds".
+HEAVY_MODULES = ("openai", "ollama", "pdfplumber", "neo4j", "qdrant_client")
+
+_import_seconds: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Imports a module on first use and records how long the first import took.
+    Later calls are a sys.modules lookup.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        _import_seconds.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+@contextmanager
+def timed_import(label: str):
+    """Records the time spent in a block of eager imports under `label`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _import_seconds[label] = time.perf_counter() - start
+
+
+def record(label: str, seconds: float):
+    _import_seconds[label] = seconds
+
+
+def import_report() -> Dict[str, Any]:
+    """Import-time breakdown (slowest first) and which heavy modules are loaded."""
+    return {
+        "seconds": dict(sorted(_import_seconds.items(), key=lambda item: item[1], reverse=True)),
+        "loaded": {name: name in sys.modules for name in HEAVY_MODULES},
+    }
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_IN_BATCH = 500
+
+# LightRAG cache_type -> detect_llm_job() label
+CACHE_TYPE_JOBS = {
+    "extract": "Entity Extraction",
+    "keywords": "Keywords Extraction",
+    "query": "Answer Generation",
+    "summary": "Summary Generation",
+}
+
+EVICTION_ORDER = {
+    "lru": "last_access ASC",
+    "lfu": "hits ASC, last_access ASC",
+}
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """
+    Parses "Answer Generation=3600,Keywords Extraction=86400" into {job_type: seconds}.
+    Job types without a TTL never expire.
+    """
+    ttls = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        job_type, seconds = item.rsplit("=", 1)
+        try:
+            ttls[job_type.strip()] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring invalid LLM cache TTL: {item}")
+    return ttls
+
+
+class LLMCachePolicy:
+    """
+    Size cap, eviction and per-job-type TTLs for LightRAG's llm_response_cache.
+
+    LightRAG only ever adds to that KV storage. Installed on it, this keeps a
+    small SQLite index (key, job type, created, last access, hits) next to the
+    cache: reads past their job type's TTL are misses and delete the entry, and
+    purge() drops one job type. max_entries caps the job types that have a TTL
+    (answers, keywords), evicting by LRU or LFU; job types without one
+    (entity extraction, summaries) persist and are never evicted for space.
+    Entries already in the cache are indexed when the policy is installed.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 20000, ttls: Optional[Dict[str, float]] = None,
+                 eviction: str = "lru", classify: Optional[Callable[[str], str]] = None,
+                 on_event: Optional[Callable[[str, str, int], None]] = None):
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self.ttls = ttls or {}
+        self.eviction = eviction if eviction in EVICTION_ORDER else "lru"
+        self.classify = classify
+        self.on_event = on_event
+        self._storage = None
+        self._originals: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "id TEXT PRIMARY KEY, job_type TEXT NOT NULL, created_at REAL NOT NULL, "
+                "last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_job ON llm_cache (job_type)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+
+    def job_type_of(self, key: str, value: Optional[Dict[str, Any]] = None) -> str:
+        """Job type of a cache entry: from its cache_type ("{mode}:{cache_type}:{hash}" keys), else its prompt."""
+        cache_type = (value or {}).get("cache_type")
+        if not cache_type and key.count(":") >= 2:
+            cache_type = key.split(":")[1]
+        if cache_type in CACHE_TYPE_JOBS:
+            return CACHE_TYPE_JOBS[cache_type]
+        if self.classify and value and value.get("original_prompt"):
+            return self.classify(value["original_prompt"])
+        return "Unknown Job"
+
+    def _emit(self, job_type: str, event: str, count: int = 1):
+        if self.on_event and count:
+            self.on_event(job_type, event, count)
+
+    # --- Index (sync, run in a thread) ---
+    def _touch(self, key: str, job_type: str) -> bool:
+        """Records a read. Returns False if the entry is past its TTL (and forgets it)."""
+        now = time.time()
+        ttl = self.ttls.get(job_type)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT created_at FROM llm_cache WHERE id = ?", (key,)).fetchone()
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO llm_cache (id, job_type, created_at, last_access, hits) VALUES (?, ?, ?, ?, 1)",
+                    (key, job_type, now, now),
+                )
+                return True
+            if ttl and now - row[0] > ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE id = ?", (key,))
+                return False
+            self._conn.execute("UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE id = ?", (now, key))
+            return True
+
+    def _record(self, entries: Dict[str, str]) -> Dict[str, List[str]]:
+        """Indexes written entries and returns the evicted keys by job type."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (id, job_type, created_at, last_access, hits) VALUES (?, ?, ?, ?, 0)",
+                [(key, job_type, now, now) for key, job_type in entries.items()],
+            )
+            return self._evict_locked()
+
+    def _adopt(self, entries: List[Tuple[str, str, float]]) -> Dict[str, List[str]]:
+        """Indexes (key, job type, created_at) of entries cached before install, keeping known rows."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO llm_cache (id, job_type, created_at, last_access, hits) VALUES (?, ?, ?, ?, 0)",
+                [(key, job_type, created_at or now, created_at or now) for key, job_type, created_at in entries],
+            )
+            return self._evict_locked()
+
+    def _unindexed(self, keys: List[str]) -> List[str]:
+        known = set()
+        with self._lock:
+            for i in range(0, len(keys), _IN_BATCH):
+                batch = keys[i:i + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                known.update(row[0] for row in self._conn.execute(
+                    f"SELECT id FROM llm_cache WHERE id IN ({placeholders})", batch
+                ))
+        return [key for key in keys if key not in known]
+
+    def _evict_locked(self) -> Dict[str, List[str]]:
+        """Evicts expiring job types beyond max_entries; persistent job types never count."""
+        expiring = sorted(job_type for job_type, ttl in self.ttls.items() if ttl)
+        if not expiring:
+            return {}
+        placeholders = ",".join("?" * len(expiring))
+        count = self._conn.execute(
+            f"SELECT COUNT(*) FROM llm_cache WHERE job_type IN ({placeholders})", expiring
+        ).fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return {}
+        rows = self._conn.execute(
+            f"SELECT id, job_type FROM llm_cache WHERE job_type IN ({placeholders}) "
+            f"ORDER BY {EVICTION_ORDER[self.eviction]} LIMIT ?",
+            [*expiring, overflow],
+        ).fetchall()
+        self._remove_locked([key for key, _ in rows])
+        evicted: Dict[str, List[str]] = {}
+        for key, job_type in rows:
+            evicted.setdefault(job_type, []).append(key)
+        return evicted
+
+    def _remove_locked(self, keys: List[str]):
+        for i in range(0, len(keys), _IN_BATCH):
+            batch = keys[i:i + _IN_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM llm_cache WHERE id IN ({placeholders})", batch)
+
+    def _remove(self, keys: List[str]):
+        with self._lock, self._conn:
+            self._remove_locked(keys)
+
+    def _keys(self, job_type: Optional[str]) -> List[str]:
+        with self._lock:
+            if job_type is None:
+                rows = self._conn.execute("SELECT id FROM llm_cache").fetchall()
+            else:
+                rows = self._conn.execute("SELECT id FROM llm_cache WHERE job_type = ?", (job_type,)).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of indexed entries per job type."""
+        with self._lock:
+            rows = self._conn.execute("SELECT job_type, COUNT(*) FROM llm_cache GROUP BY job_type").fetchall()
+        return {job_type: count for job_type, count in rows}
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    # --- Storage wrappers ---
+    async def install(self, storage: Any):
+        """
+        Wraps get_by_id/upsert/delete/drop of a LightRAG llm_response_cache storage
+        and indexes the entries it already holds, so they are capped and purgeable too.
+        """
+        if self._storage is not None:
+            return
+        self._storage = storage
+        for name in ("get_by_id", "upsert", "delete", "drop"):
+            self._originals[name] = getattr(storage, name)
+        storage.get_by_id = self._get_by_id
+        storage.upsert = self._upsert
+        storage.delete = self._delete
+        storage.drop = self._drop
+        adopted = await self._index_existing()
+        logger.info(
+            f"LLM cache policy installed (max {self.max_entries} entries, {self.eviction}, TTLs {self.ttls}, "
+            f"{adopted} existing entries indexed)"
+        )
+
+    async def _stored_keys(self) -> List[str]:
+        storage = self._storage
+        if hasattr(storage, "get_keys_by_prefix"):
+            return await storage.get_keys_by_prefix("")
+        # JsonKVStorage keeps the whole namespace in memory
+        data = getattr(storage, "_data", None)
+        return list(data.keys()) if data is not None else []
+
+    async def _index_existing(self) -> int:
+        keys = await asyncio.to_thread(self._unindexed, await self._stored_keys())
+        for i in range(0, len(keys), _IN_BATCH):
+            batch = keys[i:i + _IN_BATCH]
+            values = await self._storage.get_by_ids(batch)
+            entries = [
+                (key, self.job_type_of(key, value), float((value or {}).get("create_time") or 0))
+                for key, value in zip(batch, values)
+            ]
+            evicted = await asyncio.to_thread(self._adopt, entries)
+            for job_type, evicted_keys in evicted.items():
+                await self._originals["delete"](evicted_keys)
+                self._emit(job_type, "eviction", len(evicted_keys))
+        if keys:
+            await self._storage.index_done_callback()
+        return len(keys)
+
+    async def _get_by_id(self, id: str) -> Optional[Dict[str, Any]]:
+        value = await self._originals["get_by_id"](id)
+        job_type = self.job_type_of(id, value)
+        if value is None:
+            self._emit(job_type, "miss")
+            return None
+        if not await asyncio.to_thread(self._touch, id, job_type):
+            await self._originals["delete"]([id])
+            self._emit(job_type, "expired")
+            self._emit(job_type, "miss")
+            return None
+        self._emit(job_type, "hit")
+        return value
+
+    async def _upsert(self, data: Dict[str, Dict[str, Any]]) -> None:
+        await self._originals["upsert"](data)
+        if not data:
+            return
+        entries = {key: self.job_type_of(key, value) for key, value in data.items()}
+        evicted = await asyncio.to_thread(self._record, entries)
+        for job_type, keys in evicted.items():
+            await self._originals["delete"](keys)
+            self._emit(job_type, "eviction", len(keys))
+
+    async def _delete(self, ids: List[str]) -> None:
+        await self._originals["delete"](ids)
+        await asyncio.to_thread(self._remove, list(ids))
+
+    async def _drop(self) -> Dict[str, str]:
+        result = await self._originals["drop"]()
+        await asyncio.to_thread(self._remove, self._keys(None))
+        return result
+
+    async def purge(self, job_type: Optional[str] = None) -> int:
+        """Deletes every cached response of a job type (all types if None). Returns the count."""
+        keys = await asyncio.to_thread(self._keys, job_type)
+        if keys and self._storage is not None:
+            await self._originals["delete"](keys)
+            await self._storage.index_done_callback()
+        await asyncio.to_thread(self._remove, keys)
+        logger.info(f"Purged {len(keys)} LLM cache entries (job type: {job_type or 'all'})")
+        return len(keys)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
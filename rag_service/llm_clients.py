@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from lazy_imports import lazy_import
+
+if TYPE_CHECKING:
+    import ollama
+    from openai import AsyncOpenAI
+
+# Provider SDKs are imported on first use, so a deployment only pays for the backends it calls
+logger = logging.getLogger(__name__)
+
+
+class AsyncOpenAIClientPool:
+    """
+    Registry of AsyncOpenAI clients keyed by (api_key, base_url).
+    Reusing a client keeps its HTTP connection pool (and TLS sessions) warm
+    across LLM and embedding calls. The registry is a bounded LRU; evicted
+    clients are closed after a grace period so in-flight requests can finish.
+    Pinned clients (the service's default key) live outside the LRU and are
+    never evicted.
+    """
+
+    def __init__(self, max_clients: int = 16, eviction_grace_seconds: float = 60.0):
+        self.max_clients = max(1, max_clients)
+        self.eviction_grace_seconds = eviction_grace_seconds
+        self._clients: "OrderedDict[Tuple[str, Optional[str]], AsyncOpenAI]" = OrderedDict()
+        self._pinned: "Dict[Tuple[str, Optional[str]], Optional[AsyncOpenAI]]" = {}
+        self._retired: List["AsyncOpenAI"] = []
+        # The event loop only holds weak references to tasks; keep pending closes alive
+        self._tasks: "Dict[asyncio.Task, AsyncOpenAI]" = {}
+        self._lock = threading.Lock()
+
+    def get(self, api_key: str, base_url: Optional[str] = None) -> "AsyncOpenAI":
+        key = (api_key, base_url or None)
+        with self._lock:
+            if key in self._pinned:
+                client = self._pinned[key]
+                if client is None:
+                    client = lazy_import("openai").AsyncOpenAI(api_key=api_key, base_url=base_url or None)
+                    self._pinned[key] = client
+                return client
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            client = lazy_import("openai").AsyncOpenAI(api_key=api_key, base_url=base_url or None)
+            self._clients[key] = client
+            evicted = []
+            while len(self._clients) > self.max_clients:
+                _, old_client = self._clients.popitem(last=False)
+                evicted.append(old_client)
+
+        for old_client in evicted:
+            self._retire(old_client)
+        return client
+
+    def pin(self, api_key: str, base_url: Optional[str] = None):
+        """
+        Keeps the client of this key open until aclose(), whatever other keys are used.
+        The client (and the openai SDK) is only created on the first get().
+        """
+        key = (api_key, base_url or None)
+        with self._lock:
+            self._pinned[key] = self._pinned.get(key) or self._clients.pop(key, None)
+
+    def _retire(self, client: "AsyncOpenAI"):
+        logger.info("Evicting least recently used OpenAI client")
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No running loop: close at shutdown instead
+            with self._lock:
+                self._retired.append(client)
+            return
+        task = loop.create_task(self._close_later(client))
+        self._tasks[task] = client
+        task.add_done_callback(lambda done: self._tasks.pop(done, None))
+
+    async def _close_later(self, client: "AsyncOpenAI"):
+        await asyncio.sleep(self.eviction_grace_seconds)
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close evicted OpenAI client: {e}")
+
+    def size(self) -> int:
+        return len(self._clients) + sum(1 for client in self._pinned.values() if client is not None)
+
+    def connection_count(self) -> int:
+        """Best-effort count of open HTTP connections across pooled clients."""
+        total = 0
+        with self._lock:
+            clients = list(self._clients.values()) + [c for c in self._pinned.values() if c is not None]
+        for client in clients:
+            try:
+                total += len(client._client._transport._pool.connections)
+            except AttributeError:
+                continue
+        return total
+
+    async def aclose(self):
+        with self._lock:
+            clients = list(self._clients.values()) + [c for c in self._pinned.values() if c is not None] + self._retired
+            self._clients.clear()
+            self._pinned.clear()
+            self._retired = []
+        # Evicted clients still in their grace period are closed now
+        pending = dict(self._tasks)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        clients.extend(pending.values())
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close OpenAI client: {e}")
+        logger.info(f"Closed {len(clients)} pooled OpenAI clients")
+
+
+class OllamaClientPool:
+    """
+    Registry of ollama.AsyncClient instances keyed by host, so local chat and
+    embedding calls share one HTTP connection pool instead of a client per call.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, "ollama.AsyncClient"] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> "ollama.AsyncClient":
+        with self._lock:
+            client = self._clients.get(host)
+            if client is None:
+                client = lazy_import("ollama").AsyncClient(host=host)
+                self._clients[host] = client
+            return client
+
+    def size(self) -> int:
+        return len(self._clients)
+
+    async def aclose(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            try:
+                await client._client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close Ollama client: {e}")
@@ -1,41 +1,62 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Body
+import time
+APP_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Body, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any, Union
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Dict, Any, Set, Tuple, Union
 import os
 import logging
 import shutil
 import json
 from pathlib import Path
 import glob
-from contextlib import asynccontextmanager
-from prometheus_client import Counter, Histogram, generate_latest
+from contextlib import asynccontextmanager, suppress
+from prometheus_client import Counter, Gauge, Histogram, generate_latest
 from prometheus_fastapi_instrumentator import Instrumentator
 import markdown_splitter
+from ingest_manifest import IngestManifest, compute_content_hash, sync_summary
+from job_queue import JobQueue, JobWorkerPool, current_job_id
+import document_extractor
+from llm_clients import AsyncOpenAIClientPool, OllamaClientPool
+from embedding_cache import EmbeddingCache
+from answer_cache import AnswerCache
+from doc_index import DocIndex
+from tag_store import TagStore
+from lazy_imports import import_report, record, timed_import
+from kv_group_commit import GroupCommit
+from llm_cache import LLMCachePolicy, parse_ttls
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- Resilience & Networking ---
-import socket
+import asyncio
 import time
+from urllib.parse import urlparse
 from tenacity import retry, stop_after_attempt, wait_fixed, before_sleep_log
 
-def wait_for_service(host: str, port: int, timeout: int = 300):
-    """Waits for a TCP service to be available."""
-    start_time = time.time()
+def service_address(uri: str, default_port: int) -> Tuple[str, int]:
+    """Host and port of a service URI such as bolt://neo4j:7687 or http://qdrant:6333."""
+    parsed = urlparse(uri if "://" in uri else f"//{uri}")
+    return parsed.hostname or "localhost", parsed.port or default_port
+
+async def wait_for_service(host: str, port: int, timeout: int = 300) -> bool:
+    """Waits for a TCP service to be available without blocking the event loop."""
+    deadline = time.monotonic() + timeout
     logger.info(f"Waiting for service at {host}:{port}...")
     while True:
         try:
-            with socket.create_connection((host, port), timeout=1):
-                logger.info(f"Service at {host}:{port} is available.")
-                return True
-        except (OSError, ConnectionRefusedError):
-            if time.time() - start_time > timeout:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=1)
+            writer.close()
+            logger.info(f"Service at {host}:{port} is available.")
+            return True
+        except (OSError, asyncio.TimeoutError):
+            if time.monotonic() > deadline:
                 logger.error(f"Timeout waiting for service at {host}:{port}")
                 return False
-            time.sleep(2)
+            await asyncio.sleep(2)
 
 
 # Configure logging
@@ -51,6 +72,65 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
 QDRANT_URL = os.getenv("QDRANT_URL", "http://qdrant:6333")
 TEMP_REPOS_DIR = "/app/temp_repos"
 
+# Ingestion Tuning
+# When enabled, all sections of a markdown file (or a whole repo) are submitted
+# to LightRAG in a single ainsert() call instead of one pipeline run per section.
+INGEST_BATCH_SECTIONS = os.getenv("INGEST_BATCH_SECTIONS", "true").lower() in ("true", "1", "yes", "on")
+# Number of repo files prepared concurrently, and of documents LightRAG processes in parallel
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "4"))
+
+# Ingestion Job Queue
+INGEST_QUEUE_DB = os.getenv("INGEST_QUEUE_DB", "/app/public_data/ingest_jobs.db")
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))  # Concurrent ingestion jobs
+INGEST_JOB_MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+
+# Reverse index of chunk -> doc and parent -> children, used for deletion
+DOC_INDEX_DB = os.getenv("DOC_INDEX_DB", "/app/public_data/doc_index.db")
+
+# Tag store (SQLite); TAGS_JSON is the pre-SQLite file, migrated once at startup
+TAG_DB = os.getenv("TAG_DB", "/app/public_data/tags.db")
+TAGS_JSON = os.getenv("TAGS_JSON", "/app/public_data/tags.json")
+
+# LLM Client Pool
+LLM_CLIENT_POOL_SIZE = int(os.getenv("LLM_CLIENT_POOL_SIZE", "16"))  # Distinct (api_key, base_url) clients kept alive
+
+# Local Models (Ollama)
+OLLAMA_DEFAULT_HOST = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # How long Ollama keeps the model loaded between calls
+OLLAMA_EMBED_BATCH_SIZE = int(os.getenv("OLLAMA_EMBED_BATCH_SIZE", "32"))  # Texts per /api/embed request
+OLLAMA_EMBED_CONCURRENCY = int(os.getenv("OLLAMA_EMBED_CONCURRENCY", "4"))  # Concurrent embed requests per call
+
+# Embedding Cache
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "/app/public_data/embedding_cache")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))  # Per model; ~6KB each at 1536 dims
+
+# LightRAG KV and doc status backend: "sqlite" (default, JSON files are migrated on first start) or "json"
+LIGHTRAG_KV_BACKEND = os.getenv("LIGHTRAG_KV_BACKEND", "sqlite").lower()
+
+# Group commit for LightRAG's JSON KV/doc-status files (written on a timer instead of after every insert)
+KV_GROUP_COMMIT_ENABLED = os.getenv("KV_GROUP_COMMIT_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+KV_FLUSH_INTERVAL = float(os.getenv("KV_FLUSH_INTERVAL", "30"))  # Seconds between flushes of dirty storages
+KV_FLUSH_EVERY_DOCS = int(os.getenv("KV_FLUSH_EVERY_DOCS", "50"))  # Also flush after this many inserted docs
+
+# Maximum number of source links returned with an answer
+QUERY_MAX_SOURCES = int(os.getenv("QUERY_MAX_SOURCES", "5"))
+QUERY_DISCONNECT_POLL_SECONDS = float(os.getenv("QUERY_DISCONNECT_POLL_SECONDS", "1.0"))  # How often an idle /query stream checks for a gone client
+
+# Answer Cache (complete /query responses, invalidated whenever the index changes)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))  # Seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# LLM Response Cache policy (bounds LightRAG's llm_response_cache; job types without a TTL never expire or get evicted)
+LLM_CACHE_POLICY_ENABLED = os.getenv("LLM_CACHE_POLICY_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+LLM_CACHE_INDEX_DB = os.getenv("LLM_CACHE_INDEX_DB", "/app/public_data/rag_index/llm_cache_index.db")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))  # Across job types that have a TTL
+LLM_CACHE_EVICTION = os.getenv("LLM_CACHE_EVICTION", "lru").lower()  # "lru" or "lfu"
+LLM_CACHE_TTLS = parse_ttls(os.getenv(
+    "LLM_CACHE_TTLS", "Answer Generation=3600,Keywords Extraction=86400"
+))  # "Job Type=seconds,..." using detect_llm_job() labels
+
 
 # --- Metrics ---
 LLM_CALLS_TOTAL = Counter(
@@ -73,6 +153,61 @@ RAG_QUERY_TOTAL = Counter(
     "Total number of RAG queries",
     ["mode", "status"]
 )
+RAG_QUERY_CANCELLED = Counter(
+    "rag_query_cancelled_total",
+    "RAG queries cancelled because the client disconnected",
+    ["mode"]
+)
+INGEST_QUEUE_DEPTH = Gauge(
+    "rag_ingest_queue_jobs",
+    "Number of ingestion jobs per state",
+    ["status"]
+)
+LLM_CLIENTS_ACTIVE = Gauge(
+    "llm_clients_active",
+    "Number of pooled AsyncOpenAI clients"
+)
+LLM_CLIENT_CONNECTIONS = Gauge(
+    "llm_client_connections",
+    "Number of open HTTP connections held by pooled AsyncOpenAI clients"
+)
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "embedding_cache_lookups_total",
+    "Embedding cache lookups",
+    ["model", "result"]
+)
+EMBEDDING_CACHE_ENTRIES = Gauge(
+    "embedding_cache_entries",
+    "Number of vectors held in the embedding cache"
+)
+KV_FLUSH_LATENCY = Histogram(
+    "rag_kv_flush_duration_seconds",
+    "Time to persist a LightRAG KV storage file",
+    ["storage"]
+)
+ANSWER_CACHE_LOOKUPS = Counter(
+    "answer_cache_lookups_total",
+    "Answer cache lookups",
+    ["result"]
+)
+ANSWER_CACHE_ENTRIES = Gauge(
+    "answer_cache_entries",
+    "Number of answers held in the answer cache"
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_response_cache_lookups_total",
+    "LightRAG LLM response cache lookups",
+    ["job_type", "result"]
+)
+LLM_CACHE_EVICTIONS = Counter(
+    "llm_response_cache_evictions_total",
+    "LightRAG LLM response cache entries removed by the size cap or TTL",
+    ["job_type", "reason"]
+)
+LLM_CACHE_ENTRIES = Gauge(
+    "llm_response_cache_entries",
+    "Number of entries tracked in the LightRAG LLM response cache"
+)
 
 # --- Models ---
 class IngestRequest(BaseModel):
@@ -99,9 +234,10 @@ class QueryRequest(BaseModel):
 # ... imports ...
 # --- RAG Engine ---
 # ... imports ...
-from lightrag import LightRAG, QueryParam
-from lightrag.utils import EmbeddingFunc
-import numpy as np
+with timed_import("lightrag"):
+    from lightrag import LightRAG, QueryParam
+    from lightrag.utils import EmbeddingFunc, compute_mdhash_id, make_relation_chunk_key
+    from lightrag.constants import GRAPH_FIELD_SEP
 
 # Monkeypatch EmbeddingFunc.__call__ to avoid Numpy ambiguity error and list attribute error
 # The original implementation likely checks "if result:" (fails on array) AND "result.size" (fails on list)
@@ -110,19 +246,54 @@ async def safe_embedding_call(self, *args, **kwargs):
     return await self.func(*args, **kwargs)
 
 EmbeddingFunc.__call__ = safe_embedding_call
+
+if LIGHTRAG_KV_BACKEND == "sqlite":
+    from sqlite_kv_storage import register_sqlite_storages
+    register_sqlite_storages()
+    KV_STORAGE, DOC_STATUS_STORAGE = "SQLiteKVStorage", "SQLiteDocStatusStorage"
+else:
+    KV_STORAGE, DOC_STATUS_STORAGE = "JsonKVStorage", "JsonDocStatusStorage"
 # Storage classes will be loaded by LightRAG via string names
-import numpy as np
 import os
-import pdfplumber
 # ... (previous imports)
 import asyncio
-from openai import OpenAI, AsyncOpenAI # Import AsyncOpenAI
-import ollama
 import time
 
 # Default API Key for public LLM
 default_api_key = os.getenv("OPENAI_API_KEY")
-default_openai_client = AsyncOpenAI(api_key=default_api_key) if default_api_key else None
+# One client per (api_key, base_url) so HTTP connections are reused across calls
+openai_clients = AsyncOpenAIClientPool(max_clients=LLM_CLIENT_POOL_SIZE)
+# Pinned: the fallback paths use this client, so the LRU must never close it
+if default_api_key:
+    openai_clients.pin(default_api_key)
+
+def default_openai_client():
+    """The client for OPENAI_API_KEY; created (and openai imported) on first use."""
+    return openai_clients.get(default_api_key) if default_api_key else None
+
+LLM_CLIENTS_ACTIVE.set_function(openai_clients.size)
+LLM_CLIENT_CONNECTIONS.set_function(openai_clients.connection_count)
+ollama_clients = OllamaClientPool()
+
+def ollama_host_from_url(base_url: Optional[str]) -> str:
+    """Ollama's native API lives at the server root, not under the OpenAI-compatible /v1 path."""
+    host = base_url
+    if host and "/v1" in host:
+        host = host.replace("/v1", "")
+    return host or OLLAMA_DEFAULT_HOST
+
+async def ollama_embed(client, model_name: str, texts: List[str]) -> List[List[float]]:
+    """Embeds texts in batches, with a bounded number of requests in flight."""
+    semaphore = asyncio.Semaphore(OLLAMA_EMBED_CONCURRENCY)
+    batches = [texts[i:i + OLLAMA_EMBED_BATCH_SIZE] for i in range(0, len(texts), OLLAMA_EMBED_BATCH_SIZE)]
+
+    async def embed_batch(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            response = await client.embed(model=model_name, input=batch, keep_alive=OLLAMA_KEEP_ALIVE)
+            return list(response['embeddings'])
+
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return [embedding for batch_result in results for embedding in batch_result]
 
 def extract_tag_from_request(tags: Dict) -> Optional[str]:
     if not tags:
@@ -130,6 +301,25 @@ def extract_tag_from_request(tags: Dict) -> Optional[str]:
     # Use the first value or a specific key like 'project'
     return tags.get("project") or next(iter(tags.values()), None)
 
+def sources_from_result(data: Dict[str, Any], limit: int) -> List[Dict[str, str]]:
+    """
+    Builds the sources list from the context the answer was generated from:
+    references first (LightRAG ranks them), then chunks, entities and relationships.
+    Only http(s) file paths are linkable; entity/relation paths may hold several, joined by GRAPH_FIELD_SEP.
+    """
+    sources = []
+    seen_urls = set()
+    for section in ("references", "chunks", "entities", "relationships"):
+        for item in data.get(section) or []:
+            for url in str(item.get("file_path") or "").split(GRAPH_FIELD_SEP):
+                url = url.strip()
+                if url.startswith("http") and url not in seen_urls:
+                    seen_urls.add(url)
+                    sources.append({"url": url, "title": url.split("/")[-1] or "Document"})
+                    if len(sources) >= limit:
+                        return sources
+    return sources
+
 # ...
 
 # Helper to identify RAG job from prompt
@@ -148,7 +338,7 @@ def detect_llm_job(prompt: str) -> str:
         return "Summary Generation"
     return "Unknown Job"
 
-async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwargs) -> str:
+async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwargs) -> Union[str, AsyncIterator[str]]:
     # Get config from context (set per request)
     config = request_llm_config.get()
     
@@ -192,29 +382,19 @@ async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwar
             pass
 
     # Helper to clean kwargs for OpenAI
+    stream = bool(kwargs.pop("stream", False))
     openai_kwargs = {k: v for k, v in kwargs.items() if k not in ['hashing_kv', 'mode', 'enable_cot', 'keyword_extraction', 'json_model']}
 
+    if stream:
+        # The caller consumes the tokens; metrics are recorded once the stream ends
+        return stream_llm_response(llm_type, model_name, job_type, messages, api_key, base_url, openai_kwargs)
+
     try:
         content = ""
         if llm_type == "local":
-            # Use native Ollama library
-            host = base_url
-            if host and "/v1" in host:
-                host = host.replace("/v1", "")
-            
-            # Default to docker host if empty
-            if not host:
-                host = "http://host.docker.internal:11434"
-
-            # Ollama client is sync, wrap in thread
-            client = ollama.Client(host=host)
-            # Use run_in_executor to avoid blocking the event loop
-            import functools
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(
-                None, 
-                functools.partial(client.chat, model=model_name, messages=messages)
-            )
+            # Use native async Ollama client, shared per host
+            client = ollama_clients.get(ollama_host_from_url(base_url))
+            response = await client.chat(model=model_name, messages=messages, keep_alive=OLLAMA_KEEP_ALIVE)
             content = response['message']['content']
             
         elif llm_type == "public":
@@ -222,9 +402,10 @@ async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwar
             if not key_to_use:
                  logger.error("Public LLM requested but no API Key provided.")
                  status = "error_missing_key"
+                 mark_llm_failed()
                  return "Error: Public LLM requires API Key."
             
-            client = AsyncOpenAI(api_key=key_to_use)
+            client = openai_clients.get(key_to_use)
             response = await client.chat.completions.create(
                 model=model_name,
                 messages=messages,
@@ -234,14 +415,16 @@ async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwar
             
         else:
              # Fallback
-             if default_openai_client:
-                response = await default_openai_client.chat.completions.create(
+             client = default_openai_client()
+             if client:
+                response = await client.chat.completions.create(
                     model=model_name,
                     messages=messages,
                     **openai_kwargs
                 )
                 content = response.choices[0].message.content
              else:
+                 mark_llm_failed()
                  return "Error: LLM Client not initialized."
 
         if config is not None:
@@ -256,6 +439,7 @@ async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwar
     except Exception as e:
         logger.error(f"LLM Call failed ({llm_type}/{model_name}): {e}", exc_info=True)
         status = "error_execution"
+        mark_llm_failed()
         return f"Error generating response: {e}"
         
     finally:
@@ -263,7 +447,106 @@ async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwar
         LLM_CALLS_TOTAL.labels(type=llm_type, model=model_name, status=status).inc()
         LLM_LATENCY.labels(type=llm_type, model=model_name).observe(duration)
 
-async def embedding_func(texts: list[str]) -> np.ndarray:
+def mark_llm_failed():
+    """
+    Flags the current request's LLM config: an LLM call returned error text instead of
+    an answer. /query never caches such responses.
+    """
+    config = request_llm_config.get()
+    if config is not None:
+        config["llm_failed"] = True
+
+async def stream_llm_response(llm_type: str, model_name: str, job_type: str, messages: List[Dict[str, Any]],
+                              api_key: Optional[str], base_url: Optional[str], openai_kwargs: Dict[str, Any]) -> AsyncIterator[str]:
+    """Streaming variant of llm_model_func: yields the answer text as the provider produces it."""
+    start_time = time.time()
+    status = "success"
+    content_len = 0
+    try:
+        if llm_type == "local":
+            client = ollama_clients.get(ollama_host_from_url(base_url))
+            async for part in await client.chat(model=model_name, messages=messages, keep_alive=OLLAMA_KEEP_ALIVE, stream=True):
+                delta = part['message']['content']
+                if delta:
+                    content_len += len(delta)
+                    yield delta
+            return
+
+        if llm_type == "public":
+            key_to_use = api_key or default_api_key
+            if not key_to_use:
+                logger.error("Public LLM requested but no API Key provided.")
+                status = "error_missing_key"
+                mark_llm_failed()
+                yield "Error: Public LLM requires API Key."
+                return
+            client = openai_clients.get(key_to_use)
+        else:
+            client = default_openai_client()
+            if not client:
+                mark_llm_failed()
+                yield "Error: LLM Client not initialized."
+                return
+
+        response = await client.chat.completions.create(model=model_name, messages=messages, stream=True, **openai_kwargs)
+        async for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                content_len += len(delta)
+                yield delta
+
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except Exception as e:
+        logger.error(f"LLM Stream failed ({llm_type}/{model_name}): {e}", exc_info=True)
+        status = "error_execution"
+        mark_llm_failed()
+        yield f"Error generating response: {e}"
+
+    finally:
+        duration = time.time() - start_time
+        logger.info(f"LLM Stream [End]: Job='{job_type}', Duration={duration:.2f}s, ResponseLen={content_len}, Status={status}")
+        LLM_CALLS_TOTAL.labels(type=llm_type, model=model_name, status=status).inc()
+        LLM_LATENCY.labels(type=llm_type, model=model_name).observe(duration)
+
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, max_entries=EMBEDDING_CACHE_MAX_ENTRIES) if EMBEDDING_CACHE_ENABLED else None
+if embedding_cache:
+    EMBEDDING_CACHE_ENTRIES.set_function(embedding_cache.size)
+
+answer_cache = AnswerCache(max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL) if ANSWER_CACHE_ENABLED else None
+if answer_cache:
+    ANSWER_CACHE_ENTRIES.set_function(answer_cache.size)
+
+kv_commit = GroupCommit(
+    interval=KV_FLUSH_INTERVAL,
+    every_docs=KV_FLUSH_EVERY_DOCS,
+    on_flush=lambda storage, seconds: KV_FLUSH_LATENCY.labels(storage=storage).observe(seconds),
+) if KV_GROUP_COMMIT_ENABLED else None
+
+def record_llm_cache_event(job_type: str, event: str, count: int):
+    if event in ("hit", "miss"):
+        LLM_CACHE_LOOKUPS.labels(job_type=job_type, result=event).inc(count)
+    else:
+        LLM_CACHE_EVICTIONS.labels(job_type=job_type, reason="ttl" if event == "expired" else "size").inc(count)
+
+llm_cache_policy = LLMCachePolicy(
+    LLM_CACHE_INDEX_DB,
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    ttls=LLM_CACHE_TTLS,
+    eviction=LLM_CACHE_EVICTION,
+    classify=detect_llm_job,
+    on_event=record_llm_cache_event,
+) if LLM_CACHE_POLICY_ENABLED else None
+if llm_cache_policy:
+    LLM_CACHE_ENTRIES.set_function(llm_cache_policy.size)
+
+def bump_index_version():
+    """Called after every ingest or delete so cached answers never outlive the index they came from."""
+    if answer_cache:
+        answer_cache.bump_version()
+
+async def embedding_func(texts: list[str]) -> List[List[float]]:
     config = request_llm_config.get()
     # Default to public (OpenAI) embedding unless explicitly set to local
     # This ensures compatibility with ingested data (which defaults to public)
@@ -281,30 +564,32 @@ async def embedding_func(texts: list[str]) -> np.ndarray:
         model_name = "all-minilm" 
     
     start_time = time.time()
-    logger.info(f"Embedding [Start]: Type={embedding_type}, Count={len(texts)}")
+
+    # Only texts that were never embedded with this model go to the provider
+    cached = await asyncio.to_thread(embedding_cache.get_many, model_name, texts) if embedding_cache else [None] * len(texts)
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+    if embedding_cache:
+        EMBEDDING_CACHE_LOOKUPS.labels(model=model_name, result="hit").inc(len(texts) - len(missing))
+        EMBEDDING_CACHE_LOOKUPS.labels(model=model_name, result="miss").inc(len(missing))
+    if not missing:
+        logger.info(f"Embedding [Cache]: Type={embedding_type}, Count={len(texts)} (all cached)")
+        return [vector.tolist() for vector in cached]
+    original_texts = texts
+    texts = [original_texts[i] for i in missing]
+
+    logger.info(f"Embedding [Start]: Type={embedding_type}, Count={len(texts)}, Cached={len(original_texts) - len(texts)}")
     
     try:
-        embeddings = []
         if embedding_type == "local":
-            host = base_url
-            if host and "/v1" in host:
-                host = host.replace("/v1", "")
-            if not host:
-                host = "http://host.docker.internal:11434"
-                
-            client = ollama.Client(host=host)
-            
-            for text in texts:
-                response = client.embeddings(model=model_name, prompt=text)
-                embeddings.append(response['embedding'])
-            result = embeddings # Return list, not numpy array
+            client = ollama_clients.get(ollama_host_from_url(base_url))
+            result = await ollama_embed(client, model_name, texts) # Return list, not numpy array
             
         elif embedding_type == "public":
             key_to_use = api_key or default_api_key
             if not key_to_use:
                 return [] # Empty list
             
-            client = AsyncOpenAI(api_key=key_to_use)
+            client = openai_clients.get(key_to_use)
             # OpenAI requires non-empty strings. Replace empty/None with space.
             processed_texts = [t if t and isinstance(t, str) and t.strip() else " " for t in texts]
             response = await client.embeddings.create(input=processed_texts, model=model_name)
@@ -312,16 +597,27 @@ async def embedding_func(texts: list[str]) -> np.ndarray:
             
         else:
              # Fallback/Other types if needed
-             if default_openai_client:
+             client = default_openai_client()
+             if client:
                  processed_texts = [t if t and isinstance(t, str) and t.strip() else " " for t in texts]
-                 response = await default_openai_client.embeddings.create(input=processed_texts, model=model_name)
+                 response = await client.embeddings.create(input=processed_texts, model=model_name)
                  result = [data.embedding for data in response.data]
              else:
                  result = []
              
         duration = time.time() - start_time
         logger.info(f"Embedding [Success]: Duration={duration:.2f}s")
-        return result
+        if len(result) != len(texts):
+            # result only covers the cache misses; a partial list would pair vectors with the wrong texts
+            logger.error(f"Embedding failed: provider returned {len(result)} vectors for {len(texts)} texts")
+            return []
+
+        if embedding_cache:
+            await asyncio.to_thread(embedding_cache.put_many, model_name, texts, result)
+        merged = [vector.tolist() if vector is not None else None for vector in cached]
+        for i, vector in zip(missing, result):
+            merged[i] = list(vector)
+        return merged
 
     except Exception as e:
         logger.error(f"Embedding failed: {e}")
@@ -329,50 +625,32 @@ async def embedding_func(texts: list[str]) -> np.ndarray:
         return []
 
 # --- Tag Manager ---
-class TagManager:
-    def __init__(self, filepath="/app/public_data/tags.json"):
-        self.filepath = filepath
-        self.tags = {} 
-        self._load_tags()
-
-    def _load_tags(self):
-        if not os.path.exists(self.filepath):
-            return
-        try:
-            with open(self.filepath, "r") as f:
-                self.tags = json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load tags: {e}")
-
-    def _save_tags(self):
-        try:
-            with open(self.filepath, "w") as f:
-                json.dump(self.tags, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to save tags: {e}")
+# Initialize global tag store (imports the legacy tags.json on first start)
+tag_manager = TagStore(TAG_DB, legacy_json_path=TAGS_JSON)
+doc_index = DocIndex(DOC_INDEX_DB)
 
-    def add_tag(self, tag: str, doc_id: str):
-        if tag not in self.tags:
-            self.tags[tag] = []
-        if doc_id not in self.tags[tag]:
-            self.tags[tag].append(doc_id)
-            self._save_tags()
+# Tags a query is restricted to (read by the Qdrant and Neo4j storages)
+query_tags: ContextVar[List[str] | None] = ContextVar('query_tags', default=None)
 
-    def get_docs(self, tag: str) -> List[str]:
-        return self.tags.get(tag, [])
-    
-    def remove_doc(self, tag: str, doc_id: str):
-        if tag in self.tags and doc_id in self.tags[tag]:
-             self.tags[tag].remove(doc_id)
-             if not self.tags[tag]:
-                 del self.tags[tag]
-             self._save_tags()
-
-# Initialize global TagManager
-tag_manager = TagManager()
+async def resolve_owners(chunk_ids: Iterable[str], doc_ids: Iterable[str] = ()) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Returns (chunk_id -> owning doc_id, doc_id -> tags) for the given chunks and documents.
 
-# Context variable to track current doc_id during ingestion
-current_doc_id: ContextVar[str | None] = ContextVar('current_doc_id', default=None)
+    The Qdrant and Neo4j storages stamp tags and doc_ids from this rather than from the
+    ingesting job's context: LightRAG's pipeline has one owner at a time, which may process
+    documents enqueued by another job while its own context is set.
+    """
+    chunk_ids = [chunk_id for chunk_id in dict.fromkeys(chunk_ids) if chunk_id]
+    owners: Dict[str, str] = {}
+    if chunk_ids and rag_engine.rag:
+        chunks = await rag_engine.rag.text_chunks.get_by_ids(chunk_ids)
+        owners = {
+            chunk_id: chunk["full_doc_id"]
+            for chunk_id, chunk in zip(chunk_ids, chunks)
+            if chunk and chunk.get("full_doc_id")
+        }
+    doc_tags = await tag_manager.tags_for_docs(set(doc_ids) | set(owners.values()))
+    return owners, doc_tags
 
 class RAGEngine:
     def __init__(self):
@@ -382,6 +660,22 @@ class RAGEngine:
         if not os.path.exists(self.working_dir):
             os.makedirs(self.working_dir)
 
+    async def backfill_tags(self):
+        """
+        Tags chunks, entities and relations ingested before tags were stored, from the
+        tag store's doc -> tag mapping. Runs once; a marker file records completion.
+        """
+        marker = os.path.join(self.working_dir, "tags_backfill.done")
+        if os.path.exists(marker):
+            return
+        storages = (self.rag.chunks_vdb, self.rag.entities_vdb, self.rag.relationships_vdb, self.rag.chunk_entity_relation_graph)
+        updated = 0
+        for storage in storages:
+            if hasattr(storage, "backfill_tags"):
+                updated += await storage.backfill_tags()
+        Path(marker).touch()
+        logger.info(f"Tag backfill complete: {updated} points, nodes and relations tagged")
+
     @retry(stop=stop_after_attempt(5), wait=wait_fixed(5), before_sleep=before_sleep_log(logger, logging.INFO))
     async def initialize_lightrag(self):
         logger.info(f"Initializing LightRAG in {self.working_dir}...")
@@ -407,13 +701,20 @@ class RAGEngine:
             ),
             # Using string names for automated loading
             graph_storage="Neo4JStorage",
-            vector_storage="QdrantVectorDBStorage"
+            vector_storage="QdrantVectorDBStorage",
+            kv_storage=KV_STORAGE,
+            doc_status_storage=DOC_STATUS_STORAGE,
+            max_parallel_insert=INGEST_MAX_WORKERS
         )
         
         # Explicitly initialize storages (Async)
         logger.info(f"Initializing LightRAG storages...")
         if hasattr(self.rag, "initialize_storages"):
             await self.rag.initialize_storages()
+        if kv_commit:
+            kv_commit.install(self.rag)
+        if llm_cache_policy:
+            await llm_cache_policy.install(self.rag.llm_response_cache)
         
         self.status = "ready"
         logger.info("LightRAG initialized successfully with Neo4j and Qdrant.")
@@ -429,6 +730,57 @@ class RAGEngine:
         
         return # Success
 
+    async def _wait_for_docs(self, doc_ids: List[str], poll_interval: float = 2.0, max_restarts: int = 3):
+        """
+        Waits until LightRAG has finished processing the given doc IDs.
+        ainsert() returns immediately when another job already owns the pipeline (it only flags
+        request_pending), so concurrent ingestion jobs must wait for their own documents.
+        """
+        from lightrag.kg.shared_storage import get_namespace_data
+
+        restarts = 0
+        while True:
+            statuses = await self.rag.doc_status.get_by_ids(doc_ids)
+            if isinstance(statuses, dict):
+                statuses = [statuses.get(doc_id) for doc_id in doc_ids]
+            unfinished = []
+            for doc_info in statuses:
+                doc_state = (doc_info or {}).get("status")
+                doc_state = getattr(doc_state, "value", doc_state)
+                if doc_state in ("pending", "processing"):
+                    unfinished.append(doc_info)
+            if not unfinished:
+                return statuses
+
+            pipeline_status = await get_namespace_data("pipeline_status", workspace=self.rag.workspace)
+            if pipeline_status.get("busy", False):
+                await asyncio.sleep(poll_interval)
+                continue
+
+            # Pipeline went idle with our documents still queued: drive it ourselves
+            if restarts >= max_restarts:
+                raise RuntimeError(f"{len(unfinished)} documents were left unprocessed by the LightRAG pipeline")
+            restarts += 1
+            await self.rag.apipeline_process_enqueue_documents()
+
+    async def _insert_and_wait(self, contents: Union[str, List[str]], ids: List[str], file_paths: Optional[List[str]] = None):
+        """
+        ainsert() followed by _wait_for_docs(), keeping the doc index current:
+        parent -> children is recorded at enqueue time, chunk -> doc once LightRAG has chunked the docs.
+        """
+        await doc_index.add_docs(ids)
+        try:
+            await self.rag.ainsert(contents, ids=ids, file_paths=file_paths)
+            statuses = await self._wait_for_docs(ids)
+        finally:
+            bump_index_version()
+        for sub_doc_id, doc_info in zip(ids, statuses):
+            chunks_list = (doc_info or {}).get("chunks_list") or []
+            if chunks_list:
+                await doc_index.set_chunks(sub_doc_id, chunks_list)
+        if kv_commit:
+            await kv_commit.note_docs(len(ids))
+
     async def ingest_file(self, file_path: str, doc_id: str, tags: Dict, url: Optional[str] = None):
         if self.status != "ready" or not self.rag:
             error_msg = f"Ingestion failed: RAG Engine not ready (Status: {self.status})"
@@ -438,12 +790,8 @@ class RAGEngine:
         logger.info(f"Ingesting file: {file_path} for doc: {doc_id}")
         content = ""
         try:
-            if file_path.endswith('.pdf'):
-                with pdfplumber.open(file_path) as pdf:
-                    content = "\n".join([page.extract_text() or "" for page in pdf.pages])
-            else:
-                 with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+            # PDF parsing runs in a process pool so the event loop keeps serving queries
+            content = await document_extractor.extract_text(file_path)
             
             if content:
                 token = request_llm_config.set({"type": "public"}) # Default to public/env for ingestion for now
@@ -452,22 +800,17 @@ class RAGEngine:
                     # CRITICAL: Pass doc_id to ainsert() to use our composite ID instead of MD5
                     # This ensures LightRAG stores the doc with our ID, making deletion possible
                     # Using async insert to ensure compatibility with async LLM function
-                    # Set doc_id in context for storage layers to access
-                    token_doc_id = current_doc_id.set(doc_id)
-                    try:
-                        # Pass ids=doc_id so LightRAG uses our composite ID
-                        await self.rag.ainsert(
-                            content, 
-                            ids=doc_id,  # Use composite ID like "parent#file.md"
-                            file_paths=[url] if url else None
-                        )
-                    finally:
-                        current_doc_id.reset(token_doc_id)
-                    
-                    # Register tag
+                    # Register tag first: storages look up the tags of each chunk's document
                     main_tag = extract_tag_from_request(tags)
                     if main_tag:
-                         tag_manager.add_tag(main_tag, doc_id)
+                         await tag_manager.add_tag(main_tag, doc_id)
+
+                    # Pass ids=doc_id so LightRAG uses our composite ID
+                    await self._insert_and_wait(
+                        content, 
+                        ids=[doc_id],  # Use composite ID like "parent#file.md"
+                        file_paths=[url] if url else None
+                    )
                          
                     logger.info(f"Inserted content successfully.")
                 finally:
@@ -479,17 +822,86 @@ class RAGEngine:
             logger.error(f"Error reading/ingesting file {file_path}: {e}")
             raise e
 
-    async def ingest_markdown_enhanced(self, file_path: str, doc_id: str, tags: Dict, base_url: Optional[str] = None):
+    def _prepare_markdown_sections(self, content: str, doc_id: str, base_url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Splits markdown content into ingestible sections.
+        Each section keeps its own composite sub-doc ID and deep-link URL.
+        """
+        sections = []
+        used_slugs = set()
+        for i, section in enumerate(markdown_splitter.split_markdown_by_headers(content)):
+            # Repeated headings get MkDocs-style suffixes so IDs stay unique and anchors still resolve
+            slug = markdown_splitter.unique_slug(section['slug'], used_slugs) if section['slug'] else ""
+            section_content = section['content']
+
+            if not section_content.strip():
+                continue
+
+            # 1. Generate Deep Link URL
+            if base_url:
+                section_url = f"{base_url}#{slug}" if slug else base_url
+            else:
+                section_url = None
+
+            # 2. Generate Unique Sub-Doc ID
+            sub_doc_id = f"{doc_id}#{slug}" if slug else f"{doc_id}#sect_{i}"
+
+            sections.append({
+                "id": sub_doc_id,
+                "header": section['header'],
+                "content": section_content,
+                "url": section_url,
+            })
+        return sections
+
+    async def _ainsert_sections(self, sections: List[Dict[str, Any]], doc_id: str, tags: Dict):
+        """
+        Inserts prepared sections into LightRAG with a single ainsert() call, so the whole
+        batch shares one enqueue -> process -> _insert_done cycle.
+
+        LightRAG silently drops documents whose content duplicates another document of the
+        same call, so repeated sections (shared boilerplate etc.) are deferred to a follow-up
+        call to keep every sub-doc ID.
+        """
+        # Register tag first: storages look up the tags of each chunk's document
+        main_tag = extract_tag_from_request(tags)
+        if main_tag:
+            await tag_manager.add_tags(main_tag, [section["id"] for section in sections])
+
+        remaining = list(sections)
+        while remaining:
+            batch, deferred, seen_contents = [], [], set()
+            for section in remaining:
+                key = section["content"].strip()
+                if key in seen_contents:
+                    deferred.append(section)
+                else:
+                    seen_contents.add(key)
+                    batch.append(section)
+
+            logger.info(f"Batch inserting {len(batch)} sections for {doc_id} ({len(deferred)} duplicates deferred)")
+            await self._insert_and_wait(
+                [section["content"] for section in batch],
+                ids=[section["id"] for section in batch],
+                file_paths=[section["url"] or "unknown_source" for section in batch]
+            )
+            remaining = deferred
+
+    async def ingest_markdown_enhanced(self, file_path: str, doc_id: str, tags: Dict, base_url: Optional[str] = None, batch: Optional[bool] = None):
         """
         Ingests a markdown file by splitting it into sections based on headers.
         Each section is ingested as a separate 'chunk' with its own deep-link URL.
+        With batch enabled (default: INGEST_BATCH_SECTIONS) all sections go through one LightRAG pipeline run.
         """
         if self.status != "ready" or not self.rag:
             error_msg = f"Ingestion failed: RAG Engine not ready (Status: {self.status})"
             logger.error(error_msg)
             raise RuntimeError(error_msg)
 
-        logger.info(f"Enhanced Ingestion for file: {file_path} (DocID: {doc_id})")
+        if batch is None:
+            batch = INGEST_BATCH_SECTIONS
+
+        logger.info(f"Enhanced Ingestion for file: {file_path} (DocID: {doc_id}, Batch: {batch})")
         
         try:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
@@ -500,49 +912,31 @@ class RAGEngine:
                  return
 
             # Split content by headers
-            sections = markdown_splitter.split_markdown_by_headers(content)
+            sections = self._prepare_markdown_sections(content, doc_id, base_url)
             logger.info(f"Split document into {len(sections)} sections.")
             
             token = request_llm_config.set({"type": "public"})
             
             try:
-                for i, section in enumerate(sections):
-                    header = section['header']
-                    slug = section['slug']
-                    section_content = section['content']
-                    
-                    if not section_content.strip():
-                        continue
-                        
-                    # 1. Generate Deep Link URL
-                    if base_url:
-                        if slug:
-                            section_url = f"{base_url}#{slug}"
-                        else:
-                            section_url = base_url
-                    else:
-                        section_url = None
-                        
-                    # 2. Generate Unique Sub-Doc ID
-                    sub_doc_id = f"{doc_id}#{slug}" if slug else f"{doc_id}#sect_{i}"
-                    
-                    logger.info(f"Ingesting Section '{header}' as {sub_doc_id} (URL: {section_url})")
-                    
-                    # Set doc_id in context for storage layers
-                    token_doc_id = current_doc_id.set(sub_doc_id)
-                    try:
-                        await self.rag.ainsert(
-                            section_content,
-                            ids=sub_doc_id, 
+                if batch:
+                    if sections:
+                        await self._ainsert_sections(sections, doc_id, tags)
+                else:
+                    for section in sections:
+                        sub_doc_id = section["id"]
+                        section_url = section["url"]
+                        logger.info(f"Ingesting Section '{section['header']}' as {sub_doc_id} (URL: {section_url})")
+
+                        # Register tag first: storages look up the tags of each chunk's document
+                        main_tag = extract_tag_from_request(tags)
+                        if main_tag:
+                             await tag_manager.add_tag(main_tag, sub_doc_id)
+
+                        await self._insert_and_wait(
+                            section["content"],
+                            ids=[sub_doc_id], 
                             file_paths=[section_url] if section_url else None
                         )
-                    finally:
-                        current_doc_id.reset(token_doc_id)
-                    
-                    # Register tag
-                    main_tag = extract_tag_from_request(tags)
-                    if main_tag:
-                         tag_manager.add_tag(main_tag, sub_doc_id)
 
                 logger.info(f"Finished enhanced ingestion for {file_path}")
 
@@ -553,6 +947,111 @@ class RAGEngine:
             logger.error(f"Error in enhanced ingestion for {file_path}: {e}")
             raise e
 
+    async def ingest_markdown_files(self, files: List[Dict[str, Any]], doc_id: str, tags: Dict, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Ingests several markdown files (e.g. a whole repo) through one batched LightRAG pipeline run.
+        Each entry of files is a dict with 'path', 'doc_id' and optional 'base_url' and 'content'.
+
+        Files are read and split by a pool of max_workers workers, then LightRAG processes them
+        with the max_parallel_insert set at initialization (INGEST_MAX_WORKERS). A failing file
+        never aborts the others; the returned summary reports the outcome of every file.
+        """
+        if self.status != "ready" or not self.rag:
+            error_msg = f"Ingestion failed: RAG Engine not ready (Status: {self.status})"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        max_workers = max(1, max_workers or INGEST_MAX_WORKERS)
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(max_workers)
+        file_results: Dict[str, Dict[str, Any]] = {}
+
+        def read_file(path: str) -> str:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read()
+
+        async def prepare_file(file_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                path = file_info["path"]
+                try:
+                    content = file_info.get("content")
+                    if content is None:
+                        content = await asyncio.to_thread(read_file, path)
+                    if not content:
+                        logger.warning(f"File {path} is empty, skipping.")
+                        file_results[path] = {"status": "skipped", "sections": 0}
+                        return []
+                    sections = self._prepare_markdown_sections(content, file_info["doc_id"], file_info.get("base_url"))
+                    file_results[path] = {"status": "pending", "sections": len(sections), "section_ids": [s["id"] for s in sections]}
+                    return sections
+                except Exception as e:
+                    logger.error(f"Failed to prepare {path}: {e}")
+                    file_results[path] = {"status": "failed", "sections": 0, "error": str(e)}
+                    return []
+
+        prepared = await asyncio.gather(*(prepare_file(file_info) for file_info in files))
+        sections = [section for file_sections in prepared for section in file_sections]
+        logger.info(f"Batched ingestion for {doc_id}: {len(files)} files, {len(sections)} sections, {max_workers} workers")
+
+        if sections:
+            token = request_llm_config.set({"type": "public"})
+            try:
+                await self._ainsert_sections(sections, doc_id, tags)
+            except Exception as e:
+                logger.error(f"Batched pipeline run failed for {doc_id}: {e}", exc_info=True)
+                for result in file_results.values():
+                    if result["status"] == "pending":
+                        result.update({"status": "failed", "error": str(e)})
+            finally:
+                request_llm_config.reset(token)
+
+            await self._resolve_file_results(file_results)
+
+        summary = {
+            "doc_id": doc_id,
+            "files_total": len(files),
+            "files_processed": sum(1 for r in file_results.values() if r["status"] == "processed"),
+            "files_failed": sum(1 for r in file_results.values() if r["status"] == "failed"),
+            "files_skipped": sum(1 for r in file_results.values() if r["status"] == "skipped"),
+            "sections_total": len(sections),
+            "duration_seconds": round(time.time() - start_time, 2),
+            "failed_files": {path: r.get("error") for path, r in file_results.items() if r["status"] == "failed"},
+        }
+        for result in file_results.values():
+            RAG_INGESTION_TOTAL.labels(type="git_file", status=result["status"]).inc()
+
+        logger.info(
+            f"Repo ingestion summary for {doc_id}: {summary['files_processed']}/{summary['files_total']} files processed, "
+            f"{summary['files_failed']} failed, {summary['files_skipped']} skipped, "
+            f"{summary['sections_total']} sections in {summary['duration_seconds']}s"
+        )
+        return summary
+
+    async def _resolve_file_results(self, file_results: Dict[str, Dict[str, Any]]):
+        """Derives each file's outcome from the LightRAG doc_status of its sections."""
+        pending = {path: r for path, r in file_results.items() if r["status"] == "pending"}
+        section_ids = [sid for r in pending.values() for sid in r["section_ids"]]
+        if not section_ids:
+            return
+
+        statuses = await self.rag.doc_status.get_by_ids(section_ids)
+        if isinstance(statuses, dict):
+            statuses = [statuses.get(sid) for sid in section_ids]
+        status_by_id = dict(zip(section_ids, statuses))
+
+        for path, result in pending.items():
+            errors = []
+            for sid in result["section_ids"]:
+                doc_info = status_by_id.get(sid) or {}
+                doc_state = doc_info.get("status")
+                doc_state = getattr(doc_state, "value", doc_state)  # DocStatus enum or plain string
+                if doc_state != "processed":
+                    errors.append(f"{sid}: {doc_info.get('error_msg') or doc_state or 'missing'}")
+            if errors:
+                result.update({"status": "failed", "error": "; ".join(errors[:5])})
+            else:
+                result["status"] = "processed"
+
     async def ingest_text(self, text: str, doc_id: str, tags: Dict):
         if self.status != "ready" or not self.rag:
             error_msg = f"Ingestion failed: RAG Engine not ready (Status: {self.status})"
@@ -564,12 +1063,12 @@ class RAGEngine:
              # Default config for ingestion
              token = request_llm_config.set({"type": "public"})
              try:
-                # CRITICAL: Pass ids=doc_id so LightRAG uses our doc_id instead of generating MD5
-                await self.rag.ainsert(text, ids=doc_id)
-                
                 main_tag = extract_tag_from_request(tags)
                 if main_tag:
-                     tag_manager.add_tag(main_tag, doc_id)
+                     await tag_manager.add_tag(main_tag, doc_id)
+
+                # CRITICAL: Pass ids=doc_id so LightRAG uses our doc_id instead of generating MD5
+                await self._insert_and_wait(text, ids=[doc_id])
                      
              finally:
                 request_llm_config.reset(token)
@@ -583,6 +1082,237 @@ class RAGEngine:
         logger.info(f"Querying: {query} with mode: {mode}")
         return self.rag.query(query, param=QueryParam(mode=mode))
 
+    async def _delete_graph_for_chunks(self, doc_ids: Set[str], chunk_ids: List[str]) -> bool:
+        """
+        Removes the graph data contributed by chunk_ids using LightRAG's reverse index:
+        full_entities/full_relations list what each document produced, and
+        entity_chunks/relation_chunks list the source chunks of each entity/relation.
+        Only entities and relations whose last source chunk is deleted are removed;
+        the others just drop the deleted chunks from their sources.
+        Cost is proportional to the document, not to the graph.
+        Returns False when the documents predate the index.
+        """
+        rag = self.rag
+        graph = rag.chunk_entity_relation_graph
+        doc_ids = list(doc_ids)
+        deleted_chunks = set(chunk_ids)
+
+        entity_names = set()
+        relation_pairs = set()
+        for record in await rag.full_entities.get_by_ids(doc_ids):
+            if record:
+                entity_names.update(record.get("entity_names", []))
+        for record in await rag.full_relations.get_by_ids(doc_ids):
+            if record:
+                relation_pairs.update(tuple(sorted(pair)) for pair in record.get("relation_pairs", []))
+        if not entity_names and not relation_pairs:
+            return False
+
+        def split_sources(record, fallback):
+            sources = (record or {}).get("chunk_ids") or []
+            if not sources and fallback and fallback.get("source_id"):
+                sources = [c for c in fallback["source_id"].split(GRAPH_FIELD_SEP) if c]
+            return sources
+
+        now = int(time.time())
+
+        # Relations
+        pairs = list(relation_pairs)
+        relation_keys = [make_relation_chunk_key(src, tgt) for src, tgt in pairs]
+        relation_records = await rag.relation_chunks.get_by_ids(relation_keys) if pairs else []
+        edges = await graph.get_edges_batch([{"src": src, "tgt": tgt} for src, tgt in pairs]) if pairs else {}
+        relations_to_delete, relation_updates = [], {}
+        for pair, record in zip(pairs, relation_records):
+            sources = split_sources(record, edges.get(pair))
+            remaining = [c for c in sources if c not in deleted_chunks]
+            if not remaining:
+                relations_to_delete.append(pair)
+            elif len(remaining) != len(sources):
+                relation_updates[pair] = remaining
+
+        # Entities
+        names = list(entity_names)
+        entity_records = await rag.entity_chunks.get_by_ids(names) if names else []
+        nodes = await graph.get_nodes_batch(names) if names else {}
+        entities_to_delete, entity_updates = [], {}
+        for name, record in zip(names, entity_records):
+            sources = split_sources(record, nodes.get(name))
+            remaining = [c for c in sources if c not in deleted_chunks]
+            if not remaining:
+                entities_to_delete.append(name)
+            elif len(remaining) != len(sources):
+                entity_updates[name] = remaining
+
+        if relations_to_delete:
+            await rag.relationships_vdb.delete([
+                rel_id
+                for src, tgt in relations_to_delete
+                for rel_id in (compute_mdhash_id(src + tgt, prefix="rel-"), compute_mdhash_id(tgt + src, prefix="rel-"))
+            ])
+            await graph.remove_edges(relations_to_delete)
+            await rag.relation_chunks.delete([make_relation_chunk_key(src, tgt) for src, tgt in relations_to_delete])
+
+        if entities_to_delete:
+            # Nodes are DETACH DELETEd, so edges to surviving entities go with them
+            await graph.remove_nodes(entities_to_delete)
+            await rag.entities_vdb.delete([compute_mdhash_id(name, prefix="ent-") for name in entities_to_delete])
+            await rag.entity_chunks.delete(entities_to_delete)
+
+        # Survivors keep their description; only their source chunk lists shrink
+        if relation_updates:
+            await rag.relation_chunks.upsert({
+                make_relation_chunk_key(src, tgt): {"chunk_ids": remaining, "count": len(remaining), "updated_at": now}
+                for (src, tgt), remaining in relation_updates.items()
+            })
+            await graph.upsert_edges_batch([
+                (src, tgt, {**edges[(src, tgt)], "source_id": GRAPH_FIELD_SEP.join(remaining)})
+                for (src, tgt), remaining in relation_updates.items()
+                if (src, tgt) in edges
+            ])
+        if entity_updates:
+            await rag.entity_chunks.upsert({
+                name: {"chunk_ids": remaining, "count": len(remaining), "updated_at": now}
+                for name, remaining in entity_updates.items()
+            })
+            await graph.upsert_nodes_batch({
+                name: {**nodes[name], "source_id": GRAPH_FIELD_SEP.join(remaining)}
+                for name, remaining in entity_updates.items()
+                if name in nodes
+            })
+
+        await rag.full_entities.delete(doc_ids)
+        await rag.full_relations.delete(doc_ids)
+        # Persist KV index changes
+        await rag._insert_done()
+
+        logger.info(
+            f"Graph cleanup: deleted {len(entities_to_delete)} entities and {len(relations_to_delete)} relations, "
+            f"updated sources of {len(entity_updates)} entities and {len(relation_updates)} relations"
+        )
+        return True
+
+    async def _delete_graph_legacy(self, doc_ids: List[str], chunk_ids: List[str], include_children: bool = False):
+        """
+        Fallback for documents ingested before the chunk index existed: deletes entity
+        vectors by doc_id and every node whose source_id mentions one of the chunks.
+        """
+        logger.info(f"Querying Neo4j for entities associated with {len(chunk_ids)} chunks")
+        if hasattr(self.rag.entities_vdb, 'delete_by_doc_ids'):
+            await self.rag.entities_vdb.delete_by_doc_ids(doc_ids, include_children=include_children)
+
+        try:
+            # Use Cypher query to find all nodes where source_id contains any of our chunk IDs
+            # In Neo4j, entities have source_id field that contains chunk IDs separated by GRAPH_FIELD_SEP
+            workspace_label = self.rag.chunk_entity_relation_graph._get_workspace_label()
+            
+            # Build a comprehensive deletion query
+            # 1. Find all nodes where source_id contains any of the chunk IDs
+            # 2. DETACH DELETE removes both the nodes and their relationships
+            async with self.rag.chunk_entity_relation_graph._driver.session(database=self.rag.chunk_entity_relation_graph._DATABASE) as session:
+                deleted_count = 0
+                
+                # Process in batches to avoid query size limits
+                batch_size = 50
+                for i in range(0, len(chunk_ids), batch_size):
+                    batch_chunks = chunk_ids[i:i+batch_size]
+                    
+                    # Create a pattern to match any chunk ID in source_id field
+                    # source_id is a string with chunk IDs separated by GRAPH_FIELD_SEP (typically '\x00')
+                    query = f"""
+                    MATCH (n:`{workspace_label}`)
+                    WHERE any(chunk_id IN $chunk_ids WHERE n.source_id CONTAINS chunk_id)
+                    DETACH DELETE n
+                    RETURN count(n) as deleted
+                    """
+                    
+                    result = await session.run(query, chunk_ids=batch_chunks)
+                    record = await result.single()
+                    if record:
+                        batch_deleted = record['deleted']
+                        deleted_count += batch_deleted
+                        logger.info(f"Deleted {batch_deleted} nodes in batch {i//batch_size + 1}")
+                
+                logger.info(f"Successfully deleted {deleted_count} entity nodes and their relationships from Neo4j")
+                
+        except Exception as e:
+            logger.error(f"Error deleting entities from Neo4j: {e}", exc_info=True)
+            # Continue with deletion even if Neo4j cleanup fails
+
+    async def delete_tree(self, doc_id: str, progress: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """
+        Deletes a document and all its sub-documents in one pass: every chunk, entity and
+        relation ID of the subtree is collected once and removed with one batched call per store.
+
+        Args:
+            doc_id: Parent document ID
+            progress: Optional async callback(stage, details) for reporting progress
+        """
+        if self.status != "ready" or not self.rag:
+            raise RuntimeError(f"Deletion failed: RAG Engine not ready (Status: {self.status})")
+
+        async def report(stage: str, **details):
+            logger.info(f"Deleting {doc_id}: {stage} {details}")
+            if progress:
+                await progress(stage, details)
+
+        # 1. Resolve the subtree
+        doc_ids = {doc_id} | await doc_index.children(doc_id)
+        if hasattr(self.rag.chunks_vdb, 'get_child_doc_ids'):
+            doc_ids.update(await self.rag.chunks_vdb.get_child_doc_ids(doc_id))
+        if hasattr(self.rag.doc_status, 'get_keys_by_prefix'):
+            doc_ids.update(await self.rag.doc_status.get_keys_by_prefix(f"{doc_id}#"))
+        chunk_ids = set(await doc_index.chunks_for_docs(doc_ids))
+        if hasattr(self.rag.chunks_vdb, 'get_ids_by_doc_ids'):
+            # Qdrant payloads also cover documents ingested before the doc index existed; matching
+            # every resolved doc_id catches points written before parent_doc_id was stored
+            chunk_ids.update(await self.rag.chunks_vdb.get_ids_by_doc_ids(sorted(doc_ids), include_children=True))
+        doc_ids = sorted(doc_ids)
+        # Chunk IDs are content hashes: a chunk another document still references (shared
+        # boilerplate, deferred duplicate sections) stays, only its subtree ownership goes
+        chunk_ids = sorted(chunk_ids)
+        shared = await doc_index.shared_chunks(chunk_ids, doc_ids)
+        subtree = set(doc_ids)
+        for chunk_id, chunk in zip(chunk_ids, await self.rag.text_chunks.get_by_ids(chunk_ids) if chunk_ids else []):
+            # Chunks ingested before the doc index only record their last writer
+            if chunk and chunk.get('full_doc_id') and chunk['full_doc_id'] not in subtree:
+                shared.add(chunk_id)
+        chunk_ids = [c for c in chunk_ids if c not in shared]
+        await report("collected", docs=len(doc_ids), chunks=len(chunk_ids), shared_chunks=len(shared))
+
+        try:
+            # 2. Graph: reference counted through the chunk index, legacy CONTAINS otherwise
+            graph_cleaned = False
+            if chunk_ids:
+                try:
+                    graph_cleaned = await self._delete_graph_for_chunks(set(doc_ids), chunk_ids)
+                except Exception as e:
+                    logger.error(f"Reference-counted graph deletion failed for {doc_id}: {e}", exc_info=True)
+                if not graph_cleaned:
+                    await self._delete_graph_legacy(doc_ids, chunk_ids, include_children=True)
+            await report("graph_deleted", chunks=len(chunk_ids))
+
+            # 3. Chunks: the subtree filter when nothing is shared, otherwise by ID so shared points survive
+            if shared:
+                await self.rag.chunks_vdb.delete(chunk_ids)
+            else:
+                await self.rag.chunks_vdb.delete_by_doc_ids(doc_ids, include_children=True)
+            if chunk_ids:
+                await self.rag.text_chunks.delete(chunk_ids)
+            await report("chunks_deleted", chunks=len(chunk_ids))
+
+            # 4. Tags, document storages and indexes
+            tags_removed = await tag_manager.remove_docs(doc_ids)
+            await self.rag.doc_status.delete(doc_ids)
+            await self.rag.full_docs.delete(doc_ids)
+            await self.rag._insert_done()
+            await doc_index.remove_docs(doc_ids)
+            IngestManifest(doc_id).delete()
+        finally:
+            bump_index_version()
+        await report("done", docs=len(doc_ids), chunks=len(chunk_ids), tags_removed=tags_removed)
+
+        return {"doc_id": doc_id, "total_deleted": len(doc_ids), "chunks_deleted": len(chunk_ids), "deleted_ids": doc_ids}
+
     async def delete_doc(self, doc_id: str):
         """Delete all data associated with a document ID from Neo4j and Qdrant
         
@@ -600,9 +1330,8 @@ class RAGEngine:
             from qdrant_client import models
             
             chunks_to_delete = []
-            entities_to_delete = set()
             
-            # Query chunks_vdb for all chunks with matching doc_id
+            # Query chunks_vdb for all chunks with matching doc_id (served by the doc_id payload index)
             if hasattr(self.rag, 'chunks_vdb') and hasattr(self.rag.chunks_vdb, '_client'):
                 logger.info(f"Querying Qdrant for chunks with doc_id: {doc_id}")
                 
@@ -618,12 +1347,12 @@ class RAGEngine:
                 
                 offset = None
                 while True:
-                    results = self.rag.chunks_vdb._client.scroll(
+                    results = await self.rag.chunks_vdb._client.scroll(
                         collection_name=self.rag.chunks_vdb.final_namespace,
                         scroll_filter=scroll_filter,
-                        limit=100,
+                        limit=1000,
                         offset=offset,
-                        with_payload=True,
+                        with_payload=['id'],
                         with_vectors=False
                     )
                     
@@ -631,17 +1360,12 @@ class RAGEngine:
                     if not points:
                         break
                     
-                    # Collect chunk IDs and entity names
+                    # Collect chunk IDs for the Neo4j cleanup below
                     for point in points:
                         if point.payload:
                             chunk_id = point.payload.get('id')
                             if chunk_id:
                                 chunks_to_delete.append(chunk_id)
-                            
-                            # Extract entity names from chunk content if available
-                            # Entities are typically stored with entity_name field
-                            content = point.payload.get('content', '')
-                            # We'll delete entities separately via entity_vdb query
                     
                     if next_offset is None:
                         break
@@ -649,114 +1373,33 @@ class RAGEngine:
                 
                 logger.info(f"Found {len(chunks_to_delete)} chunks to delete")
             
-            # Step 2: Query entities_vdb for entities associated with this doc
-            if hasattr(self.rag, 'entities_vdb') and hasattr(self.rag.entities_vdb, '_client'):
-                logger.info(f"Querying Qdrant for entities with doc_id: {doc_id}")
-                
-                entity_scroll_filter = models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="doc_id",
-                            match=models.MatchValue(value=doc_id)
-                        )
-                    ]
-                )
-                
-                offset = None
-                entity_ids_to_delete = []
-                while True:
-                    results = self.rag.entities_vdb._client.scroll(
-                        collection_name=self.rag.entities_vdb.final_namespace,
-                        scroll_filter=entity_scroll_filter,
-                        limit=100,
-                        offset=offset,
-                        with_payload=True,
-                        with_vectors=False
-                    )
-                    
-                    points, next_offset = results
-                    if not points:
-                        break
-                    
-                    for point in points:
-                        if point.payload:
-                            entity_id = point.payload.get('id')
-                            entity_name = point.payload.get('entity_name')
-                            if entity_id:
-                                entity_ids_to_delete.append(entity_id)
-                            if entity_name:
-                                entities_to_delete.add(entity_name)
-                    
-                    if next_offset is None:
-                        break
-                    offset = next_offset
-                
-                logger.info(f"Found {len(entity_ids_to_delete)} entity vectors and {len(entities_to_delete)} unique entities")
-                
-                # Delete entity vectors from Qdrant
-                if entity_ids_to_delete:
-                    await self.rag.entities_vdb.delete(entity_ids_to_delete)
-                    logger.info(f"Deleted {len(entity_ids_to_delete)} entity vectors from Qdrant")
-            
-            # Step 3: Delete chunks from Qdrant
-            if chunks_to_delete:
-                await self.rag.chunks_vdb.delete(chunks_to_delete)
-                logger.info(f"Deleted {len(chunks_to_delete)} chunks from Qdrant")
-            
-            # Step 4: Delete entity nodes and relationships from Neo4j comprehensively
-            # Query Neo4j directly for all entities associated with these chunks
+            # Step 2: Remove graph data contributed by these chunks, reference counted through
+            # LightRAG's entity/relation chunk index. Shared entities survive.
+            graph_cleaned = False
             if chunks_to_delete and hasattr(self.rag, 'chunk_entity_relation_graph'):
-                logger.info(f"Querying Neo4j for entities associated with {len(chunks_to_delete)} chunks")
-                
                 try:
-                    # Use Cypher query to find all nodes where source_id contains any of our chunk IDs
-                    # In Neo4j, entities have source_id field that contains chunk IDs separated by GRAPH_FIELD_SEP
-                    workspace_label = self.rag.chunk_entity_relation_graph._get_workspace_label()
-                    
-                    # Build a comprehensive deletion query
-                    # 1. Find all nodes where source_id contains any of the chunk IDs
-                    # 2. DETACH DELETE removes both the nodes and their relationships
-                    async with self.rag.chunk_entity_relation_graph._driver.session(database=self.rag.chunk_entity_relation_graph._DATABASE) as session:
-                        deleted_count = 0
-                        
-                        # Process in batches to avoid query size limits
-                        batch_size = 50
-                        for i in range(0, len(chunks_to_delete), batch_size):
-                            batch_chunks = chunks_to_delete[i:i+batch_size]
-                            
-                            # Create a pattern to match any chunk ID in source_id field
-                            # source_id is a string with chunk IDs separated by GRAPH_FIELD_SEP (typically '\x00')
-                            query = f"""
-                            MATCH (n:`{workspace_label}`)
-                            WHERE any(chunk_id IN $chunk_ids WHERE n.source_id CONTAINS chunk_id)
-                            DETACH DELETE n
-                            RETURN count(n) as deleted
-                            """
-                            
-                            result = await session.run(query, chunk_ids=batch_chunks)
-                            record = await result.single()
-                            if record:
-                                batch_deleted = record['deleted']
-                                deleted_count += batch_deleted
-                                logger.info(f"Deleted {batch_deleted} nodes in batch {i//batch_size + 1}")
-                        
-                        logger.info(f"Successfully deleted {deleted_count} entity nodes and their relationships from Neo4j")
-                        
+                    owner_doc_ids = {doc_id}
+                    for chunk in await self.rag.text_chunks.get_by_ids(chunks_to_delete):
+                        if chunk and chunk.get('full_doc_id'):
+                            owner_doc_ids.add(chunk['full_doc_id'])
+                    graph_cleaned = await self._delete_graph_for_chunks(owner_doc_ids, chunks_to_delete)
                 except Exception as e:
-                    logger.error(f"Error deleting entities from Neo4j: {e}", exc_info=True)
-                    # Continue with deletion even if Neo4j cleanup fails
+                    logger.error(f"Reference-counted graph deletion failed for {doc_id}: {e}", exc_info=True)
             
+            # Step 3: Delete chunks from Qdrant and the chunk KV store
+            if chunks_to_delete:
+                await self.rag.chunks_vdb.delete_by_doc_ids([doc_id])
+                await self.rag.text_chunks.delete(chunks_to_delete)
+                logger.info(f"Deleted {len(chunks_to_delete)} chunks from Qdrant")
             
-            # Step 5: Remove from tag manager
-            # Find all tags containing this doc_id and remove it
-            tags_to_update = []
-            for tag, doc_ids in tag_manager.tags.items():
-                if doc_id in doc_ids:
-                    tags_to_update.append(tag)
+            # Step 4: Legacy fallback for documents ingested before the chunk index existed
+            if chunks_to_delete and not graph_cleaned and hasattr(self.rag, 'chunk_entity_relation_graph'):
+                await self._delete_graph_legacy([doc_id], chunks_to_delete)
             
-            for tag in tags_to_update:
-                tag_manager.remove_doc(tag, doc_id)
-                logger.info(f"Removed doc_id {doc_id} from tag: {tag}")
+            # Step 5: Remove from tag store (indexed by doc_id)
+            tags_removed = await tag_manager.remove_docs([doc_id])
+            if tags_removed:
+                logger.info(f"Removed doc_id {doc_id} from {tags_removed} tags")
             
             # Step 6: Delete from LightRAG's doc_status and full_docs storage
             # This prevents "already exists" errors when re-uploading the same document
@@ -770,44 +1413,16 @@ class RAGEngine:
                     all_doc_ids_to_delete.add(doc_id)
                     logger.info(f"Will delete doc_id: {doc_id}")
                     
-                    # SECOND: Find ALL MD5-based doc IDs by scanning doc_status storage
-                    # We need to check EVERY doc in storage to find which ones should be deleted
-                    logger.info(f"Scanning all doc_status entries to find MD5 doc IDs...")
+                    # SECOND: Any other doc (e.g. MD5-based IDs) that produced one of our chunks,
+                    # resolved through the chunk -> doc index instead of scanning doc_status
                     try:
-                        # Get all keys from doc_status storage
-                        all_storage_keys = await self.rag.doc_status.get_all_keys()
-                        logger.info(f"Total doc_status entries: {len(all_storage_keys)}")
-                        
-                        # Get all doc info for these keys
-                        doc_status_dict = await self.rag.doc_status.get_by_ids(list(all_storage_keys))
-                        
-                        # Scan through all doc entries to find ones that should be deleted
-                        for storage_doc_id, doc_info in doc_status_dict.items():
-                            should_delete = False
-                            
-                            # Check if this is the exact doc_id we want to delete
-                            if storage_doc_id == doc_id:
-                                should_delete = True
-                                logger.info(f"Found exact match: {storage_doc_id}")
-                            
-                            # Check if this doc contains any of our deleted chunks
-                            elif doc_info and isinstance(doc_info, dict):
-                                chunks_list = doc_info.get('chunks_list', [])
-                                if isinstance(chunks_list, list) and chunks_to_delete:
-                                    # If ANY chunk from this doc is in our deletion list, delete the whole doc
-                                    if any(chunk_id in chunks_list for chunk_id in chunks_to_delete):
-                                        should_delete = True
-                                        matching_chunks = [c for c in chunks_list if c in chunks_to_delete]
-                                        logger.info(f"Found MD5 doc with matching chunks: {storage_doc_id} ({len(matching_chunks)} chunks)")
-                            
-                            if should_delete:
-                                all_doc_ids_to_delete.add(storage_doc_id)
-                        
-                        logger.info(f"Total doc IDs to delete from storage: {len(all_doc_ids_to_delete)}")
-                        
+                        if chunks_to_delete:
+                            chunk_owners = await doc_index.docs_for_chunks(chunks_to_delete)
+                            all_doc_ids_to_delete.update(chunk_owners)
+                            logger.info(f"Found {len(chunk_owners)} docs owning the deleted chunks")
                     except Exception as e:
-                        logger.warning(f"Could not scan doc_status storage: {e}", exc_info=True)
-                        # Even if scanning fails, we still try to delete the doc_id directly
+                        logger.warning(f"Could not query the doc index: {e}", exc_info=True)
+                        # Even if the lookup fails, we still try to delete the doc_id directly
                     
                     # Delete ALL collected doc IDs from both doc_status and full_docs
                     if all_doc_ids_to_delete:
@@ -816,6 +1431,7 @@ class RAGEngine:
                         
                         await self.rag.doc_status.delete(doc_ids_list)
                         await self.rag.full_docs.delete(doc_ids_list)
+                        await doc_index.remove_docs(doc_ids_list)
                         
                         logger.info(f"Successfully deleted {len(doc_ids_list)} doc entries from storage: {doc_ids_list}")
                     else:
@@ -829,51 +1445,73 @@ class RAGEngine:
         except Exception as e:
             logger.error(f"Error during deletion of doc_id {doc_id}: {e}", exc_info=True)
             raise
+        finally:
+            bump_index_version()
 
 rag_engine = RAGEngine()
 
+async def start_rag_engine():
+    """Waits for Neo4j and Qdrant in parallel, then initializes the RAG engine."""
+    services = {
+        "Neo4j": service_address(NEO4J_URI, 7687),
+        "Qdrant": service_address(QDRANT_URL, 6333),
+    }
+    reachable = await asyncio.gather(*(wait_for_service(host, port) for host, port in services.values()))
+    unreachable = [f"{name} at {host}:{port}" for (name, (host, port)), ok in zip(services.items(), reachable) if not ok]
+
+    if unreachable:
+        logger.error(f"Dependent services are not reachable ({', '.join(unreachable)}). RAG Engine initialization skipped.")
+        rag_engine.status = "error"
+        return
+
+    logger.info("All dependent services are reachable. Initializing RAG Engine...")
+    try:
+         started = time.perf_counter()
+         await rag_engine.initialize_lightrag()
+         record("rag_engine_init", time.perf_counter() - started)
+    except Exception as e:
+         logger.error(f"Failed to initialize RAG Engine despite services being ready: {e}")
+         rag_engine.status = "error"
+         return
+
+    # One-shot migration for content ingested before tag-scoped retrieval; the engine is already serving
+    try:
+        await rag_engine.backfill_tags()
+    except Exception as e:
+        logger.error(f"Tag backfill failed, will retry on next start: {e}", exc_info=True)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    logger.info("Application startup: Waiting for dependent services...")
-    
-    # Extract host/port from env vars
-    neo4j_host = "neo4j"
-    neo4j_port = 7687 
-    # Can parse from NEO4J_URI if needed, but simple default is fine for now
-    
-    qdrant_host = "qdrant"
-    qdrant_port = 6333 # Default
-    
-    # Wait for services
-    services_ready = True
-    if not wait_for_service(neo4j_host, neo4j_port):
-        logger.error(f"Neo4j at {neo4j_host}:{neo4j_port} is not reachable.")
-        services_ready = False
-    
-    if not wait_for_service(qdrant_host, qdrant_port):
-        logger.error(f"Qdrant at {qdrant_host}:{qdrant_port} is not reachable.")
-        services_ready = False
-        
-    if services_ready:
-        logger.info("All dependent services are reachable. Initializing RAG Engine...")
-        try:
-             await rag_engine.initialize_lightrag()
-        except Exception as e:
-             logger.error(f"Failed to initialize RAG Engine despite services being ready: {e}")
-             rag_engine.status = "error"
-    else:
-        logger.error("Dependent services are not ready. RAG Engine initialization skipped.")
-        rag_engine.status = "error"
+    # Startup: serve requests right away and report "initializing" until storages are ready
+    logger.info("Application startup: Initializing RAG Engine in the background...")
+    engine_init = asyncio.create_task(start_rag_engine())
+
+    # Workers only claim jobs once the engine is ready; queued jobs survive restarts
+    await ingest_workers.start()
         
     yield
     # Shutdown
     logger.info("Application shutdown...")
+    if not engine_init.done():
+        engine_init.cancel()
+        # Let the Neo4j/Qdrant probes unwind before the storages are finalized
+        with suppress(asyncio.CancelledError):
+            await engine_init
+    await ingest_workers.stop()
+    document_extractor.shutdown_executor()
+    if kv_commit:
+        await kv_commit.aclose()
     if rag_engine.rag:
         # Check for finalize method on LightRAG or storages if available
         # LightRAG v2 might have finalize_storages
         if hasattr(rag_engine.rag, "finalize_storages"):
              await rag_engine.rag.finalize_storages()
+    await openai_clients.aclose()
+    await ollama_clients.aclose()
+    if embedding_cache:
+        embedding_cache.save()
+    if llm_cache_policy:
+        llm_cache_policy.close()
 
 app = FastAPI(title="RAG Service", description="API for RAG ingestion and querying", lifespan=lifespan)
 
@@ -881,8 +1519,100 @@ app = FastAPI(title="RAG Service", description="API for RAG ingestion and queryi
 Instrumentator().instrument(app).expose(app)
 
 # --- Background Tasks ---
-async def process_ingestion(request: IngestRequest):
+async def ingest_git_repo(request: IngestRequest, repo_path: Path) -> Dict[str, Any]:
+    """
+    Incrementally ingests the markdown files of a repo against the doc's manifest.
+    Unchanged files are skipped, sections of changed or removed files are deleted
+    and only new content is inserted. Returns the per-repo summary (see sync_summary).
+    """
+    manifest = IngestManifest(request.doc_id)
+    md_files = list(repo_path.rglob("*.md"))
+    logger.info(f"Found {len(md_files)} markdown files in {repo_path}")
+
+    files = {}
+    for md_file in md_files:
+        relative_path = md_file.relative_to(repo_path).as_posix()
+        try:
+            # MkDocs uses simplified URLs: file.md -> file/
+            # If file is index.md, it maps to parent folder.
+            # Let's try to match MkDocs default behavior for the base URL.
+            
+            url_path = relative_path.replace('.md', '/')
+            if url_path.endswith('index/'):
+                url_path = url_path[:-6] # remove 'index/' to get parent/
+            
+            web_url = f"http://localhost:3001/docs/{request.doc_id}/{url_path}"
+        except Exception as e:
+            logger.warning(f"Failed to construct URL for {md_file}: {e}")
+            web_url = None
+
+        # Composite ID for the FILE (parent)
+        # We use this as prefix for sections
+        file_doc_id = f"{request.doc_id}#{relative_path}"
+
+        content = await asyncio.to_thread(md_file.read_text, encoding='utf-8', errors='ignore')
+        files[relative_path] = {
+            "path": str(md_file),
+            "doc_id": file_doc_id,
+            "base_url": web_url,
+            "content": content,
+            "hash": compute_content_hash(content),
+        }
+
+    changes = manifest.diff({path: info["hash"] for path, info in files.items()})
+    logger.info(
+        f"Manifest diff for {request.doc_id}: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+        f"{len(changes['removed'])} removed, {len(changes['unchanged'])} unchanged"
+    )
+
+    # Drop the sections of changed and removed files before inserting new content
+    for path in changes["changed"] + changes["removed"]:
+        for section_id in manifest.section_ids(path):
+            await rag_engine.delete_doc(section_id)
+        manifest.remove_file(path)
+    manifest.save()
+
+    to_ingest = changes["added"] + changes["changed"]
+    failed_paths = set()
+    batch_summary = {}
+    if INGEST_BATCH_SECTIONS:
+        if to_ingest:
+            # Submit every new section of the repo as one LightRAG pipeline run
+            batch_summary = await rag_engine.ingest_markdown_files([files[path] for path in to_ingest], request.doc_id, request.tags or {})
+            failed_paths = set(batch_summary["failed_files"])
+    else:
+        for path in to_ingest:
+            info = files[path]
+            logger.info(f"Processing file: {info['path']} (Doc ID: {info['doc_id']})")
+            try:
+                await rag_engine.ingest_markdown_enhanced(info["path"], info["doc_id"], request.tags or {}, base_url=info["base_url"], batch=False)
+            except Exception as e:
+                logger.error(f"Failed to ingest {info['path']}: {e}")
+                failed_paths.add(info["path"])
+
+    # Failed files stay out of the manifest so the next sync retries them
+    for path in to_ingest:
+        info = files[path]
+        if info["path"] in failed_paths:
+            continue
+        section_ids = [section["id"] for section in rag_engine._prepare_markdown_sections(info["content"], info["doc_id"])]
+        manifest.update_file(path, info["hash"], section_ids)
+    manifest.save()
+
+    summary = sync_summary(changes, [path for path in to_ingest if files[path]["path"] in failed_paths])
+    if batch_summary:
+        summary["sections_total"] = batch_summary["sections_total"]
+        summary["duration_seconds"] = batch_summary["duration_seconds"]
+    if failed_paths:
+        logger.warning(f"Repo {request.doc_id} ingested with {len(failed_paths)} failed files: {sorted(failed_paths)}")
+    return summary
+
+async def process_ingestion(request: IngestRequest) -> Dict[str, Any]:
+    """
+    Runs one ingestion request. Raises on failure so the job queue can record and retry it.
+    """
     logger.info(f"Starting ingestion task for DocID: {request.doc_id}, Type: {request.type}")
+    result = {"doc_id": request.doc_id, "type": request.type}
     try: 
         if request.type == 'git':
             # request.local_path should be the repo folder name in temp_repos, e.g. "repo-uuid"
@@ -891,37 +1621,20 @@ async def process_ingestion(request: IngestRequest):
             if not repo_path.exists():
                 logger.error(f"Repo path not found: {repo_path}")
                 RAG_INGESTION_TOTAL.labels(type=request.type, status="error_path_not_found").inc()
-                return
-
-            md_files = list(repo_path.rglob("*.md"))
-            logger.info(f"Found {len(md_files)} markdown files in {repo_path}")
-            
-            for md_file in md_files:
-                logger.info(f"Processing file: {md_file}")
-                try:
-                    relative_path = md_file.relative_to(repo_path).as_posix()
-                    # MkDocs uses simplified URLs: file.md -> file/
-                    # If file is index.md, it maps to parent folder.
-                    # Let's try to match MkDocs default behavior for the base URL.
-                    
-                    url_path = relative_path.replace('.md', '/')
-                    if url_path.endswith('index/'):
-                        url_path = url_path[:-6] # remove 'index/' to get parent/
-                    
-                    web_url = f"http://localhost:3001/docs/{request.doc_id}/{url_path}"
-                    
-                    # Composite ID for the FILE (parent)
-                    # We use this as prefix for sections
-                    file_doc_id = f"{request.doc_id}#{relative_path}"
-                    logger.info(f"Using File Doc ID: {file_doc_id} (Base URL: {web_url})")
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to construct URL for {md_file}: {e}")
-                    web_url = None
-                    file_doc_id = request.doc_id
-
-                # Use Enhanced Ingestion for Markdown
-                await rag_engine.ingest_markdown_enhanced(str(md_file), file_doc_id, request.tags or {}, base_url=web_url)
+                raise FileNotFoundError(f"Repo path not found: {repo_path}")
+
+            summary = await ingest_git_repo(request, repo_path)
+            result.update(summary)
+            if summary["failed"]:
+                RAG_INGESTION_TOTAL.labels(type=request.type, status="partial").inc()
+                # A failed job keeps no result; leave the summary on the job's progress
+                job_id = current_job_id.get()
+                if job_id:
+                    await ingest_queue.set_progress(job_id, {"stage": "partial", **summary})
+                # Retrying is cheap: the manifest skips every file that already made it in
+                raise RuntimeError(
+                    f"{summary['failed']} files of repo {request.doc_id} failed to ingest: {summary['failed_files']}"
+                )
                 
         elif request.type == 'file':
              # ... (existing logic for file)
@@ -940,7 +1653,7 @@ async def process_ingestion(request: IngestRequest):
              if not file_path.exists():
                  logger.error(f"File path not found: {file_path}")
                  RAG_INGESTION_TOTAL.labels(type=request.type, status="error_file_missing").inc()
-                 return
+                 raise FileNotFoundError(f"File path not found: {file_path}")
 
              logger.info(f"Processing single file: {file_path}")
              # Construct Web URL for single file
@@ -959,11 +1672,47 @@ async def process_ingestion(request: IngestRequest):
         
         logger.info(f"Ingestion completed successfully for {request.doc_id}")
         RAG_INGESTION_TOTAL.labels(type=request.type, status="success").inc()
+        return result
         
+    except (FileNotFoundError, RuntimeError):
+        raise
     except Exception as e:
+        # A failed job must not flip the global engine status; the job records the error
         logger.error(f"Ingestion failed with exception: {e}", exc_info=True)
-        rag_engine.status = "error"
         RAG_INGESTION_TOTAL.labels(type=request.type, status="error_exception").inc()
+        raise
+
+async def run_ingest_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    request = IngestRequest(**payload)
+    try:
+        return await process_ingestion(request)
+    finally:
+        if kv_commit:
+            await kv_commit.flush()
+
+async def run_delete_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    job_id = current_job_id.get()
+
+    async def progress(stage: str, details: Dict[str, Any]):
+        if job_id:
+            await ingest_queue.set_progress(job_id, {"stage": stage, **details})
+
+    try:
+        return await rag_engine.delete_tree(payload["doc_id"], progress=progress)
+    finally:
+        if kv_commit:
+            await kv_commit.flush()
+
+# --- Ingestion Job Queue ---
+ingest_queue = JobQueue(INGEST_QUEUE_DB)
+ingest_workers = JobWorkerPool(
+    ingest_queue,
+    handlers={"ingest": run_ingest_job, "delete": run_delete_job},
+    workers=INGEST_WORKERS,
+    ready=lambda: rag_engine.status == "ready"
+)
+for _job_state in ("queued", "running", "succeeded", "failed"):
+    INGEST_QUEUE_DEPTH.labels(status=_job_state).set_function(lambda state=_job_state: ingest_queue.count(state))
 
 # --- Endpoints ---
 from fastapi.staticfiles import StaticFiles
@@ -979,164 +1728,78 @@ async def read_root():
 @app.get("/health")
 async def health_check():
     return {
-        "status": "ok" if rag_engine.status == "ready" else "error", 
+        "status": {"ready": "ok", "initializing": "initializing"}.get(rag_engine.status, "error"),
         "rag_status": rag_engine.status,
         "ready": rag_engine.status == "ready"
     }
 
 @app.post("/ingest")
-async def ingest_document(request: IngestRequest, background_tasks: BackgroundTasks):
-    background_tasks.add_task(process_ingestion, request)
-    return {"status": "processing", "doc_id": request.doc_id}
+async def ingest_document(request: IngestRequest):
+    job_id = await ingest_queue.enqueue("ingest", request.dict(), max_attempts=INGEST_JOB_MAX_ATTEMPTS)
+    ingest_workers.notify()
+    depth = await asyncio.to_thread(ingest_queue.depth)
+    return {"status": "queued", "doc_id": request.doc_id, "job_id": job_id, "queue_depth": depth["queued"]}
+
+@app.get("/debug/imports")
+async def debug_imports():
+    """Import and startup time breakdown, and which heavy optional modules are loaded."""
+    return import_report()
+
+@app.get("/admin/llm-cache")
+async def llm_cache_status():
+    """Entries per job type in LightRAG's LLM response cache, and the policy bounding it."""
+    if not llm_cache_policy:
+        raise HTTPException(status_code=404, detail="LLM cache policy is disabled")
+    return {
+        "entries": await asyncio.to_thread(llm_cache_policy.stats),
+        "max_entries": llm_cache_policy.max_entries,
+        "eviction": llm_cache_policy.eviction,
+        "ttls": llm_cache_policy.ttls,
+    }
+
+@app.delete("/admin/llm-cache")
+async def purge_llm_cache(job_type: Optional[str] = None):
+    """Purges cached LLM responses of one job type (e.g. "Answer Generation"), or all of them."""
+    if not llm_cache_policy:
+        raise HTTPException(status_code=404, detail="LLM cache policy is disabled")
+    if rag_engine.status != "ready" or not rag_engine.rag:
+        raise HTTPException(status_code=503, detail="RAG engine is not ready")
+    purged = await llm_cache_policy.purge(job_type)
+    return {"status": "success", "job_type": job_type or "all", "purged": purged}
+
+@app.get("/ingest")
+async def ingest_queue_status():
+    return {"jobs": await asyncio.to_thread(ingest_queue.depth), "workers": ingest_workers.workers}
+
+@app.get("/ingest/{job_id}")
+async def get_ingest_job(job_id: str):
+    job = await asyncio.to_thread(ingest_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress and result of any background job (ingest or delete)."""
+    return await get_ingest_job(job_id)
 
 @app.delete("/documents/{doc_id}")
 async def delete_document(doc_id: str):
     """
     Delete document and all its children (for multi-file documents like ZIPs).
     Uses composite ID pattern: parent children have IDs like {doc_id}#{file_path}
-    
-    This endpoint searches ALL databases (Qdrant, Neo4j, doc_status) to find
-    all child documents, not just doc_status.keys()
+
+    The whole subtree is removed in a single pass by a background job;
+    poll GET /jobs/{job_id} for progress.
     """
-    deleted_ids = []
-    failed_deletes = []
-    
-    logger.info(f"Starting comprehensive deletion for doc_id: {doc_id}")
-    
-    # Find ALL child documents by searching EVERY database
-    all_child_ids = set()
-    
-    try:
-        # 1. Search doc_status storage for child IDs
-        if rag_engine.rag and hasattr(rag_engine.rag, 'doc_status'):
-            try:
-                all_storage_keys = await rag_engine.rag.doc_status.get_all_keys()
-                child_pattern = f"{doc_id}#"
-                doc_status_children = [k for k in all_storage_keys if k.startswith(child_pattern)]
-                all_child_ids.update(doc_status_children)
-                logger.info(f"Found {len(doc_status_children)} children in doc_status storage")
-            except Exception as e:
-                logger.warning(f"Error searching doc_status: {e}")
-        
-        # 2. Search Qdrant chunks_vdb for child IDs
-        if rag_engine.rag and hasattr(rag_engine.rag, 'chunks_vdb'):
-            try:
-                from qdrant_client import models
-                
-                # Scroll through ALL chunks to find matching doc_ids
-                child_pattern = f"{doc_id}#"
-                offset = None
-                qdrant_children = set()
-                
-                while True:
-                    results = rag_engine.rag.chunks_vdb._client.scroll(
-                        collection_name=rag_engine.rag.chunks_vdb.final_namespace,
-                        limit=100,
-                        offset=offset,
-                        with_payload=True,
-                        with_vectors=False
-                    )
-                    
-                    points, next_offset = results
-                    if not points:
-                        break
-                    
-                    for point in points:
-                        if point.payload:
-                            chunk_doc_id = point.payload.get('doc_id')
-                            if chunk_doc_id and chunk_doc_id.startswith(child_pattern):
-                                qdrant_children.add(chunk_doc_id)
-                    
-                    if next_offset is None:
-                        break
-                    offset = next_offset
-                
-                all_child_ids.update(qdrant_children)
-                logger.info(f"Found {len(qdrant_children)} children in Qdrant chunks")
-            except Exception as e:
-                logger.warning(f"Error searching Qdrant: {e}")
-        
-        # 3. Search Qdrant entities_vdb for child IDs
-        if rag_engine.rag and hasattr(rag_engine.rag, 'entities_vdb'):
-            try:
-                from qdrant_client import models
-                
-                child_pattern = f"{doc_id}#"
-                offset = None
-                entity_children = set()
-                
-                while True:
-                    results = rag_engine.rag.entities_vdb._client.scroll(
-                        collection_name=rag_engine.rag.entities_vdb.final_namespace,
-                        limit=100,
-                        offset=offset,
-                        with_payload=True,
-                        with_vectors=False
-                    )
-                    
-                    points, next_offset = results
-                    if not points:
-                        break
-                    
-                    for point in points:
-                        if point.payload:
-                            entity_doc_id = point.payload.get('doc_id')
-                            if entity_doc_id and entity_doc_id.startswith(child_pattern):
-                                entity_children.add(entity_doc_id)
-                    
-                    if next_offset is None:
-                        break
-                    offset = next_offset
-                
-                all_child_ids.update(entity_children)
-                logger.info(f"Found {len(entity_children)} children in Qdrant entities")
-            except Exception as e:
-                logger.warning(f"Error searching Qdrant entities: {e}")
-        
-        logger.info(f"Total unique child documents found: {len(all_child_ids)}")
-        
-    except Exception as e:
-        logger.error(f"Error during comprehensive child search: {e}", exc_info=True)
-    
-    # Delete parent document first
-    try:
-        await rag_engine.delete_doc(doc_id)
-        deleted_ids.append(doc_id)
-        logger.info(f"Deleted parent document: {doc_id}")
-    except Exception as e:
-        logger.warning(f"Could not delete parent {doc_id}: {e}")
-        # Continue to delete children even if parent doesn't exist
-    
-    # Delete all child documents
-    for child_id in all_child_ids:
-        try:
-            await rag_engine.delete_doc(child_id)
-            deleted_ids.append(child_id)
-            logger.info(f"Deleted child document: {child_id}")
-        except Exception as e:
-            logger.error(f"Failed to delete child {child_id}: {e}")
-            failed_deletes.append({"id": child_id, "error": str(e)})
-    
-    # Return detailed response
-    response = {
-        "status": "deleted",
-        "doc_id": doc_id,
-        "total_deleted": len(deleted_ids),
-        "deleted_ids": deleted_ids
-    }
-    
-    if failed_deletes:
-        response["failed"] = len(failed_deletes)
-        response["failed_details"] = failed_deletes
-        logger.warning(f"Completed deletion with {len(failed_deletes)} failures")
-    else:
-        logger.info(f"Successfully deleted all documents: {len(deleted_ids)} total")
-    
-    return response
+    job_id = await ingest_queue.enqueue("delete", {"doc_id": doc_id}, max_attempts=INGEST_JOB_MAX_ATTEMPTS)
+    ingest_workers.notify()
+    logger.info(f"Queued deletion of {doc_id} as job {job_id}")
+    return {"status": "queued", "doc_id": doc_id, "job_id": job_id}
 
 @app.delete("/delete-by-tag")
 async def delete_by_tag(tag: str):
-    docs = tag_manager.get_docs(tag)
+    docs = await tag_manager.get_docs(tag)
     if not docs:
         raise HTTPException(status_code=404, detail=f"No documents found for tag: {tag}")
     
@@ -1145,12 +1808,30 @@ async def delete_by_tag(tag: str):
         rag_engine.delete_doc(doc_id)
         deleted_count += 1
     
-    tag_manager.remove_tag(tag)
+    await tag_manager.remove_tag(tag)
     return {"status": "success", "message": f"Deleted {deleted_count} documents for tag {tag}"}
 
+# SSE events replayed from the answer cache; status and error events are never cached
+CACHEABLE_EVENT_TYPES = ("answer", "sources")
+
+NO_ANSWER_FALLBACK = "Sorry, I could not generate an answer."
+
 @app.post("/query")
-async def query_rag(request: QueryRequest):
+async def query_rag(request: QueryRequest, http_request: Request):
     async def event_generator():
+        cache_key = AnswerCache.make_key(
+            request.query, request.mode, request.top_k, request.tags, request.llm_config
+        )
+        if answer_cache:
+            cached_events = answer_cache.get(cache_key)
+            ANSWER_CACHE_LOOKUPS.labels(result="hit" if cached_events else "miss").inc()
+            if cached_events:
+                logger.info(f"Answer cache hit for query: {request.query[:80]}")
+                for data in cached_events:
+                    yield f"data: {json.dumps(data)}\n\n"
+                return
+            cache_version = answer_cache.index_version
+
         # Create queue for status updates
         queue = asyncio.Queue()
         
@@ -1176,6 +1857,11 @@ async def query_rag(request: QueryRequest):
                 elif request.mode == "hybrid":
                     rag_mode = "hybrid"
                 
+                # Restrict vector search and graph expansion to the project tag
+                scope_tag = extract_tag_from_request(request.tags or {})
+                if scope_tag:
+                    query_tags.set([str(scope_tag)])
+
                 await queue.put({"type": "status", "content": f"Starting {rag_mode} search..."})
                 
                 if request.mode == "direct":
@@ -1185,7 +1871,8 @@ async def query_rag(request: QueryRequest):
                     # Use aquery_llm to get full result including context
                     # IMPROVED: Pass custom response_type for better answers
                     # Also respect request.top_k if provided (though LightRAG uses init params usually, newer versions allow override)
-                    param = QueryParam(mode=rag_mode)
+                    # Stream the answer so the first tokens reach the client while generation continues
+                    param = QueryParam(mode=rag_mode, stream=True)
                     
                     # Try to set top_k if supported (LightRAG might not support override in all versions, but good to try)
                     if hasattr(param, 'top_k') and request.top_k:
@@ -1214,60 +1901,29 @@ async def query_rag(request: QueryRequest):
                     llm_response = result.get("llm_response", {})
                     content = llm_response.get("content")
                     
-                    if not content and not llm_response.get("is_streaming"):
+                    if llm_response.get("is_streaming") and llm_response.get("response_iterator"):
+                        parts = []
+                        async for delta in llm_response["response_iterator"]:
+                            parts.append(delta)
+                            await queue.put({"type": "answer_delta", "content": delta})
+                        content = "".join(parts)
+
+                    if not content:
                          # Fallback logic
                          current_config = request_llm_config.get()
-                         content = current_config.get("last_response") or "Sorry, I could not generate an answer."
+                         content = current_config.get("last_response")
+                    if not content:
+                         content = NO_ANSWER_FALLBACK
+                         mark_llm_failed()
 
+                    # The complete answer is still sent for clients that ignore answer_delta
                     await queue.put({"type": "answer", "content": content})
 
-                    # Extract Sources Manually from Vector DB
-                    try:
-                        # Generate embedding for the query
-                        # Access .func if it's an EmbeddingFunc wrapper
-                        embed_func = rag_engine.rag.embedding_func
-                        if hasattr(embed_func, 'func'):
-                            embed_func = embed_func.func
-                        
-                        embedding = await embed_func([request.query])
-                        
-                        if not embedding or len(embedding) == 0:
-                            logger.error("Embedding generation returned empty result.")
-                            # Cannot search without embedding
-                            # Skip source retrieval
-                            raise ValueError("Empty embedding result")
-
-                        logger.info(f"Embedding generated. Shape: {len(embedding)}x{len(embedding[0]) if embedding else 0}")
-                        
-                        # Perform vector search on chunks
-                        logger.info("Executing chunks_vdb.query...")
-                        # Convert to list to avoid Numpy ambiguity errors in some clients
-                        # embedding is now likely a list, but handle both
-                        vec = embedding[0]
-                        vector = vec.tolist() if hasattr(vec, 'tolist') else vec
-                        
-                        sources_results = await rag_engine.rag.chunks_vdb.query(vector, top_k=5)
-                        logger.info(f"Sources Search: Found {len(sources_results)} potential chunks.")
-                        
-                        sources = []
-                        seen_urls = set()
-                        
-                        for res in sources_results:
-                            url = res.get("file_path")
-                            # Log chunk details for debugging
-                            if not url:
-                                logger.debug(f"Chunk missing file_path: {res.get('id', 'unknown')}")
-                            
-                            if url and url not in seen_urls and isinstance(url, str) and url.startswith("http"):
-                                seen_urls.add(url)
-                                sources.append({"url": url, "title": url.split("/")[-1] or "Document"})
-                        
-                        logger.info(f"Sources Extracted: {len(sources)} valid links.")
-                        if sources:
-                             await queue.put({"type": "sources", "content": sources})
-                             
-                    except Exception as e:
-                        logger.error(f"Failed to retrieve sources: {e}", exc_info=True)
+                    # Sources come from the context the answer was built on: no extra embedding or vector search
+                    sources = sources_from_result(result.get("data") or {}, QUERY_MAX_SOURCES)
+                    logger.info(f"Sources Extracted: {len(sources)} valid links.")
+                    if sources:
+                         await queue.put({"type": "sources", "content": sources})
 
             except Exception as e:
                 logger.error(f"Query Error: {e}", exc_info=True)
@@ -1282,19 +1938,51 @@ async def query_rag(request: QueryRequest):
         task = asyncio.create_task(run_rag())
 
         # Consume queue
-        while True:
-            try:
-                data = await queue.get()
+        events = []
+        failed = False
+        completed = False
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=QUERY_DISCONNECT_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    # Nothing to send yet: stop working for a client that has gone away
+                    if await http_request.is_disconnected():
+                        break
+                    continue
+                except Exception as e:
+                    logger.error(f"Stream Error: {e}")
+                    failed = True
+                    break
                 if data is None:
+                    completed = True
                     break
+                if data.get("type") == "error":
+                    failed = True
+                elif data.get("type") in CACHEABLE_EVENT_TYPES:
+                    events.append(data)
                 yield f"data: {json.dumps(data)}\n\n"
-            except Exception as e:
-                logger.error(f"Stream Error: {e}")
-                break
-        
+        finally:
+            # Reached on normal completion, on a detected disconnect, and when the server
+            # closes the generator because the client dropped the stream
+            if not completed and not task.done():
+                task.cancel()
+                RAG_QUERY_CANCELLED.labels(mode=request.mode).inc()
+                logger.info(f"Client disconnected, cancelled query: {request.query[:80]}")
+
+        if not completed:
+            return
+
         # Ensure task is done
         await task
 
+        # Error text from a failed LLM call (or the no-answer fallback) must not outlive the outage
+        if llm_config.get("llm_failed"):
+            failed = True
+
+        if answer_cache and events and not failed:
+            answer_cache.put(cache_key, events, cache_version)
+
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 @app.delete("/documents/tag/{tag_name}")
@@ -1302,27 +1990,21 @@ async def delete_tag(tag_name: str):
     if not tag_name:
         raise HTTPException(status_code=400, detail="Tag name required")
     
-    docs = tag_manager.get_docs(tag_name)
+    docs = await tag_manager.get_docs(tag_name)
     if not docs:
         raise HTTPException(status_code=404, detail=f"Tag '{tag_name}' not found")
 
-    # Remove from TagManager
+    # Remove from the tag store
     # In a full implementation, we would also delete from LightRAG storages here.
     # checking if LightRAG supports deletion by content hash or similar is needed.
     # For now, we mainly remove the tag association.
     try:
-        # We can iterate and remove each doc_id from the tag specific list 
-        # But tag_manager.remove_doc takes (tag, doc_id).
-        # Simpler: just clear the tag entry?
-        # tag_manager does not have remove_tag method, only remove_doc.
-        # Let's add remove_tag logic or iterate.
-        current_docs = list(docs) # Copy list
-        for doc_id in current_docs:
-            tag_manager.remove_doc(tag_name, doc_id)
-            
-        logger.info(f"Deleted tag '{tag_name}' and associated {len(current_docs)} document associations.")
-        return {"status": "success", "message": f"Tag '{tag_name}' deleted.", "deleted_docs": current_docs}
+        await tag_manager.remove_tag(tag_name)
+        logger.info(f"Deleted tag '{tag_name}' and associated {len(docs)} document associations.")
+        return {"status": "success", "message": f"Tag '{tag_name}' deleted.", "deleted_docs": docs}
 
     except Exception as e:
         logger.error(f"Delete Tag Error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+record("main", time.perf_counter() - APP_IMPORT_STARTED)
@@ -16,6 +16,21 @@ def slugify(text: str) -> str:
     text = re.sub(r'[-\s]+', '-', text)
     return text
 
+def unique_slug(slug: str, used: set) -> str:
+    """
+    Makes a slug unique within one document the way MkDocs (Python-Markdown toc) does:
+    repeated headings become "example", "example_1", "example_2", ...
+    Adds the returned slug to `used`.
+    """
+    while slug in used:
+        match = re.match(r'^(.*)_([0-9]+)$', slug)
+        if match:
+            slug = f"{match.group(1)}_{int(match.group(2)) + 1}"
+        else:
+            slug = f"{slug}_1"
+    used.add(slug)
+    return slug
+
 def split_markdown_by_headers(text: str) -> List[Dict[str, str]]:
     """
     Splits markdown text into sections based on headers (#, ##, ###).
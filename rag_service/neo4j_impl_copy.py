@@ -1,5 +1,8 @@
+import asyncio
 import os
 import re
+from collections import defaultdict
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from typing import final
 import configparser
@@ -14,6 +17,7 @@ from tenacity import (
 
 import logging
 from ..utils import logger
+from ..constants import GRAPH_FIELD_SEP
 from ..base import BaseGraphStorage
 from ..types import KnowledgeGraph, KnowledgeGraphNode, KnowledgeGraphEdge
 from ..kg.shared_storage import get_data_init_lock
@@ -60,6 +64,70 @@ READ_RETRY = retry(
     reraise=True,
 )
 
+WRITE_RETRY = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    retry=retry_if_exception_type(
+        (
+            neo4jExceptions.ServiceUnavailable,
+            neo4jExceptions.TransientError,
+            neo4jExceptions.WriteServiceUnavailable,
+            neo4jExceptions.ClientError,
+            neo4jExceptions.SessionExpired,
+            ConnectionResetError,
+            OSError,
+        )
+    ),
+)
+
+# Rows per UNWIND transaction for batched node/edge upserts
+WRITE_BATCH_SIZE = int(os.environ.get("NEO4J_WRITE_BATCH_SIZE", "500"))
+
+# Node/edge property holding the project tags an entity or relation was ingested under
+TAGS_PROPERTY = "tags"
+
+# Appends row tags to the stored list, skipping ones already present
+MERGE_TAGS = "reduce(acc = coalesce({var}.tags, []), t IN {tags} | CASE WHEN t IN acc THEN acc ELSE acc + t END)"
+
+
+def _query_tags() -> list[str] | None:
+    """Return the tags the current query is restricted to"""
+    try:
+        from main import query_tags
+        return query_tags.get()
+    except (ImportError, LookupError):
+        return None
+
+
+async def _with_source_tags(properties_list: list[dict]) -> list[dict]:
+    """Copies of properties whose TAGS_PROPERTY also holds the tags of the documents
+    their source chunks belong to (looked up per document, not from the ingesting job)"""
+    source_chunks = [
+        [c for c in str(p.get("source_id") or "").split(GRAPH_FIELD_SEP) if c]
+        for p in properties_list
+    ]
+    try:
+        from main import resolve_owners
+        owners, doc_tags = await resolve_owners(
+            [c for chunk_ids in source_chunks for c in chunk_ids]
+        )
+    except ImportError:
+        owners, doc_tags = {}, {}
+
+    tagged = []
+    for properties, chunk_ids in zip(properties_list, source_chunks):
+        tags = set(properties.get(TAGS_PROPERTY) or [])
+        for chunk_id in chunk_ids:
+            tags.update(doc_tags.get(owners.get(chunk_id), []))
+        tagged.append({**properties, TAGS_PROPERTY: sorted(tags)} if tags else properties)
+    return tagged
+
+
+def _split_tags(properties: dict) -> tuple[dict, list[str]]:
+    """Separate the tag list, which is merged into the stored one instead of overwriting it"""
+    properties = dict(properties)
+    return properties, list(properties.pop(TAGS_PROPERTY, None) or [])
+
 
 @final
 @dataclass
@@ -90,6 +158,14 @@ class Neo4JStorage(BaseGraphStorage):
 
         self._driver = None
 
+        # Write-behind buffer used inside batch_writes(): upserts are collected and
+        # flushed with UNWIND queries; reads consult pending and in-flight writes first
+        self._pending_nodes: dict[str, dict] = {}
+        self._pending_edges: dict[tuple[str, str], dict] = {}
+        self._inflight_writes: list[tuple[dict, dict]] = []
+        self._batch_scopes = 0
+        self._flush_lock = asyncio.Lock()
+
     def _get_workspace_label(self) -> str:
         """Return workspace label (guaranteed non-empty during initialization)"""
         return self.workspace
@@ -421,8 +497,63 @@ class Neo4JStorage(BaseGraphStorage):
         await self.finalize()
 
     async def index_done_callback(self) -> None:
-        # Neo4J handles persistence automatically
-        pass
+        # Neo4J handles persistence automatically; only buffered writes need flushing
+        await self.flush_writes()
+
+    def _buffered_node(self, node_id: str) -> dict | None:
+        """Return the newest buffered (pending or in-flight) properties of a node"""
+        if node_id in self._pending_nodes:
+            return dict(self._pending_nodes[node_id])
+        for nodes, _ in reversed(self._inflight_writes):
+            if node_id in nodes:
+                return dict(nodes[node_id])
+        return None
+
+    def _buffered_edge(self, source_node_id: str, target_node_id: str) -> dict | None:
+        """Return the newest buffered properties of an (undirected) edge"""
+        keys = ((source_node_id, target_node_id), (target_node_id, source_node_id))
+        for edges in [self._pending_edges] + [
+            edges for _, edges in reversed(self._inflight_writes)
+        ]:
+            for key in keys:
+                if key in edges:
+                    return dict(edges[key])
+        return None
+
+    @asynccontextmanager
+    async def batch_writes(self):
+        """Buffer upsert_node/upsert_edge calls and write them with batched UNWIND
+        queries when the scope exits. Reads inside the scope see buffered writes.
+        """
+        self._batch_scopes += 1
+        try:
+            yield self
+        finally:
+            self._batch_scopes -= 1
+            await self.flush_writes()
+
+    async def flush_writes(self) -> None:
+        """Write all buffered nodes, then all buffered edges"""
+        # Flushes are serialized so a newer buffer never lands before an older one
+        async with self._flush_lock:
+            if not self._pending_nodes and not self._pending_edges:
+                return
+            nodes, edges = self._pending_nodes, self._pending_edges
+            self._pending_nodes, self._pending_edges = {}, {}
+            inflight = (nodes, edges)
+            self._inflight_writes.append(inflight)
+            try:
+                if nodes:
+                    await self.upsert_nodes_batch(nodes)
+                if edges:
+                    await self.upsert_edges_batch(
+                        [(src, tgt, props) for (src, tgt), props in edges.items()]
+                    )
+                logger.debug(
+                    f"[{self.workspace}] Flushed {len(nodes)} nodes and {len(edges)} edges"
+                )
+            finally:
+                self._inflight_writes.remove(inflight)
 
     @READ_RETRY
     async def has_node(self, node_id: str) -> bool:
@@ -439,6 +570,8 @@ class Neo4JStorage(BaseGraphStorage):
             ValueError: If node_id is invalid
             Exception: If there is an error executing the query
         """
+        if self._buffered_node(node_id) is not None:
+            return True
         workspace_label = self._get_workspace_label()
         async with self._driver.session(
             database=self._DATABASE, default_access_mode="READ"
@@ -474,6 +607,8 @@ class Neo4JStorage(BaseGraphStorage):
             ValueError: If either node_id is invalid
             Exception: If there is an error executing the query
         """
+        if self._buffered_edge(source_node_id, target_node_id) is not None:
+            return True
         workspace_label = self._get_workspace_label()
         async with self._driver.session(
             database=self._DATABASE, default_access_mode="READ"
@@ -515,6 +650,9 @@ class Neo4JStorage(BaseGraphStorage):
             ValueError: If node_id is invalid
             Exception: If there is an error executing the query
         """
+        buffered = self._buffered_node(node_id)
+        if buffered is not None:
+            return buffered
         workspace_label = self._get_workspace_label()
         async with self._driver.session(
             database=self._DATABASE, default_access_mode="READ"
@@ -565,6 +703,14 @@ class Neo4JStorage(BaseGraphStorage):
         Returns:
             A dictionary mapping each node_id to its node data (or None if not found).
         """
+        buffered = {}
+        for node_id in node_ids:
+            node = self._buffered_node(node_id)
+            if node is not None:
+                buffered[node_id] = node
+        node_ids = [node_id for node_id in node_ids if node_id not in buffered]
+        if not node_ids:
+            return buffered
         workspace_label = self._get_workspace_label()
         async with self._driver.session(
             database=self._DATABASE, default_access_mode="READ"
@@ -589,6 +735,7 @@ class Neo4JStorage(BaseGraphStorage):
                     ]
                 nodes[entity_id] = node_dict
             await result.consume()  # Make sure to consume the result fully
+            nodes.update(buffered)
             return nodes
 
     @READ_RETRY
@@ -743,6 +890,9 @@ class Neo4JStorage(BaseGraphStorage):
             ValueError: If either node_id is invalid
             Exception: If there is an error executing the query
         """
+        buffered = self._buffered_edge(source_node_id, target_node_id)
+        if buffered is not None:
+            return buffered
         workspace_label = self._get_workspace_label()
         try:
             async with self._driver.session(
@@ -827,6 +977,14 @@ class Neo4JStorage(BaseGraphStorage):
         Returns:
             A dictionary mapping (src, tgt) tuples to their edge properties.
         """
+        buffered = {}
+        for pair in pairs:
+            edge = self._buffered_edge(pair["src"], pair["tgt"])
+            if edge is not None:
+                buffered[(pair["src"], pair["tgt"])] = edge
+        pairs = [pair for pair in pairs if (pair["src"], pair["tgt"]) not in buffered]
+        if not pairs:
+            return buffered
         workspace_label = self._get_workspace_label()
         async with self._driver.session(
             database=self._DATABASE, default_access_mode="READ"
@@ -863,6 +1021,7 @@ class Neo4JStorage(BaseGraphStorage):
                         "keywords": None,
                     }
             await result.consume()
+            edges_dict.update(buffered)
             return edges_dict
 
     @READ_RETRY
@@ -887,11 +1046,15 @@ class Neo4JStorage(BaseGraphStorage):
                 results = None
                 try:
                     workspace_label = self._get_workspace_label()
+                    tags = _query_tags()
                     query = f"""MATCH (n:`{workspace_label}` {{entity_id: $entity_id}})
                             OPTIONAL MATCH (n)-[r]-(connected:`{workspace_label}`)
                             WHERE connected.entity_id IS NOT NULL
+                              AND ($tags IS NULL OR any(t IN coalesce(connected.tags, []) WHERE t IN $tags))
                             RETURN n, r, connected"""
-                    results = await session.run(query, entity_id=source_node_id)
+                    results = await session.run(
+                        query, entity_id=source_node_id, tags=tags
+                    )
 
                     edges = []
                     async for record in results:
@@ -956,15 +1119,18 @@ class Neo4JStorage(BaseGraphStorage):
         ) as session:
             # Query to get both outgoing and incoming edges
             workspace_label = self._get_workspace_label()
+            # Tag-scoped queries only expand to neighbours of the same project
+            tags = _query_tags()
             query = f"""
                 UNWIND $node_ids AS id
                 MATCH (n:`{workspace_label}` {{entity_id: id}})
                 OPTIONAL MATCH (n)-[r]-(connected:`{workspace_label}`)
+                WHERE $tags IS NULL OR any(t IN coalesce(connected.tags, []) WHERE t IN $tags)
                 RETURN id AS queried_id, n.entity_id AS node_entity_id,
                        connected.entity_id AS connected_entity_id,
                        startNode(r).entity_id AS start_entity_id
             """
-            result = await session.run(query, node_ids=node_ids)
+            result = await session.run(query, node_ids=node_ids, tags=tags)
 
             # Initialize the dictionary with empty lists for each node ID
             edges_dict = {node_id: [] for node_id in node_ids}
@@ -1022,6 +1188,14 @@ class Neo4JStorage(BaseGraphStorage):
         if "entity_id" not in properties:
             raise ValueError("Neo4j: node properties must contain an 'entity_id' field")
 
+        if self._batch_scopes > 0:
+            # Same semantics as SET n += $properties
+            # Tags are resolved for the whole buffer when it is flushed
+            self._pending_nodes.setdefault(node_id, {}).update(properties)
+            return
+
+        properties, tags = _split_tags((await _with_source_tags([properties]))[0])
+
         try:
             async with self._driver.session(database=self._DATABASE) as session:
 
@@ -1029,10 +1203,11 @@ class Neo4JStorage(BaseGraphStorage):
                     query = f"""
                     MERGE (n:`{workspace_label}` {{entity_id: $entity_id}})
                     SET n += $properties
+                    SET n.tags = {MERGE_TAGS.format(var="n", tags="$tags")}
                     SET n:`{entity_type}`
                     """
                     result = await tx.run(
-                        query, entity_id=node_id, properties=properties
+                        query, entity_id=node_id, properties=properties, tags=tags
                     )
                     await result.consume()  # Ensure result is fully consumed
 
@@ -1072,8 +1247,16 @@ class Neo4JStorage(BaseGraphStorage):
         Raises:
             ValueError: If either source or target node does not exist or is not unique
         """
+        if self._batch_scopes > 0:
+            # Edges are undirected (MERGE without direction), reuse the buffered orientation
+            key = (source_node_id, target_node_id)
+            if key not in self._pending_edges and (target_node_id, source_node_id) in self._pending_edges:
+                key = (target_node_id, source_node_id)
+            self._pending_edges.setdefault(key, {}).update(edge_data)
+            return
+
         try:
-            edge_properties = edge_data
+            edge_properties, tags = _split_tags((await _with_source_tags([edge_data]))[0])
             async with self._driver.session(database=self._DATABASE) as session:
 
                 async def execute_upsert(tx: AsyncManagedTransaction):
@@ -1084,6 +1267,7 @@ class Neo4JStorage(BaseGraphStorage):
                     MATCH (target:`{workspace_label}` {{entity_id: $target_entity_id}})
                     MERGE (source)-[r:DIRECTED]-(target)
                     SET r += $properties
+                    SET r.tags = {MERGE_TAGS.format(var="r", tags="$tags")}
                     RETURN r, source, target
                     """
                     result = await tx.run(
@@ -1091,6 +1275,7 @@ class Neo4JStorage(BaseGraphStorage):
                         source_entity_id=source_node_id,
                         target_entity_id=target_node_id,
                         properties=edge_properties,
+                        tags=tags,
                     )
                     try:
                         await result.fetch(2)
@@ -1102,6 +1287,184 @@ class Neo4JStorage(BaseGraphStorage):
             logger.error(f"[{self.workspace}] Error during edge upsert: {str(e)}")
             raise
 
+    @WRITE_RETRY
+    async def upsert_nodes_batch(self, nodes: dict[str, dict[str, str]]) -> None:
+        """
+        Upsert many nodes with UNWIND, one transaction per WRITE_BATCH_SIZE rows.
+        Labels cannot be parameterized, so rows are grouped by entity_type.
+
+        Args:
+            nodes: Mapping of node_id to node properties
+        """
+        workspace_label = self._get_workspace_label()
+        rows_by_type = defaultdict(list)
+        tagged = await _with_source_tags(list(nodes.values()))
+        for node_id, properties in zip(nodes, tagged):
+            if "entity_id" not in properties:
+                raise ValueError(
+                    "Neo4j: node properties must contain an 'entity_id' field"
+                )
+            properties, tags = _split_tags(properties)
+            rows_by_type[properties["entity_type"]].append(
+                {"entity_id": node_id, "properties": properties, "tags": tags}
+            )
+
+        try:
+            async with self._driver.session(database=self._DATABASE) as session:
+                for entity_type, rows in rows_by_type.items():
+                    query = f"""
+                    UNWIND $rows AS row
+                    MERGE (n:`{workspace_label}` {{entity_id: row.entity_id}})
+                    SET n += row.properties
+                    SET n.tags = {MERGE_TAGS.format(var="n", tags="row.tags")}
+                    SET n:`{entity_type}`
+                    """
+                    for i in range(0, len(rows), WRITE_BATCH_SIZE):
+                        batch = rows[i : i + WRITE_BATCH_SIZE]
+
+                        async def execute_upsert(
+                            tx: AsyncManagedTransaction, query=query, batch=batch
+                        ):
+                            result = await tx.run(query, rows=batch)
+                            await result.consume()  # Ensure result is fully consumed
+
+                        await session.execute_write(execute_upsert)
+        except Exception as e:
+            logger.error(f"[{self.workspace}] Error during batch node upsert: {str(e)}")
+            raise
+
+    @WRITE_RETRY
+    async def upsert_edges_batch(
+        self, edges: list[tuple[str, str, dict[str, str]]]
+    ) -> None:
+        """
+        Upsert many edges with UNWIND, one transaction per WRITE_BATCH_SIZE rows.
+        Edges whose endpoints do not exist are skipped, as in upsert_edge.
+
+        Args:
+            edges: List of (source_node_id, target_node_id, edge_properties)
+        """
+        workspace_label = self._get_workspace_label()
+        rows = []
+        tagged = await _with_source_tags([properties for _, _, properties in edges])
+        for (src, tgt, _), properties in zip(edges, tagged):
+            properties, tags = _split_tags(properties)
+            rows.append(
+                {"source": src, "target": tgt, "properties": properties, "tags": tags}
+            )
+        query = f"""
+        UNWIND $rows AS row
+        MATCH (source:`{workspace_label}` {{entity_id: row.source}})
+        MATCH (target:`{workspace_label}` {{entity_id: row.target}})
+        MERGE (source)-[r:DIRECTED]-(target)
+        SET r += row.properties
+        SET r.tags = {MERGE_TAGS.format(var="r", tags="row.tags")}
+        """
+        try:
+            async with self._driver.session(database=self._DATABASE) as session:
+                for i in range(0, len(rows), WRITE_BATCH_SIZE):
+                    batch = rows[i : i + WRITE_BATCH_SIZE]
+
+                    async def execute_upsert(tx: AsyncManagedTransaction, batch=batch):
+                        result = await tx.run(query, rows=batch)
+                        await result.consume()  # Ensure result is fully consumed
+
+                    await session.execute_write(execute_upsert)
+        except Exception as e:
+            logger.error(f"[{self.workspace}] Error during batch edge upsert: {str(e)}")
+            raise
+
+    async def backfill_tags(self, page_size: int = 1000) -> int:
+        """One-shot migration: tag nodes and relations written before tags were stored,
+        from the documents of their source chunks. Returns the number updated."""
+        workspace_label = self._get_workspace_label()
+
+        async def write(query: str, rows: list[dict]):
+            async with self._driver.session(database=self._DATABASE) as session:
+
+                async def execute_write(tx: AsyncManagedTransaction):
+                    result = await tx.run(query, rows=rows)
+                    await result.consume()
+
+                await session.execute_write(execute_write)
+
+        async def read(query: str, after: str) -> list:
+            async with self._driver.session(
+                database=self._DATABASE, default_access_mode="READ"
+            ) as session:
+                result = await session.run(query, after=after, limit=page_size)
+                records = [record async for record in result]
+                await result.consume()
+                return records
+
+        updated = 0
+        # Untagged nodes, paged by entity_id
+        after = ""
+        while True:
+            records = await read(
+                f"""MATCH (n:`{workspace_label}`)
+                WHERE n.tags IS NULL AND n.entity_id > $after
+                RETURN n.entity_id AS id, n.source_id AS source_id
+                ORDER BY n.entity_id LIMIT $limit""",
+                after,
+            )
+            if not records:
+                break
+            after = records[-1]["id"]
+            tagged = await _with_source_tags(
+                [{"source_id": record["source_id"]} for record in records]
+            )
+            rows = [
+                {"id": record["id"], "tags": properties[TAGS_PROPERTY]}
+                for record, properties in zip(records, tagged)
+                if properties.get(TAGS_PROPERTY)
+            ]
+            if rows:
+                await write(
+                    f"""UNWIND $rows AS row
+                    MATCH (n:`{workspace_label}` {{entity_id: row.id}})
+                    SET n.tags = row.tags""",
+                    rows,
+                )
+                updated += len(rows)
+
+        # Untagged relations, paged by their source node
+        after = ""
+        while True:
+            records = await read(
+                f"""MATCH (a:`{workspace_label}`)
+                WHERE a.entity_id > $after
+                WITH a ORDER BY a.entity_id LIMIT $limit
+                OPTIONAL MATCH (a)-[r]->(b:`{workspace_label}`)
+                WHERE r.tags IS NULL
+                RETURN a.entity_id AS source, b.entity_id AS target, r.source_id AS source_id""",
+                after,
+            )
+            if not records:
+                break
+            after = max(record["source"] for record in records)
+            records = [record for record in records if record["target"] is not None]
+            tagged = await _with_source_tags(
+                [{"source_id": record["source_id"]} for record in records]
+            )
+            rows = [
+                {"source": record["source"], "target": record["target"], "tags": properties[TAGS_PROPERTY]}
+                for record, properties in zip(records, tagged)
+                if properties.get(TAGS_PROPERTY)
+            ]
+            if rows:
+                await write(
+                    f"""UNWIND $rows AS row
+                    MATCH (a:`{workspace_label}` {{entity_id: row.source}})-[r]->(b:`{workspace_label}` {{entity_id: row.target}})
+                    WHERE r.tags IS NULL
+                    SET r.tags = row.tags""",
+                    rows,
+                )
+                updated += len(rows)
+
+        logger.info(f"[{self.workspace}] Backfilled tags on {updated} nodes and relations")
+        return updated
+
     async def get_knowledge_graph(
         self,
         node_label: str,
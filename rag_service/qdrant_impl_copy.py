@@ -10,6 +10,7 @@ import numpy as np
 import pipmaster as pm
 
 from ..base import BaseVectorStorage
+from ..constants import GRAPH_FIELD_SEP
 from ..exceptions import DataMigrationError
 from ..kg.shared_storage import get_data_init_lock
 from ..utils import compute_mdhash_id, logger
@@ -17,13 +18,17 @@ from ..utils import compute_mdhash_id, logger
 if not pm.is_installed("qdrant-client"):
     pm.install("qdrant-client")
 
-from qdrant_client import QdrantClient, models  # type: ignore
+from qdrant_client import AsyncQdrantClient, models  # type: ignore
 
 DEFAULT_WORKSPACE = "_"
 WORKSPACE_ID_FIELD = "workspace_id"
 ENTITY_PREFIX = "ent-"
 CREATED_AT_FIELD = "created_at"
 ID_FIELD = "id"
+DOC_ID_FIELD = "doc_id"
+PARENT_DOC_ID_FIELD = "parent_doc_id"
+ANCESTORS_FIELD = "ancestors"
+TAGS_FIELD = "tags"
 
 config = configparser.ConfigParser()
 config.read("config.ini", "utf-8")
@@ -66,8 +71,132 @@ def workspace_filter_condition(workspace: str) -> models.FieldCondition:
     )
 
 
-def _find_legacy_collection(
-    client: QdrantClient,
+def parent_doc_id_of(doc_id: str) -> str:
+    """
+    Return the top-level document of a composite ID.
+    Sub-documents are named {parent}#{path}[#{section}], so everything before
+    the first '#' identifies the upload the point belongs to.
+    """
+    return doc_id.split("#", 1)[0]
+
+
+def doc_ancestry(doc_id: str) -> list[str]:
+    """
+    Return a composite ID and every ID above it, top-level first.
+    "repo#docs/a.md#intro" -> ["repo", "repo#docs/a.md", "repo#docs/a.md#intro"]
+    """
+    parts = doc_id.split("#")
+    return ["#".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def doc_filter_condition(doc_ids: List[str], include_children: bool = False) -> models.Filter:
+    """
+    Match points whose doc_id is one of doc_ids, and optionally every point
+    below one of them at any depth (their ancestors include it).
+    parent_doc_id still covers points written before ancestors was stored.
+    """
+    conditions = [
+        models.FieldCondition(key=DOC_ID_FIELD, match=models.MatchAny(any=doc_ids))
+    ]
+    if include_children:
+        conditions.extend(
+            models.FieldCondition(key=field, match=models.MatchAny(any=doc_ids))
+            for field in (ANCESTORS_FIELD, PARENT_DOC_ID_FIELD)
+        )
+    return models.Filter(should=conditions)
+
+
+def _query_tags() -> list[str] | None:
+    """Return the tags the current query is restricted to"""
+    try:
+        from main import query_tags
+        return query_tags.get()
+    except (ImportError, LookupError):
+        return None
+
+
+async def _resolve_owners(
+    chunk_ids: list[str], doc_ids: list[str]
+) -> tuple[dict[str, str], dict[str, list[str]]]:
+    """Return (chunk_id -> owning doc_id, doc_id -> tags), looked up per document"""
+    try:
+        from main import resolve_owners
+    except ImportError:
+        return {}, {}
+    return await resolve_owners(chunk_ids, doc_ids)
+
+
+def _source_chunk_ids(value: dict[str, Any]) -> list[str]:
+    """Chunk IDs an entity or relation was extracted from"""
+    return [c for c in str(value.get("source_id") or "").split(GRAPH_FIELD_SEP) if c]
+
+
+async def _create_doc_payload_indexes(client: AsyncQdrantClient, collection_name: str):
+    """Keyword indexes so document deletes and tag filters are served by the index, not a full scan."""
+    for field_name in (DOC_ID_FIELD, PARENT_DOC_ID_FIELD, ANCESTORS_FIELD, TAGS_FIELD):
+        # create_payload_index return without error if index already exists
+        await client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=models.KeywordIndexParams(
+                type=models.KeywordIndexType.KEYWORD,
+            ),
+        )
+
+
+async def _backfill_doc_ancestry(client: AsyncQdrantClient, collection_name: str):
+    """
+    One-shot migration: points written before parent_doc_id and ancestors were stored
+    only carry doc_id, so subtree filters (include_children) would miss them.
+    """
+    by_doc: dict[str, list] = {}
+    offset = None
+    while True:
+        points, next_offset = await client.scroll(
+            collection_name=collection_name,
+            scroll_filter=models.Filter(
+                must=[
+                    models.IsEmptyCondition(
+                        is_empty=models.PayloadField(key=ANCESTORS_FIELD)
+                    )
+                ],
+                must_not=[
+                    models.IsEmptyCondition(is_empty=models.PayloadField(key=DOC_ID_FIELD))
+                ],
+            ),
+            limit=1000,
+            offset=offset,
+            with_payload=[DOC_ID_FIELD],
+            with_vectors=False,
+        )
+        for point in points:
+            doc_id = (point.payload or {}).get(DOC_ID_FIELD)
+            if doc_id:
+                by_doc.setdefault(doc_id, []).append(point.id)
+        if next_offset is None:
+            break
+        offset = next_offset
+
+    for doc_id, point_ids in by_doc.items():
+        for i in range(0, len(point_ids), 1000):
+            await client.set_payload(
+                collection_name=collection_name,
+                payload={
+                    PARENT_DOC_ID_FIELD: parent_doc_id_of(doc_id),
+                    ANCESTORS_FIELD: doc_ancestry(doc_id),
+                },
+                points=point_ids[i : i + 1000],
+                wait=True,
+            )
+    if by_doc:
+        logger.info(
+            f"Qdrant: Backfilled {PARENT_DOC_ID_FIELD}/{ANCESTORS_FIELD} on "
+            f"{sum(len(ids) for ids in by_doc.values())} points in '{collection_name}'"
+        )
+
+
+async def _find_legacy_collection(
+    client: AsyncQdrantClient,
     namespace: str,
     workspace: str = None,
     model_suffix: str = None,
@@ -83,7 +212,7 @@ def _find_legacy_collection(
     3. lightrag_vdb_{namespace} - fall back value no matter if model_suffix is provided or not (LOWEST PRIORITY)
 
     Args:
-        client: QdrantClient instance
+        client: AsyncQdrantClient instance
         namespace: Base namespace (e.g., "chunks", "entities")
         workspace: Optional workspace identifier
         model_suffix: Optional model suffix for new collection
@@ -101,7 +230,7 @@ def _find_legacy_collection(
     ]
 
     for candidate in candidates:
-        if candidate and client.collection_exists(candidate):
+        if candidate and await client.collection_exists(candidate):
             logger.info(
                 f"Qdrant: Found legacy collection '{candidate}' "
                 f"(namespace={namespace}, workspace={workspace or 'none'})"
@@ -127,8 +256,8 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         self.__post_init__()
 
     @staticmethod
-    def setup_collection(
-        client: QdrantClient,
+    async def setup_collection(
+        client: AsyncQdrantClient,
         collection_name: str,
         namespace: str,
         workspace: str,
@@ -145,7 +274,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         Only migrate data from legacy collection to new collection when new collection first created and legacy collection is not empty.
 
         Args:
-            client: QdrantClient instance
+            client: AsyncQdrantClient instance
             collection_name: Name of the final collection
             namespace: Base namespace (e.g., "chunks", "entities")
             workspace: Workspace identifier for data isolation
@@ -159,8 +288,8 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             must=[workspace_filter_condition(workspace)]
         )
 
-        new_collection_exists = client.collection_exists(collection_name)
-        legacy_collection = _find_legacy_collection(
+        new_collection_exists = await client.collection_exists(collection_name)
+        legacy_collection = await _find_legacy_collection(
             client, namespace, workspace, model_suffix
         )
 
@@ -170,7 +299,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             collection_name == legacy_collection
         ):
             # create_payload_index return without error if index already exists
-            client.create_payload_index(
+            await client.create_payload_index(
                 collection_name=collection_name,
                 field_name=WORKSPACE_ID_FIELD,
                 field_schema=models.KeywordIndexParams(
@@ -178,11 +307,13 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                     is_tenant=True,
                 ),
             )
-            new_workspace_count = client.count(
+            await _create_doc_payload_indexes(client, collection_name)
+            await _backfill_doc_ancestry(client, collection_name)
+            new_workspace_count = (await client.count(
                 collection_name=collection_name,
                 count_filter=workspace_count_filter,
                 exact=True,
-            ).count
+            )).count
 
             # Skip data migration if new collection already has workspace data
             if new_workspace_count == 0 and not (collection_name == legacy_collection):
@@ -197,11 +328,11 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         if not new_collection_exists:
             # Check vector dimension compatibility before creating new collection
             if legacy_collection:
-                legacy_count = client.count(
+                legacy_count = (await client.count(
                     collection_name=legacy_collection, exact=True
-                ).count
+                )).count
                 if legacy_count > 0:
-                    legacy_info = client.get_collection(legacy_collection)
+                    legacy_info = await client.get_collection(legacy_collection)
                     legacy_dim = legacy_info.config.params.vectors.size
 
                     if vectors_config.size and legacy_dim != vectors_config.size:
@@ -216,7 +347,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                             f"and new collection. Expected {vectors_config.size}d but got {legacy_dim}d."
                         )
 
-            client.create_collection(
+            await client.create_collection(
                 collection_name, vectors_config=vectors_config, hnsw_config=hnsw_config
             )
             logger.info(f"Qdrant: Collection '{collection_name}' created successfully")
@@ -226,7 +357,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                 )
 
         # create_payload_index return without error if index already exists
-        client.create_payload_index(
+        await client.create_payload_index(
             collection_name=collection_name,
             field_name=WORKSPACE_ID_FIELD,
             field_schema=models.KeywordIndexParams(
@@ -234,26 +365,27 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                 is_tenant=True,
             ),
         )
+        await _create_doc_payload_indexes(client, collection_name)
 
         # Case 2: Legacy collection exist
         if legacy_collection:
             # Only drop legacy collection if it's empty
             if legacy_count is None:
-                legacy_count = client.count(
+                legacy_count = (await client.count(
                     collection_name=legacy_collection, exact=True
-                ).count
+                )).count
             if legacy_count == 0:
-                client.delete_collection(collection_name=legacy_collection)
+                await client.delete_collection(collection_name=legacy_collection)
                 logger.info(
                     f"Qdrant: Empty legacy collection '{legacy_collection}' deleted successfully"
                 )
                 return
 
-            new_workspace_count = client.count(
+            new_workspace_count = (await client.count(
                 collection_name=collection_name,
                 count_filter=workspace_count_filter,
                 exact=True,
-            ).count
+            )).count
 
             # Skip data migration if new collection already has workspace data
             if new_workspace_count > 0:
@@ -267,7 +399,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             # Check if legacy collection has workspace_id to determine migration strategy
             # Note: payload_schema only reflects INDEXED fields, so we also sample
             # actual payloads to detect unindexed workspace_id fields
-            legacy_info = client.get_collection(legacy_collection)
+            legacy_info = await client.get_collection(legacy_collection)
             has_workspace_index = WORKSPACE_ID_FIELD in (
                 legacy_info.payload_schema or {}
             )
@@ -278,7 +410,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             if not has_workspace_index:
                 # Sample a small batch of points to check for workspace_id in payloads
                 # All points must have workspace_id if any point has it
-                sample_result = client.scroll(
+                sample_result = await client.scroll(
                     collection_name=legacy_collection,
                     limit=10,  # Small sample is sufficient for detection
                     with_payload=True,
@@ -302,11 +434,11 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                     must=[workspace_filter_condition(workspace)]
                 )
                 # Recount with workspace filter for accurate migration tracking
-                legacy_count = client.count(
+                legacy_count = (await client.count(
                     collection_name=legacy_collection,
                     count_filter=legacy_scroll_filter,
                     exact=True,
-                ).count
+                )).count
                 logger.info(
                     f"Qdrant: Legacy collection has workspace support, "
                     f"filtering to {legacy_count} records for workspace '{workspace}'"
@@ -327,7 +459,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
 
                 while True:
                     # Scroll through legacy data with optional workspace filter
-                    result = client.scroll(
+                    result = await client.scroll(
                         collection_name=legacy_collection,
                         scroll_filter=legacy_scroll_filter,
                         limit=batch_size,
@@ -366,7 +498,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                         )
 
                     # Upsert to new collection
-                    client.upsert(
+                    await client.upsert(
                         collection_name=collection_name, points=new_points, wait=True
                     )
 
@@ -380,11 +512,11 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                         break
                     offset = next_offset
 
-                new_count_after = client.count(
+                new_count_after = (await client.count(
                     collection_name=collection_name,
                     count_filter=workspace_count_filter,
                     exact=True,
-                ).count
+                )).count
                 inserted_count = new_count_after - new_workspace_count
                 if inserted_count != legacy_count:
                     error_msg = (
@@ -469,9 +601,9 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                 return
 
             try:
-                # Create QdrantClient if not already created
+                # Create AsyncQdrantClient if not already created
                 if self._client is None:
-                    self._client = QdrantClient(
+                    self._client = AsyncQdrantClient(
                         url=os.environ.get(
                             "QDRANT_URL", config.get("qdrant", "uri", fallback=None)
                         ),
@@ -481,12 +613,12 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                         ),
                     )
                     logger.debug(
-                        f"[{self.workspace}] QdrantClient created successfully"
+                        f"[{self.workspace}] AsyncQdrantClient created successfully"
                     )
 
                 # Setup collection (create if not exists and configure indexes)
                 # Pass namespace and workspace for backward-compatible migration support
-                QdrantVectorDBStorage.setup_collection(
+                await QdrantVectorDBStorage.setup_collection(
                     self._client,
                     self.final_namespace,
                     namespace=self.namespace,
@@ -522,24 +654,55 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         import time
 
         current_time = int(time.time())
-        
-        # Try to get doc_id from context variable if available
-        try:
-            from main import current_doc_id
-            doc_id = current_doc_id.get()
-        except (ImportError, LookupError):
-            doc_id = None
 
-        list_data = [
-            {
-                ID_FIELD: k,
-                WORKSPACE_ID_FIELD: self.effective_workspace,
-                CREATED_AT_FIELD: current_time,
-                **({"doc_id": doc_id} if doc_id else {}),  # Add doc_id if available
-                **{k1: v1 for k1, v1 in v.items() if k1 in self.meta_fields},
-            }
-            for k, v in data.items()
+        # Owner and tags come from each point's own documents: chunks carry their
+        # full_doc_id, entities and relations the chunk IDs they were extracted from
+        source_chunks = {k: _source_chunk_ids(v) for k, v in data.items()}
+        owners, doc_tags = await _resolve_owners(
+            [c for chunk_ids in source_chunks.values() for c in chunk_ids],
+            [v["full_doc_id"] for v in data.values() if v.get("full_doc_id")],
+        )
+        point_ids = [
+            compute_mdhash_id_for_qdrant(k, prefix=self.effective_workspace)
+            for k in data
         ]
+        # Upsert replaces the whole payload: carry over tags from other projects
+        existing_tags = {
+            point.payload[ID_FIELD]: point.payload.get(TAGS_FIELD) or []
+            for point in await self._client.retrieve(
+                collection_name=self.final_namespace,
+                ids=point_ids,
+                with_payload=[ID_FIELD, TAGS_FIELD],
+                with_vectors=False,
+            )
+            if point.payload and point.payload.get(ID_FIELD)
+        }
+
+        list_data = []
+        for k, v in data.items():
+            point_tags = set(existing_tags.get(k, []))
+            source_docs = [owners[c] for c in source_chunks[k] if c in owners]
+            point_doc_id = v.get("full_doc_id") or (source_docs[0] if source_docs else None)
+            for owner_doc_id in {point_doc_id, *source_docs} - {None}:
+                point_tags.update(doc_tags.get(owner_doc_id, []))
+            list_data.append(
+                {
+                    ID_FIELD: k,
+                    WORKSPACE_ID_FIELD: self.effective_workspace,
+                    CREATED_AT_FIELD: current_time,
+                    **(
+                        {
+                            DOC_ID_FIELD: point_doc_id,
+                            PARENT_DOC_ID_FIELD: parent_doc_id_of(point_doc_id),
+                            ANCESTORS_FIELD: doc_ancestry(point_doc_id),
+                        }
+                        if point_doc_id
+                        else {}
+                    ),  # Add doc_id if available
+                    **({TAGS_FIELD: sorted(point_tags)} if point_tags else {}),
+                    **{k1: v1 for k1, v1 in v.items() if k1 in self.meta_fields},
+                }
+            )
         contents = [v["content"] for v in data.values()]
         batches = [
             contents[i : i + self._max_batch_size]
@@ -555,15 +718,13 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         for i, d in enumerate(list_data):
             list_points.append(
                 models.PointStruct(
-                    id=compute_mdhash_id_for_qdrant(
-                        d[ID_FIELD], prefix=self.effective_workspace
-                    ),
+                    id=point_ids[i],
                     vector=embeddings[i],
                     payload=d,
                 )
             )
 
-        results = self._client.upsert(
+        results = await self._client.upsert(
             collection_name=self.final_namespace, points=list_points, wait=True
         )
         return results
@@ -579,16 +740,22 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             )  # higher priority for query
             embedding = embedding_result[0]
 
-        results = self._client.query_points(
+        must = [workspace_filter_condition(self.effective_workspace)]
+        tags = _query_tags()
+        if tags:
+            # Tag-scoped query: only this project's points are scored
+            must.append(
+                models.FieldCondition(key=TAGS_FIELD, match=models.MatchAny(any=tags))
+            )
+
+        results = (await self._client.query_points(
             collection_name=self.final_namespace,
             query=embedding,
             limit=top_k,
             with_payload=True,
             score_threshold=self.cosine_better_than_threshold,
-            query_filter=models.Filter(
-                must=[workspace_filter_condition(self.effective_workspace)]
-            ),
-        ).points
+            query_filter=models.Filter(must=must),
+        )).points
 
         return [
             {
@@ -603,6 +770,12 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         # Qdrant handles persistence automatically
         pass
 
+    async def finalize(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._initialized = False
+
     async def delete(self, ids: List[str]) -> None:
         """Delete vectors with specified IDs
 
@@ -619,7 +792,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                 for id in ids
             ]
             # Delete points from the collection with workspace filtering
-            self._client.delete(
+            await self._client.delete(
                 collection_name=self.final_namespace,
                 points_selector=models.PointIdsList(points=qdrant_ids),
                 wait=True,
@@ -632,6 +805,142 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                 f"[{self.workspace}] Error while deleting vectors from {self.namespace}: {e}"
             )
 
+    async def delete_by_doc_ids(
+        self, doc_ids: List[str], include_children: bool = False
+    ) -> None:
+        """Delete every point belonging to the given documents in one server-side call
+
+        Args:
+            doc_ids: Document IDs whose points should be deleted
+            include_children: Also delete points of sub-documents ({doc_id}#...)
+        """
+        if not doc_ids:
+            return
+        try:
+            await self._client.delete(
+                collection_name=self.final_namespace,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[
+                            workspace_filter_condition(self.effective_workspace),
+                            doc_filter_condition(doc_ids, include_children),
+                        ]
+                    )
+                ),
+                wait=True,
+            )
+            logger.debug(
+                f"[{self.workspace}] Deleted points of {len(doc_ids)} documents from {self.namespace}"
+            )
+        except Exception as e:
+            logger.error(
+                f"[{self.workspace}] Error deleting documents {doc_ids} from {self.namespace}: {e}"
+            )
+            raise
+
+    async def get_ids_by_doc_ids(
+        self, doc_ids: List[str], include_children: bool = False
+    ) -> list[str]:
+        """Return the IDs of all points belonging to the given documents"""
+        ids = []
+        offset = None
+        while True:
+            points, next_offset = await self._client.scroll(
+                collection_name=self.final_namespace,
+                scroll_filter=models.Filter(
+                    must=[
+                        workspace_filter_condition(self.effective_workspace),
+                        doc_filter_condition(doc_ids, include_children),
+                    ]
+                ),
+                limit=1000,
+                offset=offset,
+                with_payload=[ID_FIELD],
+                with_vectors=False,
+            )
+            ids.extend(
+                point.payload[ID_FIELD]
+                for point in points
+                if point.payload and point.payload.get(ID_FIELD)
+            )
+            if next_offset is None:
+                break
+            offset = next_offset
+        return ids
+
+    async def backfill_tags(self) -> int:
+        """One-shot migration: tag points written before tags were stored, from
+        their doc_id or source chunks. Returns the number of points updated."""
+        updated = 0
+        offset = None
+        while True:
+            points, next_offset = await self._client.scroll(
+                collection_name=self.final_namespace,
+                scroll_filter=models.Filter(
+                    must=[
+                        workspace_filter_condition(self.effective_workspace),
+                        models.IsEmptyCondition(is_empty=models.PayloadField(key=TAGS_FIELD)),
+                    ]
+                ),
+                limit=1000,
+                offset=offset,
+                with_payload=[DOC_ID_FIELD, "source_id"],
+                with_vectors=False,
+            )
+            payloads = {point.id: point.payload or {} for point in points}
+            owners, doc_tags = await _resolve_owners(
+                [c for payload in payloads.values() for c in _source_chunk_ids(payload)],
+                [payload[DOC_ID_FIELD] for payload in payloads.values() if payload.get(DOC_ID_FIELD)],
+            )
+            by_tags: dict[tuple, list] = {}
+            for point_id, payload in payloads.items():
+                docs = {owners[c] for c in _source_chunk_ids(payload) if c in owners}
+                if payload.get(DOC_ID_FIELD):
+                    docs.add(payload[DOC_ID_FIELD])
+                tags = sorted({tag for doc_id in docs for tag in doc_tags.get(doc_id, [])})
+                if tags:
+                    by_tags.setdefault(tuple(tags), []).append(point_id)
+            for tags, ids in by_tags.items():
+                await self._client.set_payload(
+                    collection_name=self.final_namespace,
+                    payload={TAGS_FIELD: list(tags)},
+                    points=ids,
+                    wait=True,
+                )
+                updated += len(ids)
+            if next_offset is None:
+                break
+            offset = next_offset
+        logger.info(f"[{self.workspace}] Backfilled tags on {updated} points in {self.namespace}")
+        return updated
+
+    async def get_child_doc_ids(self, parent_doc_id: str) -> set[str]:
+        """Return the distinct sub-document IDs stored under a document, at any depth"""
+        child_ids = set()
+        offset = None
+        while True:
+            points, next_offset = await self._client.scroll(
+                collection_name=self.final_namespace,
+                scroll_filter=models.Filter(
+                    must=[
+                        workspace_filter_condition(self.effective_workspace),
+                        doc_filter_condition([parent_doc_id], include_children=True),
+                    ]
+                ),
+                limit=1000,
+                offset=offset,
+                with_payload=[DOC_ID_FIELD],
+                with_vectors=False,
+            )
+            for point in points:
+                doc_id = (point.payload or {}).get(DOC_ID_FIELD)
+                if doc_id and doc_id != parent_doc_id:
+                    child_ids.add(doc_id)
+            if next_offset is None:
+                break
+            offset = next_offset
+        return child_ids
+
     async def delete_entity(self, entity_name: str) -> None:
         """Delete an entity by name
 
@@ -647,7 +956,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
 
             # Scroll to find the entity by its ID field in payload with workspace filtering
             # This is safer than reconstructing the Qdrant point ID
-            results = self._client.scroll(
+            results = await self._client.scroll(
                 collection_name=self.final_namespace,
                 scroll_filter=models.Filter(
                     must=[
@@ -665,7 +974,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             points = results[0]
             if points:
                 ids_to_delete = [point.id for point in points]
-                self._client.delete(
+                await self._client.delete(
                     collection_name=self.final_namespace,
                     points_selector=models.PointIdsList(points=ids_to_delete),
                     wait=True,
@@ -709,7 +1018,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             while True:
                 # Scroll to find relations, using with_payload=False for efficiency
                 # since we only need point IDs for deletion
-                results = self._client.scroll(
+                results = await self._client.scroll(
                     collection_name=self.final_namespace,
                     scroll_filter=relation_filter,
                     with_payload=False,
@@ -726,7 +1035,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                 ids_to_delete = [point.id for point in points]
 
                 # Delete the batch of relations
-                self._client.delete(
+                await self._client.delete(
                     collection_name=self.final_namespace,
                     points_selector=models.PointIdsList(points=ids_to_delete),
                     wait=True,
@@ -767,7 +1076,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             )
 
             # Retrieve the point by ID with workspace filtering
-            result = self._client.retrieve(
+            result = await self._client.retrieve(
                 collection_name=self.final_namespace,
                 ids=[qdrant_id],
                 with_payload=True,
@@ -807,7 +1116,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             ]
 
             # Retrieve the points by IDs
-            results = self._client.retrieve(
+            results = await self._client.retrieve(
                 collection_name=self.final_namespace,
                 ids=qdrant_ids,
                 with_payload=True,
@@ -865,7 +1174,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             ]
 
             # Retrieve the points by IDs with vectors
-            results = self._client.retrieve(
+            results = await self._client.retrieve(
                 collection_name=self.final_namespace,
                 ids=qdrant_ids,
                 with_vectors=True,  # Important: request vectors
@@ -904,7 +1213,7 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         # No need to lock: data integrity is ensured by allowing only one process to hold pipeline at a time
         try:
             # Delete all points for the current workspace
-            self._client.delete(
+            await self._client.delete(
                 collection_name=self.final_namespace,
                 points_selector=models.FilterSelector(
                     filter=models.Filter(
@@ -0,0 +1,367 @@
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, final
+
+from lightrag.base import BaseKVStorage, DocProcessingStatus, DocStatus, DocStatusStorage
+
+logger = logging.getLogger(__name__)
+
+# Shared by every storage of one working dir
+KV_DB_FILENAME = "kv_store.db"
+
+# SQLite limits the number of bound parameters per statement
+_IN_BATCH = 500
+
+# Doc status fields stored in their own (indexed) columns
+_DOC_SORT_FIELDS = {"created_at": "created_at", "updated_at": "updated_at", "id": "id", "file_path": "file_path"}
+
+_connections: Dict[str, Tuple[sqlite3.Connection, threading.Lock]] = {}
+_connections_lock = threading.Lock()
+
+
+def _connect(db_path: str) -> Tuple[sqlite3.Connection, threading.Lock]:
+    """One connection and lock per database file, shared by all namespaces."""
+    with _connections_lock:
+        if db_path not in _connections:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            lock = threading.Lock()
+            with lock, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS kv ("
+                    "namespace TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, "
+                    "PRIMARY KEY (namespace, id)) WITHOUT ROWID"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS doc_status ("
+                    "namespace TEXT NOT NULL, id TEXT NOT NULL, status TEXT, track_id TEXT, file_path TEXT, "
+                    "created_at TEXT, updated_at TEXT, data TEXT NOT NULL, "
+                    "PRIMARY KEY (namespace, id)) WITHOUT ROWID"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_status_status ON doc_status (namespace, status)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_status_track ON doc_status (namespace, track_id)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_status_file ON doc_status (namespace, file_path)")
+            _connections[db_path] = (conn, lock)
+        return _connections[db_path]
+
+
+def _prefix_bounds(prefix: str) -> Tuple[str, str]:
+    """Key range [prefix, upper) that an index range scan can serve (LIKE cannot use the primary key)."""
+    return prefix, prefix + "\U0010ffff"
+
+
+def register_sqlite_storages():
+    """Makes the SQLite storages selectable by name in LightRAG(kv_storage=..., doc_status_storage=...)."""
+    from lightrag import kg
+
+    for storage_type, name in (("KV_STORAGE", "SQLiteKVStorage"), ("DOC_STATUS_STORAGE", "SQLiteDocStatusStorage")):
+        kg.STORAGES[name] = __name__
+        implementations = kg.STORAGE_IMPLEMENTATIONS[storage_type]["implementations"]
+        if name not in implementations:
+            implementations.append(name)
+        kg.STORAGE_ENV_REQUIREMENTS.setdefault(name, [])
+
+
+class _SQLiteTable(ABC):
+    """Connection, namespace and JSON migration shared by the KV and doc status storages."""
+
+    table = "kv"
+
+    def _setup(self):
+        working_dir = self.global_config["working_dir"]
+        if self.workspace:
+            workspace_dir = os.path.join(working_dir, self.workspace)
+            self.final_namespace = f"{self.workspace}_{self.namespace}"
+        else:
+            workspace_dir = working_dir
+            self.final_namespace = self.namespace
+            self.workspace = "_"
+        self._json_file = os.path.join(workspace_dir, f"kv_store_{self.namespace}.json")
+        self._conn, self._lock = _connect(os.path.join(working_dir, KV_DB_FILENAME))
+
+    def _rows_for(self, data: Dict[str, Dict[str, Any]]) -> List[tuple]:
+        return [(self.final_namespace, k, json.dumps(v, ensure_ascii=False)) for k, v in data.items()]
+
+    @abstractmethod
+    def _write(self, data: Dict[str, Dict[str, Any]]):
+        """Inserts or replaces records of this namespace."""
+
+    def _migrate_json(self):
+        """One-shot import of the JsonKVStorage/JsonDocStatusStorage file this namespace used before."""
+        if not os.path.exists(self._json_file):
+            return
+        try:
+            with open(self._json_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load {self._json_file} for migration: {e}")
+            return
+        self._write(data)
+        os.replace(self._json_file, f"{self._json_file}.migrated")
+        logger.info(f"Migrated {len(data)} records from {self._json_file} into {self.table}/{self.final_namespace}")
+
+    def _get_many(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), _IN_BATCH):
+                batch = ids[i:i + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT id, data FROM {self.table} WHERE namespace = ? AND id IN ({placeholders})",
+                    [self.final_namespace, *batch],
+                ).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+        return found
+
+    def _delete(self, ids: List[str]):
+        with self._lock, self._conn:
+            for i in range(0, len(ids), _IN_BATCH):
+                batch = ids[i:i + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE namespace = ? AND id IN ({placeholders})",
+                    [self.final_namespace, *batch],
+                )
+
+    def _keys_with_prefix(self, prefix: str) -> List[str]:
+        low, high = _prefix_bounds(prefix)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM {self.table} WHERE namespace = ? AND id >= ? AND id < ? ORDER BY id",
+                (self.final_namespace, low, high),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _is_empty(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM {self.table} WHERE namespace = ? LIMIT 1", (self.final_namespace,)
+            ).fetchone()
+        return row is None
+
+    def _drop(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE namespace = ?", (self.final_namespace,))
+
+    async def initialize(self):
+        if await asyncio.to_thread(self._is_empty):
+            await asyncio.to_thread(self._migrate_json)
+
+    async def finalize(self):
+        pass
+
+    async def index_done_callback(self) -> None:
+        # Every write is its own committed transaction
+        pass
+
+    async def filter_keys(self, keys: set[str]) -> set[str]:
+        """Return the keys that are not stored yet"""
+        found = await asyncio.to_thread(self._get_many, list(keys))
+        return set(keys) - set(found)
+
+    async def delete(self, ids: list[str]) -> None:
+        await asyncio.to_thread(self._delete, list(ids))
+
+    async def get_keys_by_prefix(self, prefix: str) -> list[str]:
+        """Keys starting with prefix, e.g. every "parent#" sub-document of a composite ID"""
+        return await asyncio.to_thread(self._keys_with_prefix, prefix)
+
+    async def is_empty(self) -> bool:
+        return await asyncio.to_thread(self._is_empty)
+
+    async def drop(self) -> dict[str, str]:
+        try:
+            await asyncio.to_thread(self._drop)
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"[{self.workspace}] Error dropping {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
+
+
+@final
+@dataclass
+class SQLiteKVStorage(_SQLiteTable, BaseKVStorage):
+    """
+    LightRAG KV storage in SQLite: one row per key, so get/upsert/delete touch only
+    the affected keys instead of loading and rewriting a whole JSON file.
+    """
+
+    def __post_init__(self):
+        self._setup()
+
+    def _write(self, data: Dict[str, Dict[str, Any]]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (namespace, id, data) VALUES (?, ?, ?)", self._rows_for(data)
+            )
+
+    def _with_meta(self, id: str, value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if value is None:
+            return None
+        value.setdefault("create_time", 0)
+        value.setdefault("update_time", 0)
+        value["_id"] = id
+        return value
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        found = await asyncio.to_thread(self._get_many, [id])
+        return self._with_meta(id, found.get(id))
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        found = await asyncio.to_thread(self._get_many, list(ids))
+        return [self._with_meta(id, found.get(id)) for id in ids]
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        if not data:
+            return
+        current_time = int(time.time())
+        existing = await asyncio.to_thread(self._get_many, list(data))
+        records = {}
+        for k, v in data.items():
+            record = dict(v)
+            if self.namespace.endswith("text_chunks"):
+                record.setdefault("llm_cache_list", [])
+            record["create_time"] = existing.get(k, {}).get("create_time", current_time)
+            record["update_time"] = current_time
+            records[k] = record
+        await asyncio.to_thread(self._write, records)
+
+
+@final
+@dataclass
+class SQLiteDocStatusStorage(_SQLiteTable, DocStatusStorage):
+    """
+    LightRAG doc status storage in SQLite, with status, track_id and file_path
+    indexed so status queries no longer scan every document.
+    """
+
+    table = "doc_status"
+
+    def __post_init__(self):
+        self._setup()
+
+    def _write(self, data: Dict[str, Dict[str, Any]]):
+        rows = [
+            (
+                self.final_namespace, k, _status_value(v.get("status")), v.get("track_id"), v.get("file_path"),
+                v.get("created_at"), v.get("updated_at"), json.dumps(v, ensure_ascii=False, default=str),
+            )
+            for k, v in data.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO doc_status "
+                "(namespace, id, status, track_id, file_path, created_at, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _select(self, where: str, params: tuple) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, data FROM doc_status WHERE namespace = ? AND {where}", (self.final_namespace, *params)
+            ).fetchall()
+        return [(k, json.loads(v)) for k, v in rows]
+
+    def _status_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM doc_status WHERE namespace = ? GROUP BY status", (self.final_namespace,)
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def _page(self, status: Optional[str], page: int, page_size: int, sort_field: str,
+              sort_direction: str) -> Tuple[List[Tuple[str, Dict[str, Any]]], int]:
+        where, params = "namespace = ?", [self.final_namespace]
+        if status:
+            where += " AND status = ?"
+            params.append(status)
+        column = _DOC_SORT_FIELDS.get(sort_field, "updated_at")
+        direction = "ASC" if str(sort_direction).lower() == "asc" else "DESC"
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM doc_status WHERE {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT id, data FROM doc_status WHERE {where} ORDER BY {column} {direction} LIMIT ? OFFSET ?",
+                [*params, page_size, (page - 1) * page_size],
+            ).fetchall()
+        return [(k, json.loads(v)) for k, v in rows], total
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        found = await asyncio.to_thread(self._get_many, [id])
+        return found.get(id)
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        found = await asyncio.to_thread(self._get_many, list(ids))
+        return [found.get(id) for id in ids]
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        if not data:
+            return
+        await asyncio.to_thread(self._write, data)
+
+    async def get_status_counts(self) -> dict[str, int]:
+        return await asyncio.to_thread(self._status_counts)
+
+    async def get_all_status_counts(self) -> dict[str, int]:
+        counts = await asyncio.to_thread(self._status_counts)
+        counts["all"] = sum(counts.values())
+        return counts
+
+    async def get_docs_by_status(self, status: DocStatus) -> dict[str, DocProcessingStatus]:
+        rows = await asyncio.to_thread(self._select, "status = ?", (_status_value(status),))
+        return _to_doc_statuses(rows)
+
+    async def get_docs_by_track_id(self, track_id: str) -> dict[str, DocProcessingStatus]:
+        rows = await asyncio.to_thread(self._select, "track_id = ?", (track_id,))
+        return _to_doc_statuses(rows)
+
+    async def get_doc_by_file_path(self, file_path: str) -> dict[str, Any] | None:
+        rows = await asyncio.to_thread(self._select, "file_path = ? LIMIT 1", (file_path,))
+        return rows[0][1] if rows else None
+
+    async def get_docs_paginated(
+        self,
+        status_filter: DocStatus | None = None,
+        page: int = 1,
+        page_size: int = 50,
+        sort_field: str = "updated_at",
+        sort_direction: str = "desc",
+    ) -> tuple[list[tuple[str, DocProcessingStatus]], int]:
+        rows, total = await asyncio.to_thread(
+            self._page, _status_value(status_filter) if status_filter else None,
+            max(1, page), max(1, page_size), sort_field, sort_direction,
+        )
+        docs = _to_doc_statuses(rows)
+        return [(k, docs[k]) for k, _ in rows if k in docs], total
+
+
+def _status_value(status: Any) -> Optional[str]:
+    return status.value if isinstance(status, DocStatus) else status
+
+
+_DOC_STATUS_FIELDS = {field.name for field in dataclasses.fields(DocProcessingStatus)}
+
+
+def _to_doc_statuses(rows: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, DocProcessingStatus]:
+    """Same normalization as JsonDocStatusStorage: no content, defaults for fields older records lack."""
+    result = {}
+    for k, data in rows:
+        data.pop("content", None)
+        data.setdefault("file_path", "no-file-path")
+        data.setdefault("metadata", {})
+        data.setdefault("error_msg", None)
+        try:
+            result[k] = DocProcessingStatus(**{key: v for key, v in data.items() if key in _DOC_STATUS_FIELDS})
+        except TypeError as e:
+            logger.error(f"Invalid doc status record {k}: {e}")
+    return result
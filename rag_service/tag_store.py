@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_IN_BATCH = 500
+
+
+class TagStore:
+    """
+    Tag -> document associations, backed by a local SQLite database.
+
+    One (tag, doc_id) row per association, indexed both ways, so adding a doc,
+    checking membership and finding a doc's tags are key lookups and every
+    write is a single small transaction instead of a rewrite of tags.json.
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS doc_tags ("
+                "tag TEXT NOT NULL, doc_id TEXT NOT NULL, PRIMARY KEY (tag, doc_id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_tags_doc ON doc_tags (doc_id)")
+        if legacy_json_path:
+            self._migrate_json(legacy_json_path)
+
+    def _migrate_json(self, json_path: str):
+        """Imports a tags.json written by the old TagManager, once."""
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, "r") as f:
+                tags: Dict[str, List[str]] = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load legacy tags from {json_path}: {e}")
+            return
+
+        rows = [(tag, doc_id) for tag, doc_ids in tags.items() for doc_id in doc_ids]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO doc_tags (tag, doc_id) VALUES (?, ?)", rows)
+        os.replace(json_path, f"{json_path}.migrated")
+        logger.info(f"Migrated {len(rows)} tag associations from {json_path}")
+
+    def _add_tags(self, tag: str, doc_ids: List[str]):
+        rows = [(tag, doc_id) for doc_id in doc_ids]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO doc_tags (tag, doc_id) VALUES (?, ?)", rows)
+
+    def _get_docs(self, tag: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT doc_id FROM doc_tags WHERE tag = ? ORDER BY rowid", (tag,)).fetchall()
+        return [row[0] for row in rows]
+
+    def _get_tags(self, doc_id: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT tag FROM doc_tags WHERE doc_id = ?", (doc_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def _tags_for_docs(self, doc_ids: List[str]) -> Dict[str, List[str]]:
+        # A sub-document ({parent}#...) also carries the tags of its top-level upload
+        parents = {doc_id: doc_id.split("#", 1)[0] for doc_id in doc_ids}
+        keys = sorted(set(doc_ids) | set(parents.values()))
+        found: Dict[str, set] = {}
+        with self._lock:
+            for i in range(0, len(keys), _IN_BATCH):
+                batch = keys[i:i + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                for doc_id, tag in self._conn.execute(
+                    f"SELECT doc_id, tag FROM doc_tags WHERE doc_id IN ({placeholders})", batch
+                ):
+                    found.setdefault(doc_id, set()).add(tag)
+        tags = {}
+        for doc_id in doc_ids:
+            doc_tags = found.get(doc_id, set()) | found.get(parents[doc_id], set())
+            if doc_tags:
+                tags[doc_id] = sorted(doc_tags)
+        return tags
+
+    def _list_tags(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT tag, COUNT(*) FROM doc_tags GROUP BY tag ORDER BY tag").fetchall()
+        return {tag: count for tag, count in rows}
+
+    def _remove_doc(self, tag: str, doc_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM doc_tags WHERE tag = ? AND doc_id = ?", (tag, doc_id))
+
+    def _remove_docs(self, doc_ids: List[str]) -> int:
+        removed = 0
+        with self._lock, self._conn:
+            for i in range(0, len(doc_ids), _IN_BATCH):
+                batch = doc_ids[i:i + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                removed += self._conn.execute(f"DELETE FROM doc_tags WHERE doc_id IN ({placeholders})", batch).rowcount
+        return removed
+
+    def _remove_tag(self, tag: str) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM doc_tags WHERE tag = ?", (tag,)).rowcount
+
+    # --- Async API (SQLite work runs in a thread, off the event loop) ---
+    async def add_tag(self, tag: str, doc_id: str):
+        await self.add_tags(tag, [doc_id])
+
+    async def add_tags(self, tag: str, doc_ids: Iterable[str]):
+        """Associates many documents with a tag in one transaction."""
+        await asyncio.to_thread(self._add_tags, tag, list(doc_ids))
+
+    async def get_docs(self, tag: str) -> List[str]:
+        return await asyncio.to_thread(self._get_docs, tag)
+
+    async def get_tags(self, doc_id: str) -> List[str]:
+        return await asyncio.to_thread(self._get_tags, doc_id)
+
+    async def tags_for_docs(self, doc_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """Returns the tags of each document that has any, in one lookup."""
+        return await asyncio.to_thread(self._tags_for_docs, list(doc_ids))
+
+    async def list_tags(self) -> Dict[str, int]:
+        """Returns every tag with its document count."""
+        return await asyncio.to_thread(self._list_tags)
+
+    async def remove_doc(self, tag: str, doc_id: str):
+        await asyncio.to_thread(self._remove_doc, tag, doc_id)
+
+    async def remove_docs(self, doc_ids: Iterable[str]) -> int:
+        """Removes documents from every tag in one transaction. Returns the number of associations removed."""
+        return await asyncio.to_thread(self._remove_docs, list(doc_ids))
+
+    async def remove_tag(self, tag: str) -> int:
+        return await asyncio.to_thread(self._remove_tag, tag)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,43 @@
+import sys
+import time
+
+# Add current directory to path
+sys.path.append('.')
+
+from answer_cache import AnswerCache
+
+def test_answer_cache():
+    print("\n--- Testing Answer Cache ---")
+    cache = AnswerCache(max_entries=2, ttl_seconds=60)
+    public = {"type": "public", "model": "llama3"}
+    key = AnswerCache.make_key("What is  RAG?", "hybrid", None, {"project": "a"}, public)
+    assert key == AnswerCache.make_key("what is rag?", "hybrid", None, {"project": "a"}, {"type": "public", "model": "llama3 "})
+    assert key != AnswerCache.make_key("what is rag?", "hybrid", None, {"project": "b"}, public)
+    # Same model name on a private Ollama server is a different answer
+    local = {"type": "local", "baseUrl": "http://ollama:11434", "model": "llama3"}
+    assert key != AnswerCache.make_key("what is rag?", "hybrid", None, {"project": "a"}, local)
+
+    events = [{"type": "answer", "content": "42"}]
+    cache.put(key, events, cache.index_version)
+    assert cache.get(key) == events
+
+    # Answers computed before an index change are dropped
+    version = cache.index_version
+    cache.bump_version()
+    assert cache.get(key) is None
+    cache.put(key, events, version)
+    assert cache.get(key) is None
+
+    # LRU bound
+    for i in range(3):
+        cache.put(f"k{i}", events, cache.index_version)
+    assert cache.size() == 2 and cache.get("k0") is None
+
+    # TTL
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert cache.get("k2") is None
+    print("✅ Answer cache verified")
+
+if __name__ == "__main__":
+    test_answer_cache()
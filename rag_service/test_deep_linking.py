@@ -7,7 +7,7 @@ from unittest.mock import MagicMock, AsyncMock
 # Add current directory to path
 sys.path.append('.')
 
-from markdown_splitter import split_markdown_by_headers, slugify
+from markdown_splitter import split_markdown_by_headers, slugify, unique_slug
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -65,6 +65,17 @@ Content 2.
     assert "Content 2." in sections[3]['content']
     print("✅ Splitter logic verified")
 
+def test_repeated_headings():
+    print("\n--- Testing Repeated Headings ---")
+    sections = split_markdown_by_headers("# A\nIntro.\n## Example\nOne.\n## Example\nTwo.\n## Example_1\nThree.")
+    used = set()
+    slugs = [unique_slug(section['slug'], used) for section in sections]
+    print(f"Slugs: {slugs}")
+    # Same suffixes MkDocs generates for the anchors, so sub-doc IDs stay unique
+    assert slugs == ["a", "example", "example_1", "example_2"]
+    assert unique_slug("a", used) == "a_1" and unique_slug("a", used) == "a_2"
+    print("✅ Repeated headings verified")
+
 async def test_ingest_logic():
     print("\n--- Testing Enhanced Ingestion Logic (Mock) ---")
     
@@ -119,7 +130,8 @@ async def test_ingest_logic():
         print(f"IDs: {ids}")
         print(f"File Paths: {file_paths}")
         
-        assert ids == "doc1#title"
+        # Batched mode submits all sections of the file in one call
+        assert ids == ["doc1#title"]
         assert file_paths == ["http://base#title"]
         print("✅ Ingestion logic verified")
         
@@ -131,4 +143,5 @@ async def test_ingest_logic():
 if __name__ == "__main__":
     test_slugify()
     test_splitter()
+    test_repeated_headings()
     # asyncio.run(test_ingest_logic()) 
@@ -0,0 +1,58 @@
+import sys
+import tempfile
+import os
+
+# Add current directory to path
+sys.path.append('.')
+
+from doc_index import DocIndex, ancestor_doc_ids
+
+def test_doc_index():
+    print("\n--- Testing Doc Index ---")
+    assert ancestor_doc_ids("repo#docs/a.md#intro") == ["repo", "repo#docs/a.md"]
+    assert ancestor_doc_ids("plain") == []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = DocIndex(os.path.join(tmp_dir, "doc_index.db"))
+        index._add_docs(["repo#docs/a.md#intro", "repo#docs/a.md#usage", "repo#docs/b.md#b"])
+        index._set_chunks("repo#docs/a.md#intro", ["chunk-1", "chunk-2"])
+        index._set_chunks("repo#docs/b.md#b", ["chunk-2", "chunk-3"])
+
+        children = index._children("repo")
+        print(f"Children of repo: {sorted(children)}")
+        assert children == {"repo#docs/a.md#intro", "repo#docs/a.md#usage", "repo#docs/b.md#b"}
+        assert index._children("repo#docs/a.md") == {"repo#docs/a.md#intro", "repo#docs/a.md#usage"}
+        assert index._docs_for_chunks(["chunk-2"]) == {"repo#docs/a.md#intro", "repo#docs/b.md#b"}
+
+        index._remove_docs(["repo#docs/a.md#intro"])
+        assert index._docs_for_chunks(["chunk-1", "chunk-2"]) == {"repo#docs/b.md#b"}
+        assert "repo#docs/a.md#intro" not in index._children("repo")
+        index.close()
+        print("✅ Doc index verified")
+
+def test_shared_chunk_survives_subtree_delete():
+    print("\n--- Testing Shared Chunks Across Parents ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = DocIndex(os.path.join(tmp_dir, "doc_index.db"))
+        # Same LICENSE text in two repos hashes to the same chunk ID
+        index._add_docs(["repo_a#LICENSE", "repo_b#LICENSE"])
+        index._set_chunks("repo_a#LICENSE", ["chunk-license", "chunk-a"])
+        index._set_chunks("repo_b#LICENSE", ["chunk-license"])
+
+        # Resolve the repo_a subtree the way delete_tree does
+        doc_ids = {"repo_a"} | index._children("repo_a")
+        chunk_ids = index._chunks_for_docs(list(doc_ids))
+        assert doc_ids == {"repo_a", "repo_a#LICENSE"}
+        shared = index._shared_chunks(sorted(chunk_ids), doc_ids)
+        assert shared == {"chunk-license"}
+        assert chunk_ids - shared == {"chunk-a"}
+
+        index._remove_docs(sorted(doc_ids))
+        assert index._children("repo_b") == {"repo_b#LICENSE"}
+        assert index._chunks_for_docs(["repo_b#LICENSE"]) == {"chunk-license"}
+        index.close()
+        print("✅ Unrelated document keeps its shared chunk")
+
+if __name__ == "__main__":
+    test_doc_index()
+    test_shared_chunk_survives_subtree_delete()
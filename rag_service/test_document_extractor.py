@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add current directory to path
+sys.path.append('.')
+
+import document_extractor
+
+async def test_extract_cache():
+    print("\n--- Testing Extraction Cache ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        document_extractor.EXTRACT_CACHE_DIR = os.path.join(tmp_dir, "cache")
+        file_path = os.path.join(tmp_dir, "notes.txt")
+        with open(file_path, "w") as f:
+            f.write("hello extraction")
+
+        # Plain text is read directly and never cached
+        assert await document_extractor.extract_text(file_path) == "hello extraction"
+        assert not os.path.exists(document_extractor.EXTRACT_CACHE_DIR)
+
+        # PDF texts are cached by hash and bounded
+        document_extractor.EXTRACT_CACHE_MAX_ENTRIES = 2
+        for i in range(3):
+            document_extractor._write_cache(f"hash{i}", f"text {i}")
+            past = time.time() - 10 + i
+            os.utime(document_extractor._cache_path(f"hash{i}"), (past, past))
+        document_extractor._write_cache("hash3", "text 3")
+        cached = sorted(os.listdir(document_extractor.EXTRACT_CACHE_DIR))
+        print(f"Cache entries: {cached}")
+        assert cached == ["hash2.txt", "hash3.txt"]
+        assert document_extractor._read_cache("hash2") == "text 2"
+        assert document_extractor._read_cache("hash0") is None
+
+        # Entries unused for longer than the max age are dropped
+        old = time.time() - 2 * 86400
+        os.utime(document_extractor._cache_path("hash3"), (old, old))
+        document_extractor.EXTRACT_CACHE_MAX_AGE_DAYS = 1
+        document_extractor._prune_cache()
+        assert os.listdir(document_extractor.EXTRACT_CACHE_DIR) == ["hash2.txt"]
+        print("✅ Extraction cache verified")
+
+if __name__ == "__main__":
+    asyncio.run(test_extract_cache())
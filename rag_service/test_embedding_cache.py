@@ -0,0 +1,43 @@
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append('.')
+
+from embedding_cache import EmbeddingCache
+
+def test_embedding_cache():
+    print("\n--- Testing Embedding Cache ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = EmbeddingCache(tmp_dir, max_entries=2)
+        assert cache.get_many("model-a", ["x"]) == [None]
+
+        cache.put_many("model-a", ["x", "y"], [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+        hits = cache.get_many("model-a", ["x", "y", "z"])
+        assert hits[0].tolist() == [1.0, 2.0, 3.0]
+        assert hits[1].tolist() == [4.0, 5.0, 6.0]
+        assert hits[2] is None
+        assert cache.get_many("model-b", ["x"]) == [None]
+
+        # 'x' was used after 'y', so 'y' is the LRU victim
+        cache.get_many("model-a", ["x"])
+        cache.put_many("model-a", ["z"], [[7.0, 8.0, 9.0]])
+        assert cache.get_many("model-a", ["y"]) == [None]
+        cache.save()
+
+        # Reopen from disk
+        cache = EmbeddingCache(tmp_dir, max_entries=2)
+        hits = cache.get_many("model-a", ["x", "z"])
+        print(f"Reloaded vectors: {[h.tolist() for h in hits]}")
+        assert hits[0].tolist() == [1.0, 2.0, 3.0]
+        assert hits[1].tolist() == [7.0, 8.0, 9.0]
+        assert cache.size() == 2
+
+        # A new dimension replaces the model's active store; old vectors are not served
+        cache.put_many("model-a", ["w"], [[1.0, 2.0]])
+        assert cache.get_many("model-a", ["x"]) == [None]
+        assert cache.get_many("model-a", ["w"])[0].tolist() == [1.0, 2.0]
+        print("✅ Embedding cache verified")
+
+if __name__ == "__main__":
+    test_embedding_cache()
@@ -0,0 +1,57 @@
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append('.')
+
+from ingest_manifest import IngestManifest, compute_content_hash, sync_summary
+
+def test_manifest_diff():
+    print("\n--- Testing Manifest Diff ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest = IngestManifest("repo-1", directory=tmp_dir)
+        manifest.update_file("docs/a.md", compute_content_hash("A"), ["repo-1#docs/a.md#a"])
+        manifest.update_file("docs/b.md", compute_content_hash("B"), ["repo-1#docs/b.md#b"])
+        manifest.update_file("docs/c.md", compute_content_hash("C"), ["repo-1#docs/c.md#c"])
+        manifest.save()
+
+        # Reload from disk to verify persistence
+        manifest = IngestManifest("repo-1", directory=tmp_dir)
+        changes = manifest.diff({
+            "docs/a.md": compute_content_hash("A"),
+            "docs/b.md": compute_content_hash("B changed"),
+            "docs/d.md": compute_content_hash("D"),
+        })
+        print(f"Changes: {changes}")
+
+        assert changes["unchanged"] == ["docs/a.md"]
+        assert changes["changed"] == ["docs/b.md"]
+        assert changes["added"] == ["docs/d.md"]
+        assert changes["removed"] == ["docs/c.md"]
+        assert manifest.section_ids("docs/c.md") == ["repo-1#docs/c.md#c"]
+
+        manifest.delete()
+        assert IngestManifest("repo-1", directory=tmp_dir).files == {}
+        print("✅ Manifest diff verified")
+
+def test_sync_summary():
+    print("\n--- Testing Repo Sync Summary ---")
+    changes = {
+        "added": ["docs/d.md", "docs/e.md"],
+        "changed": ["docs/b.md"],
+        "removed": ["docs/c.md"],
+        "unchanged": ["docs/a.md"],
+    }
+    summary = sync_summary(changes, ["docs/e.md"])
+    print(f"Summary: {summary}")
+    # This dict is merged into the git ingest job result
+    assert summary == {
+        "added": 1, "updated": 1, "unchanged": 1, "deleted": 1,
+        "failed": 1, "failed_files": ["docs/e.md"],
+    }
+    assert sync_summary(changes)["failed_files"] == []
+    print("✅ Repo sync summary verified")
+
+if __name__ == "__main__":
+    test_manifest_diff()
+    test_sync_summary()
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append('.')
+
+from job_queue import JobQueue, JobWorkerPool, current_job_id
+
+def test_retry_and_recover():
+    print("\n--- Testing Job Queue Retry/Recover ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = JobQueue(os.path.join(tmp_dir, "jobs.db"), retry_backoff=0)
+        job_id = queue._enqueue("ingest", {"doc_id": "doc1"}, max_attempts=2)
+        assert queue.depth()["queued"] == 1
+
+        job = queue._claim()
+        assert job["id"] == job_id and job["attempts"] == 1
+        assert queue._fail(job_id, "boom") == "queued"  # Retried
+
+        job = queue._claim()
+        assert job["attempts"] == 2
+        assert queue._fail(job_id, "boom again") == "failed"  # Out of attempts
+        assert queue.get(job_id)["error"] == "boom again"
+
+        # Jobs left running by a crash are re-queued on startup
+        crashed_id = queue._enqueue("ingest", {"doc_id": "doc2"}, max_attempts=1)
+        queue._claim()
+        assert queue._recover() == 1
+        assert queue.get(crashed_id)["status"] == "queued"
+        queue.close()
+        print("✅ Retry and recovery verified")
+
+async def test_worker_pool():
+    print("\n--- Testing Job Worker Pool ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = JobQueue(os.path.join(tmp_dir, "jobs.db"))
+        done = asyncio.Event()
+
+        async def handler(payload):
+            await queue.set_progress(current_job_id.get(), {"stage": "running"})
+            done.set()
+            return {"doc_id": payload["doc_id"]}
+
+        pool = JobWorkerPool(queue, {"ingest": handler}, workers=2, poll_interval=0.1)
+        await pool.start()
+        job_id = await queue.enqueue("ingest", {"doc_id": "doc1"})
+        pool.notify()
+        await asyncio.wait_for(done.wait(), timeout=5)
+        await asyncio.sleep(0.2)
+        await pool.stop()
+
+        job = queue.get(job_id)
+        assert job["status"] == "succeeded"
+        assert job["result"] == {"doc_id": "doc1"}
+        assert job["progress"] == {"stage": "running"}
+        queue.close()
+        print("✅ Worker pool verified")
+
+if __name__ == "__main__":
+    test_retry_and_recover()
+    asyncio.run(test_worker_pool())
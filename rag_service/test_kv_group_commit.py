@@ -0,0 +1,66 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+# Add current directory to path
+sys.path.append('.')
+
+from kv_group_commit import GroupCommit, atomic_writer
+
+class JsonKVStorage:
+    def __init__(self):
+        self.writes = 0
+
+    async def index_done_callback(self):
+        self.writes += 1
+
+async def test_group_commit():
+    print("\n--- Testing KV Group Commit ---")
+    flushed = []
+    rag = SimpleNamespace(full_docs=JsonKVStorage(), text_chunks=JsonKVStorage())
+    commit = GroupCommit(interval=3600, every_docs=3, on_flush=lambda storage, seconds: flushed.append(storage))
+    commit.install(rag)
+
+    # Inserts only mark storages dirty
+    for _ in range(5):
+        await rag.full_docs.index_done_callback()
+        await rag.text_chunks.index_done_callback()
+    assert rag.full_docs.writes == 0
+
+    await commit.note_docs(2)
+    assert rag.full_docs.writes == 0
+    await commit.note_docs(1)
+    assert rag.full_docs.writes == 1 and rag.text_chunks.writes == 1
+    print(f"Flushed: {flushed}")
+
+    # Nothing dirty, nothing written
+    await commit.flush()
+    assert rag.full_docs.writes == 1
+
+    await rag.full_docs.index_done_callback()
+    await commit.aclose()
+    assert rag.full_docs.writes == 2 and rag.text_chunks.writes == 1
+    await rag.full_docs.index_done_callback()
+    assert rag.full_docs.writes == 3
+    print("✅ Group commit verified")
+
+def test_atomic_writer():
+    print("\n--- Testing Atomic JSON Writes ---")
+    def write_json(obj, file_name):
+        with open(file_name, "w") as f:
+            json.dump(obj, f)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "kv_store_full_docs.json")
+        atomic_writer(write_json)({"a": 1}, path)
+        with open(path) as f:
+            assert json.load(f) == {"a": 1}
+        assert os.listdir(tmp_dir) == ["kv_store_full_docs.json"]
+    print("✅ Atomic writes verified")
+
+if __name__ == "__main__":
+    asyncio.run(test_group_commit())
+    test_atomic_writer()
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add current directory to path
+sys.path.append('.')
+
+from llm_cache import LLMCachePolicy, parse_ttls
+
+class FakeKV:
+    """Stands in for a LightRAG KV storage."""
+    def __init__(self):
+        self.data = {}
+        self.flushes = 0
+
+    async def get_by_id(self, id):
+        return self.data.get(id)
+
+    async def get_by_ids(self, ids):
+        return [self.data.get(id) for id in ids]
+
+    async def get_keys_by_prefix(self, prefix):
+        return [id for id in self.data if id.startswith(prefix)]
+
+    async def upsert(self, data):
+        self.data.update(data)
+
+    async def delete(self, ids):
+        for id in ids:
+            self.data.pop(id, None)
+
+    async def drop(self):
+        self.data.clear()
+        return {"status": "success"}
+
+    async def index_done_callback(self):
+        self.flushes += 1
+
+def entry(cache_type):
+    return {"return": "...", "cache_type": cache_type, "original_prompt": "prompt"}
+
+async def run_llm_cache():
+    print("\n--- Testing LLM Response Cache Policy ---")
+    assert parse_ttls("Answer Generation=60, Keywords Extraction=3600,bad") == {
+        "Answer Generation": 60.0, "Keywords Extraction": 3600.0
+    }
+
+    events = []
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = LLMCachePolicy(
+            os.path.join(tmp, "llm_cache_index.db"), max_entries=2,
+            ttls={"Answer Generation": 60, "Keywords Extraction": 600},
+            on_event=lambda job_type, event, count: events.append((job_type, event, count)),
+        )
+        kv = FakeKV()
+        # Entries cached before the policy existed are indexed at install
+        kv.data["default:extract:old"] = entry("extract")
+        kv.data["hybrid:query:old"] = entry("query")
+        await policy.install(kv)
+        assert policy.stats() == {"Entity Extraction": 1, "Answer Generation": 1}
+
+        await kv.upsert({"default:extract:a": entry("extract"), "hybrid:query:b": entry("query")})
+        assert await kv.get_by_id("default:extract:a") is not None
+        assert await kv.get_by_id("hybrid:query:b") is not None
+        assert await kv.get_by_id("hybrid:keywords:missing") is None
+        assert ("Entity Extraction", "hit", 1) in events
+        assert ("Keywords Extraction", "miss", 1) in events
+
+        # Size cap evicts the least recently used answer/keyword entry (the unread old answer)
+        await kv.upsert({"hybrid:keywords:k": entry("keywords")})
+        assert "hybrid:query:old" not in kv.data
+        assert ("Answer Generation", "eviction", 1) in events
+
+        # A burst of answers never evicts persistent extraction or summary results
+        await kv.upsert({"default:extract:c": entry("extract"), "default:summary:d": entry("summary")})
+        await kv.upsert({f"hybrid:query:burst{i}": entry("query") for i in range(5)})
+        assert {"default:extract:old", "default:extract:a", "default:extract:c", "default:summary:d"} <= set(kv.data)
+        stats = policy.stats()
+        assert stats["Answer Generation"] + stats.get("Keywords Extraction", 0) == 2
+        assert await policy.purge("Answer Generation") == stats["Answer Generation"]
+        await policy.purge("Keywords Extraction")
+
+        # Answers expire after their TTL; extraction results do not
+        await kv.upsert({"hybrid:query:e": entry("query")})
+        policy.ttls["Answer Generation"] = 0.01
+        time.sleep(0.02)
+        assert await kv.get_by_id("hybrid:query:e") is None
+        assert "hybrid:query:e" not in kv.data
+        assert ("Answer Generation", "expired", 1) in events
+        assert await kv.get_by_id("default:extract:c") is not None
+
+        # Purge by job type, including entries indexed at install
+        assert policy.stats() == {"Entity Extraction": 3, "Summary Generation": 1}
+        flushes = kv.flushes
+        assert await policy.purge("Summary Generation") == 1
+        assert "default:summary:d" not in kv.data and kv.flushes == flushes + 1
+        assert await policy.purge() == 3 and policy.size() == 0
+        assert "default:extract:old" not in kv.data
+        policy.close()
+    print("✅ LLM response cache policy verified")
+
+def test_llm_cache():
+    asyncio.run(run_llm_cache())
+
+if __name__ == "__main__":
+    test_llm_cache()
@@ -0,0 +1,54 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append('.')
+
+from lightrag.base import DocStatus
+from sqlite_kv_storage import SQLiteDocStatusStorage, SQLiteKVStorage
+
+async def test_sqlite_kv_storage():
+    print("\n--- Testing SQLite KV Storage ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        global_config = {"working_dir": tmp_dir}
+        with open(os.path.join(tmp_dir, "kv_store_full_docs.json"), "w") as f:
+            json.dump({"repo#a.md": {"content": "a"}, "repo#b.md": {"content": "b"}, "other": {"content": "c"}}, f)
+
+        kv = SQLiteKVStorage(namespace="full_docs", workspace="", global_config=global_config, embedding_func=None)
+        await kv.initialize()
+        assert os.path.exists(os.path.join(tmp_dir, "kv_store_full_docs.json.migrated"))
+        assert (await kv.get_by_id("other"))["content"] == "c"
+        assert await kv.get_keys_by_prefix("repo#") == ["repo#a.md", "repo#b.md"]
+
+        await kv.upsert({"new": {"content": "n"}})
+        assert await kv.filter_keys({"new", "missing"}) == {"missing"}
+        docs = await kv.get_by_ids(["new", "missing"])
+        assert docs[0]["content"] == "n" and docs[1] is None
+        await kv.delete(["new"])
+        assert await kv.get_by_id("new") is None
+
+        status = SQLiteDocStatusStorage(namespace="doc_status", workspace="", global_config=global_config, embedding_func=None)
+        await status.initialize()
+        now = "2025-01-01T00:00:00+00:00"
+        await status.upsert({
+            "doc1": {"status": DocStatus.PROCESSED, "content_summary": "", "content_length": 1, "file_path": "a.md",
+                     "created_at": now, "updated_at": now, "track_id": "t1", "chunks_list": ["c1"]},
+            "doc2": {"status": DocStatus.PENDING, "content_summary": "", "content_length": 1, "file_path": "b.md",
+                     "created_at": now, "updated_at": now, "track_id": "t1"},
+        })
+        processed = await status.get_docs_by_status(DocStatus.PROCESSED)
+        print(f"Processed docs: {list(processed)}")
+        assert list(processed) == ["doc1"]
+        assert set(await status.get_docs_by_track_id("t1")) == {"doc1", "doc2"}
+        counts = await status.get_all_status_counts()
+        assert counts["all"] == 2 and counts[DocStatus.PENDING.value] == 1
+        page, total = await status.get_docs_paginated(page=1, page_size=1)
+        assert total == 2 and len(page) == 1
+        assert (await status.get_by_ids(["doc1"]))[0]["chunks_list"] == ["c1"]
+        print("✅ SQLite KV storage verified")
+
+if __name__ == "__main__":
+    asyncio.run(test_sqlite_kv_storage())
@@ -0,0 +1,49 @@
+import asyncio
+import json
+import sys
+import tempfile
+import os
+
+# Add current directory to path
+sys.path.append('.')
+
+from tag_store import TagStore
+
+async def run_tag_store():
+    print("\n--- Testing Tag Store ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "tags.json")
+        with open(json_path, "w") as f:
+            json.dump({"proj": ["doc1", "doc2"], "other": ["doc2"]}, f)
+
+        store = TagStore(os.path.join(tmp_dir, "tags.db"), legacy_json_path=json_path)
+        assert not os.path.exists(json_path)
+        assert await store.get_docs("proj") == ["doc1", "doc2"]
+        assert sorted(await store.get_tags("doc2")) == ["other", "proj"]
+
+        await store.add_tags("proj", ["doc2", "doc3", "doc4"])
+        assert await store.get_docs("proj") == ["doc1", "doc2", "doc3", "doc4"]
+        print(f"Tags: {await store.list_tags()}")
+        assert await store.list_tags() == {"other": 1, "proj": 4}
+
+        # Sub-documents inherit the tags of their top-level upload
+        await store.add_tag("repo", "doc4#README.md#intro")
+        assert await store.tags_for_docs(["doc4#README.md#intro", "doc4#other.md", "missing"]) == {
+            "doc4#README.md#intro": ["proj", "repo"],
+            "doc4#other.md": ["proj"],
+        }
+        await store.remove_docs(["doc4#README.md#intro"])
+
+        assert await store.remove_docs(["doc2", "doc3"]) == 3
+        assert await store.get_docs("proj") == ["doc1", "doc4"]
+        assert await store.get_docs("other") == []
+        assert await store.remove_tag("proj") == 2
+        assert await store.list_tags() == {}
+        store.close()
+        print("✅ Tag store verified")
+
+def test_tag_store():
+    asyncio.run(run_tag_store())
+
+if __name__ == "__main__":
+    test_tag_store()